@@ -0,0 +1,171 @@
+import os
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Sentiment quantiles reported per group
+SUMMARY_QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+# Time-bucket widths to choose from (seconds); the smallest giving at most
+# SUMMARY_MAX_TIME_BUCKETS buckets over the thread's lifetime is used
+TIME_BUCKET_STEPS = (60, 300, 900, 3600, 3 * 3600, 6 * 3600, 86400, 7 * 86400)
+SUMMARY_MAX_TIME_BUCKETS = int(os.getenv("SUMMARY_MAX_TIME_BUCKETS", "48"))
+# Characters of each top-level comment body included in the per-bin summary
+SUMMARY_BODY_CHARS = 100
+
+SENTIMENT_LABELS = ["positive", "neutral", "negative"]
+NEUTRAL_BIAS_LABEL = "None"
+
+def bias_matrix(df):
+    """Return (labels, probs matrix, scored mask) for the frame's bias column, or None without bias."""
+    if "bias" not in df.columns:
+        return None
+    values = df["bias"].tolist()
+    scored = np.fromiter((isinstance(b, dict) for b in values), dtype=bool, count=len(values))
+    if not scored.any():
+        return None
+    labels = list(next(b for b in values if isinstance(b, dict)).keys())
+    matrix = np.zeros((len(values), len(labels)), dtype=np.float64)
+    rows = np.flatnonzero(scored)
+    matrix[rows] = [[values[i][label] for label in labels] for i in rows]
+    return labels, matrix, scored
+
+def pick_time_bucket(created_utc) -> int:
+    span = float(created_utc.max() - created_utc.min()) if len(created_utc) else 0.0
+    for step in TIME_BUCKET_STEPS:
+        if span / step < SUMMARY_MAX_TIME_BUCKETS:
+            return step
+    return TIME_BUCKET_STEPS[-1]
+
+def _round(values, digits=4):
+    return np.round(np.asarray(values, dtype=float), digits).tolist()
+
+def _group_stats(codes, n_groups, sentiment, label_codes, quantiles, bias, df):
+    """
+    Per-group statistics from integer group codes (0..n_groups-1), as a list of dicts.
+
+    Every statistic is one bincount / sort over the whole frame, so the cost does
+    not grow with the number of groups.
+    """
+    counts = np.bincount(codes, minlength=n_groups)
+    means = np.bincount(codes, weights=sentiment, minlength=n_groups) / np.maximum(counts, 1)
+    qs = pd.Series(sentiment).groupby(codes).quantile(list(quantiles)).unstack().to_numpy()
+    label_counts = np.bincount(codes * len(SENTIMENT_LABELS) + label_codes,
+                               minlength=n_groups * len(SENTIMENT_LABELS)).reshape(n_groups, -1)
+    q_names = [f"p{int(q * 100)}" for q in quantiles]
+
+    groups = []
+    for g in range(n_groups):
+        groups.append({
+            "count": int(counts[g]),
+            "sentiment_mean": round(float(means[g]), 4),
+            "sentiment_quantiles": dict(zip(q_names, _round(qs[g]))),
+            "sentiment_labels": dict(zip(SENTIMENT_LABELS, label_counts[g].tolist())),
+        })
+    if bias is None:
+        return groups
+
+    labels, matrix, scored = bias
+    rows = np.flatnonzero(scored)
+    scored_codes = codes[rows]
+    probs = matrix[rows]
+    n_labels = len(labels)
+
+    scored_counts = np.bincount(scored_codes, minlength=n_groups)
+    sums = np.zeros((n_groups, n_labels))
+    np.add.at(sums, scored_codes, probs)
+    prob_means = sums / np.maximum(scored_counts, 1)[:, None]
+    top_counts = np.bincount(scored_codes * n_labels + probs.argmax(axis=1),
+                             minlength=n_groups * n_labels).reshape(n_groups, n_labels)
+
+    # Strongest non-None label per comment, then the strongest comment per group
+    bias_cols = np.array([i for i, label in enumerate(labels) if label != NEUTRAL_BIAS_LABEL])
+    strongest = probs[:, bias_cols]
+    peak_label = bias_cols[strongest.argmax(axis=1)]
+    peak_value = strongest.max(axis=1)
+    order = np.lexsort((peak_value, scored_codes))
+    last = order[np.r_[scored_codes[order][1:] != scored_codes[order][:-1], True]]
+
+    ids, authors = df["id"].to_numpy(), df["author"].to_numpy()
+    for i in last:
+        g, row = scored_codes[i], rows[i]
+        groups[g]["bias_peak"] = {
+            "label": labels[peak_label[i]],
+            "value": round(float(peak_value[i]), 6),
+            "id": ids[row],
+            "author": authors[row] or "anonymous",
+        }
+    for g in np.flatnonzero(scored_counts):
+        groups[g].update({
+            "bias_scored": int(scored_counts[g]),
+            "bias_mean": dict(zip(labels, _round(prob_means[g], 6))),
+            "bias_top_label": dict(zip(labels, top_counts[g].tolist())),
+        })
+    return groups
+
+def compute_thread_aggregates(df, quantiles=SUMMARY_QUANTILES, time_bucket=None) -> dict:
+    """
+    Grouped statistics for a scored thread frame, computed with vectorized groupbys.
+
+    Returns overall stats plus per-oc_bin_id (top-level conversation), per-level
+    and per-time-bucket (created_utc) groups. Each group has the comment count,
+    sentiment mean / quantiles / label counts and, when the frame has bias
+    predictions, the scored count, mean label probabilities, top-label counts and
+    its strongest non-None bias comment.
+    """
+    if time_bucket is not None and int(time_bucket) <= 0:
+        raise ValueError("time_bucket must be a positive number of seconds")
+    if df.empty:
+        return {"overall": {"count": 0}, "bins": [], "levels": [], "timeline": {"bucket_seconds": None, "buckets": []}}
+
+    df = df.reset_index(drop=True)
+    sentiment = df["sentiment"].to_numpy(dtype=float)
+    label_codes = pd.Categorical(df["sentiment_label"], categories=SENTIMENT_LABELS).codes
+    # Unknown labels would collide with the next group's slots; count them as neutral
+    label_codes = np.where(label_codes < 0, SENTIMENT_LABELS.index("neutral"), label_codes)
+    bias = bias_matrix(df)
+
+    def grouped(keys):
+        codes, uniques = pd.factorize(keys, sort=False)
+        return uniques, _group_stats(codes, len(uniques), sentiment, label_codes, quantiles, bias, df)
+
+    _, (overall,) = grouped(np.zeros(len(df), dtype=np.int64))
+    is_post = (df["parent_id"] == "").to_numpy()
+    overall["op_sentiment"] = round(float(sentiment[is_post][0]), 4) if is_post.any() else None
+
+    # Top-level comment details per bin (what the bar chart labels and hovers show)
+    bin_ids = df["oc_bin_id"].fillna("Unbinned").replace("", "Unbinned")
+    bin_keys, bin_stats = grouped(bin_ids)
+    has_post = pd.Series(is_post).groupby(bin_ids.to_numpy()).any()
+    heads = df.drop_duplicates("id").set_index("id").reindex(bin_keys)
+    head_bias = heads["bias"].tolist() if "bias" in heads.columns else [None] * len(heads)
+    bins = []
+    for bin_id, stats, author, body, score, oc_bias in zip(
+        bin_keys, bin_stats, heads["author"].tolist(), heads["body"].tolist(), heads["score"].tolist(), head_bias
+    ):
+        stats.update({
+            "oc_bin_id": bin_id,
+            "oc_author": author if isinstance(author, str) and author else "anonymous",
+            "body": body[:SUMMARY_BODY_CHARS] if isinstance(body, str) else "",
+            "score": int(score) if pd.notna(score) else 0,
+            "is_op": bool(has_post[bin_id]),
+            "oc_bias": oc_bias if isinstance(oc_bias, dict) else None,
+        })
+        bins.append(stats)
+
+    level_keys, level_stats = grouped(df["level"].fillna(0).astype(int).to_numpy())
+    levels = sorted((dict(level=int(k), **s) for k, s in zip(level_keys, level_stats)), key=lambda s: s["level"])
+
+    created = pd.to_numeric(df["created_utc"], errors="coerce").fillna(0).to_numpy()
+    bucket_seconds = int(time_bucket) if time_bucket is not None else pick_time_bucket(created)
+    bucket_keys, bucket_stats = grouped((created // bucket_seconds * bucket_seconds).astype(np.int64))
+    buckets = sorted((dict(start=int(k), **s) for k, s in zip(bucket_keys, bucket_stats)), key=lambda s: s["start"])
+
+    return {
+        "overall": overall,
+        "bins": bins,
+        "levels": levels,
+        "timeline": {"bucket_seconds": bucket_seconds, "buckets": buckets},
+    }
@@ -0,0 +1,492 @@
+"""
+Native asyncio serving mode.
+
+Exposes the same routes and contracts as main.py (/receive_url_fast,
+/add_bias_analysis, /stream_url, /receive_url, jobs, ...), but as an ASGI app: the shared asyncpraw client is awaited
+on the server's own event loop (no nest_asyncio / run_until_complete), and
+CPU-bound VADER and BERT work is pushed to a thread pool so a single worker can
+overlap many in-flight Reddit fetches.
+
+Run with:
+    uvicorn asgi_app:app --host 0.0.0.0 --port 8080
+    gunicorn -k uvicorn.workers.UvicornWorker -b 0.0.0.0:8080 asgi_app:app
+"""
+import os
+import json
+import asyncio
+import logging
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from reddit_analysis import (
+    load_thread_with_sentiment, add_bias_scores_budgeted, extract_submission_id,
+    fetch_thread_for_stream, iter_scored_batches, iter_bias_predictions
+)
+from comment_scheduler import BiasSchedule
+from inference_server import get_inference_client
+from model_registry import get_model_registry
+from aggregates import compute_thread_aggregates, SUMMARY_QUANTILES
+from thread_cache import get_thread_cache
+from wire_format import COLUMNAR_MEDIA_TYPE, wants_columnar, encode_columnar, encode_response
+from jobs import get_job_runner, get_job_store, FINISHED_STATUSES, RECEIVE_URL_WAIT, RECEIVE_URL_MAX_WAIT
+from bulk_analysis import analyze_bulk, resolve_targets, BULK_CONCURRENCY
+from startup import start_background_warmup, get_startup_pipeline
+from metrics import render_metrics, request_started, request_finished
+from server_common import (
+    BIAS_COMMENT_LIMIT, validate_environment, validate_reddit_url,
+    get_bias_model_path, resolve_model_version, create_reddit_client, load_summary_thread,
+    wants_async
+)
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Thread pool for VADER / BERT / GCS work - torch releases the GIL during forward passes
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", str(os.cpu_count() or 1)))
+
+# Longest a single GET /jobs/<id>?wait=N long-poll may block
+JOB_MAX_POLL_WAIT = float(os.getenv("JOB_MAX_POLL_WAIT", "25"))
+# Comments per streamed sentiment batch, and comments per streamed bias message
+STREAM_BATCH_ROWS = int(os.getenv("STREAM_BATCH_ROWS", "200"))
+STREAM_BIAS_CHUNK = int(os.getenv("STREAM_BIAS_CHUNK", "64"))
+
+# Shared state, created inside the server's event loop on startup
+reddit = None
+executor = None
+
+async def _run_cpu(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+async def _iter_cpu(iterator):
+    """Drive a blocking iterator (VADER / BERT per item) from the executor, one item at a time."""
+    done = object()
+    while True:
+        item = await _run_cpu(next, iterator, done)
+        if item is done:
+            return
+        yield item
+
+def _ndjson(message):
+    return json.dumps(message) + "\n"
+
+async def _read_json(request):
+    try:
+        return await request.json()
+    except Exception:
+        return None
+
+async def _load_url(request):
+    """Shared URL validation + cached thread load. Returns (df, error_response)."""
+    data = await _read_json(request)
+    if not data or 'url' not in data:
+        return None, JSONResponse({"status": "error", "message": "URL is required"}, status_code=400)
+
+    url = data.get('url')
+    if not validate_reddit_url(url):
+        return None, JSONResponse({"status": "error", "message": "Invalid Reddit URL"}, status_code=400)
+
+    df = await load_thread_with_sentiment(url, reddit, executor=executor)
+    return df, None
+
+async def _add_bias(df, data, route_key=None):
+    """Budgeted bias scoring off the event loop with the routed model version. Returns (df, coverage, version)."""
+    version = resolve_model_version(data, route_key)
+    model_path = await _run_cpu(get_bias_model_path, version)
+    df, coverage = await _run_cpu(add_bias_scores_budgeted, df, model_path, BIAS_COMMENT_LIMIT)
+    return df, coverage, version
+
+def _encode_data(request, df, extra):
+    """(body, headers) for a comment frame: records, or columnar when negotiated (see main.data_response)."""
+    if wants_columnar(request):
+        payload = {"status": "success", "data": encode_columnar(df), **extra}
+        return encode_response(payload, request, COLUMNAR_MEDIA_TYPE)
+    payload = {"status": "success", "data": df.to_dict(orient='records'), **extra}
+    return encode_response(payload, request)
+
+async def _data_response(request, df, **extra):
+    # Encoding and compressing a large thread is CPU work; keep it off the event loop
+    body, headers = await _run_cpu(_encode_data, request, df, extra)
+    return Response(body, status_code=200, headers=headers)
+
+async def receive_url_fast(request):
+    """Fast route that returns Reddit data with sentiment only."""
+    try:
+        data = await _read_json(request)
+        df, error = await _load_url(request)
+        if error is not None:
+            return error
+
+        logger.info(f"Fast processing completed for {len(df)} comments")
+        return await _data_response(
+            request, df, thread_id=extract_submission_id(data['url']), sentiment_dedup=df.attrs.get('sentiment_dedup')
+        )
+
+    except Exception as e:
+        logger.error(f"Error in fast processing: {e}")
+        return JSONResponse({"status": "error", "message": "Failed to process Reddit thread"}, status_code=500)
+
+async def add_bias_analysis(request):
+    """
+    Adds bias analysis to comment data: legacy {"comments": [...]} bodies, or
+    id-only {"thread_id": ..., "ids": [...]} bodies resolved against the thread
+    cache, answered with just id + bias (same contract as main.py).
+    """
+    try:
+        data = await _read_json(request)
+        if not data or ('comments' not in data and 'thread_id' not in data):
+            return JSONResponse({"status": "error", "message": "Comments data or thread_id required"}, status_code=400)
+
+        if 'comments' in data:
+            df = pd.DataFrame(data.get('comments'))
+        else:
+            entry = get_thread_cache().get(data.get('thread_id'))
+            if entry is None:
+                return JSONResponse({"status": "error", "message": "Thread not cached; reload it via /receive_url_fast"},
+                                    status_code=404)
+            df = entry.df
+            if data.get('ids') is not None:
+                df = df[df['id'].isin(data.get('ids'))]
+            df = df.copy()
+
+        df, coverage, version = await _add_bias(df, data, data.get('thread_id'))
+        if 'comments' not in data:
+            df = df.loc[df['bias'].notna(), ['id', 'bias']]
+
+        logger.info(f"Bias analysis completed for {coverage['scored']}/{coverage['eligible']} comments")
+        return await _data_response(request, df, coverage=coverage, model_version=version)
+
+    except ValueError as e:
+        logger.warning(f"Validation error: {e}")
+        return JSONResponse({"status": "error", "message": str(e)}, status_code=400)
+    except Exception as e:
+        logger.error(f"Error in bias analysis: {e}")
+        return JSONResponse({"status": "error", "message": "Failed to analyze bias"}, status_code=500)
+
+async def thread_summary(request):
+    """Precomputed chart aggregates for a thread (same contract and lookup as main.py)."""
+    try:
+        data = await _read_json(request)
+        thread_id, df = await load_summary_thread(data, reddit, executor)
+        if df is None:
+            return JSONResponse({"status": "error", "message": "Thread not cached; reload it via /receive_url_fast"},
+                                status_code=404)
+
+        extra = {"thread_id": thread_id}
+        if data.get('bias', True):
+            df, coverage, version = await _add_bias(df.copy(), data, thread_id)
+            extra.update(coverage=coverage, model_version=version)
+
+        summary = await _run_cpu(compute_thread_aggregates, df, SUMMARY_QUANTILES, data.get('time_bucket'))
+        body, headers = await _run_cpu(encode_response, {"status": "success", "summary": summary, **extra}, request)
+        return Response(body, headers=headers)
+
+    except ValueError as e:
+        logger.warning(f"Validation error: {e}")
+        return JSONResponse({"status": "error", "message": str(e)}, status_code=400)
+    except Exception as e:
+        logger.error(f"Error in thread summary: {e}")
+        return JSONResponse({"status": "error", "message": "Failed to summarize thread"}, status_code=500)
+
+async def stream_url(request):
+    """
+    NDJSON stream (same messages as main.py): "meta", a "comments" message per
+    sentiment-scored batch of whole comment groups, a "bias" message per
+    inference chunk, then "done" with coverage.
+    """
+    data = await _read_json(request)
+    if not data or 'url' not in data:
+        return JSONResponse({"status": "error", "message": "URL is required"}, status_code=400)
+    url = data.get('url')
+    if not validate_reddit_url(url):
+        return JSONResponse({"status": "error", "message": "Invalid Reddit URL"}, status_code=400)
+    include_bias = data.get('bias', True)
+    try:
+        version = resolve_model_version(data, extract_submission_id(url)) if include_bias else None
+    except ValueError as e:
+        return JSONResponse({"status": "error", "message": str(e)}, status_code=400)
+
+    async def generate():
+        try:
+            df, is_scored = await fetch_thread_for_stream(url, reddit)
+            yield _ndjson({"type": "meta", "total_comments": len(df)})
+
+            scored, coverage = [], None
+            async for batch in _iter_cpu(iter_scored_batches(url, df, is_scored, STREAM_BATCH_ROWS)):
+                scored.append(batch)
+                yield _ndjson({"type": "comments", "data": batch.to_dict(orient='records')})
+
+            if include_bias and scored:
+                bias_df = pd.concat(scored, ignore_index=True)
+                ids = bias_df['id'].tolist()
+                model_path = await _run_cpu(get_bias_model_path, version)
+                schedule = BiasSchedule(bias_df, limit=BIAS_COMMENT_LIMIT, chunk_size=STREAM_BIAS_CHUNK)
+                async for rows, predictions in _iter_cpu(iter(schedule.run(
+                    lambda texts, n: iter_bias_predictions(texts, model_path, n, stats=schedule.dedup)
+                ))):
+                    yield _ndjson({
+                        "type": "bias",
+                        "data": [{"id": ids[i], "bias": p} for i, p in zip(rows, predictions)],
+                    })
+                coverage = schedule.coverage()
+
+            yield _ndjson({"type": "done", "coverage": coverage, "model_version": version})
+            logger.info(f"Streamed {len(df)} comments")
+
+        except Exception as e:
+            logger.error(f"Error in streaming processing: {e}")
+            yield _ndjson({"type": "error", "message": "Failed to process Reddit thread"})
+
+    return StreamingResponse(generate(), media_type='application/x-ndjson')
+
+async def receive_url(request):
+    """Combined sentiment + bias pipeline as a deduplicated job, kept for backward compatibility."""
+    try:
+        data = await _read_json(request)
+        if not data or 'url' not in data:
+            return JSONResponse({"status": "error", "message": "URL is required"}, status_code=400)
+        if not validate_reddit_url(data.get('url')):
+            return JSONResponse({"status": "error", "message": "Invalid Reddit URL"}, status_code=400)
+
+        version = resolve_model_version(data, extract_submission_id(data['url']))
+        runner = get_job_runner()
+        job_id, _ = await _run_cpu(runner.submit, data['url'], version)
+        if wants_async(request):
+            return _job_response(await runner.wait_async(job_id, RECEIVE_URL_WAIT, executor=executor))
+        return _job_response(await runner.wait_async(job_id, RECEIVE_URL_MAX_WAIT, executor=executor),
+                             pending=False)
+
+    except ValueError as e:
+        logger.warning(f"Validation error: {e}")
+        return JSONResponse({"status": "error", "message": str(e)}, status_code=400)
+    except Exception as e:
+        logger.error(f"Error processing request: {e}")
+        return JSONResponse({"status": "error", "message": "Failed to process Reddit thread"}, status_code=500)
+
+def _job_response(job, pending=True):
+    """Result once a job is done, 202 while it runs, 504 if pending=False (same contract as main.py)."""
+    if job is None:
+        return JSONResponse({"status": "error", "message": "Unknown job id"}, status_code=404)
+    result = job.pop("result", None)
+    if job["status"] == "done" and result is not None:
+        return JSONResponse({"status": "success", "job": job, **result})
+    if job["status"] == "failed":
+        return JSONResponse({"status": "error", "job": job, "message": "Failed to process Reddit thread"},
+                            status_code=500)
+    if not pending:
+        return JSONResponse({"status": "error", "job": job, "message": "Timed out waiting for the analysis"},
+                            status_code=504)
+    return JSONResponse({"status": "pending", "job": job}, status_code=202,
+                        headers={"Location": f"/jobs/{job['job_id']}"})
+
+async def submit_job(request):
+    """Start a deduplicated thread analysis job; returns 202 with the job id."""
+    data = await _read_json(request)
+    if not data or 'url' not in data:
+        return JSONResponse({"status": "error", "message": "URL is required"}, status_code=400)
+    if not validate_reddit_url(data.get('url')):
+        return JSONResponse({"status": "error", "message": "Invalid Reddit URL"}, status_code=400)
+    try:
+        version = resolve_model_version(data, extract_submission_id(data['url']))
+        job_id, created = await _run_cpu(get_job_runner().submit, data['url'], version)
+    except ValueError as e:
+        return JSONResponse({"status": "error", "message": str(e)}, status_code=400)
+    return JSONResponse({"status": "accepted", "job_id": job_id, "deduplicated": not created},
+                        status_code=202, headers={"Location": f"/jobs/{job_id}"})
+
+async def get_job(request):
+    """Job status or result; ?wait=N long-polls up to JOB_MAX_POLL_WAIT seconds."""
+    job_id = request.path_params['job_id']
+    wait = min(float(request.query_params.get('wait', 0) or 0), JOB_MAX_POLL_WAIT)
+    if wait > 0:
+        return _job_response(await get_job_runner().wait_async(job_id, wait, executor=executor))
+    return _job_response(await _run_cpu(get_job_store().get, job_id))
+
+async def stream_job(request):
+    """NDJSON job progress (same messages as main.py), polled on the event loop."""
+    job_id = request.path_params['job_id']
+    store = get_job_store()
+    if store.get(job_id, include_result=False) is None:
+        return JSONResponse({"status": "error", "message": "Unknown job id"}, status_code=404)
+
+    async def generate():
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + JOB_MAX_POLL_WAIT * 4
+        last_stage = None
+        while loop.time() < deadline:
+            job = store.get(job_id, include_result=False)
+            if job is None:
+                yield _ndjson({"type": "error", "message": "Unknown job id"})
+                return
+            if job["stage"] != last_stage:
+                last_stage = job["stage"]
+                yield _ndjson({"type": "status", "job": job})
+            if job["status"] in FINISHED_STATUSES:
+                break
+            await asyncio.sleep(0.5)
+        else:
+            yield _ndjson({"type": "timeout", "job_id": job_id})
+            return
+
+        job = await _run_cpu(store.get, job_id)
+        if job is None:
+            yield _ndjson({"type": "error", "message": "Unknown job id"})
+        elif job["status"] == "done":
+            yield _ndjson({"type": "result", **job.pop("result")})
+        else:
+            yield _ndjson({"type": "error", "message": job.get("error", "Job failed")})
+
+    return StreamingResponse(generate(), media_type='application/x-ndjson')
+
+async def bulk_analysis(request):
+    """Bulk subreddit / URL-list analysis, streamed as NDJSON (same contract as main.py)."""
+    data = await _read_json(request)
+    if not data or not (data.get('subreddit') or data.get('urls')):
+        return JSONResponse({"status": "error", "message": "subreddit or urls required"}, status_code=400)
+
+    urls = data.get('urls') or []
+    if any(not validate_reddit_url(url) for url in urls):
+        return JSONResponse({"status": "error", "message": "Invalid Reddit URL"}, status_code=400)
+    try:
+        version = resolve_model_version(data)
+    except ValueError as e:
+        return JSONResponse({"status": "error", "message": str(e)}, status_code=400)
+
+    async def generate():
+        try:
+            targets = await resolve_targets(
+                reddit, data.get('subreddit'), urls,
+                limit=int(data.get('limit', 10)), time_filter=data.get('time_filter', 'day')
+            )
+            yield json.dumps({"type": "meta", "threads": len(targets)}) + "\n"
+
+            model_path = await _run_cpu(get_bias_model_path, version) if data.get('bias', True) else None
+            async for result in analyze_bulk(
+                reddit, targets, model_path,
+                concurrency=int(data.get('concurrency', BULK_CONCURRENCY)),
+                include_comments=bool(data.get('comments', False)),
+                executor=executor,
+            ):
+                yield json.dumps(result) + "\n"
+
+        except Exception as e:
+            logger.error(f"Error in bulk analysis: {e}")
+            yield json.dumps({"type": "error", "message": "Failed to run bulk analysis"}) + "\n"
+
+    return StreamingResponse(generate(), media_type='application/x-ndjson')
+
+async def root(request):
+    """Basic health check route for server."""
+    return PlainTextResponse('Reddit Extension Backend is Live!')
+
+async def ready(request):
+    """Readiness check with per-stage startup timings."""
+    report = get_startup_pipeline().report()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+async def metrics_endpoint(request):
+    """Prometheus text-format metrics for this worker process."""
+    return PlainTextResponse(render_metrics(), media_type='text/plain; version=0.0.4')
+
+async def models(request):
+    """Registered model versions and the active / A/B routing config."""
+    return JSONResponse({"status": "success", "data": get_model_registry().stats()})
+
+async def activate_model(request):
+    """Load, warm and switch to a model version in the background: {"version": "..."}."""
+    data = await _read_json(request)
+    if not data or not data.get('version'):
+        return JSONResponse({"status": "error", "message": "version is required"}, status_code=400)
+    try:
+        result = get_model_registry().request_activation(data['version'])
+    except ValueError as e:
+        return JSONResponse({"status": "error", "message": str(e)}, status_code=400)
+    return JSONResponse({"status": "accepted", "data": result}, status_code=202)
+
+async def inference_stats(request):
+    """Queue depth and batch-size metrics from the shared inference service."""
+    client = get_inference_client()
+    if client is None:
+        return JSONResponse({"status": "error", "message": "Shared inference service not configured"}, status_code=404)
+    try:
+        return JSONResponse({"status": "success", "data": await _run_cpu(client.stats)})
+    except Exception as e:
+        logger.error(f"Inference stats failed: {e}")
+        return JSONResponse({"status": "error", "message": str(e)}, status_code=500)
+
+class RequestMetricsMiddleware:
+    """In-flight gauge and latency histogram per path (timed until the last body chunk is sent)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        endpoint = scope.get("path", "unknown")
+        started = request_started(endpoint)
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            request_finished(endpoint, status["code"], started)
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    global reddit, executor
+    validate_environment()
+    executor = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="cpu")
+    reddit = create_reddit_client()
+    start_background_warmup()
+    logger.info(f"ASGI app ready ({CPU_WORKERS} CPU workers)")
+    try:
+        yield
+    finally:
+        await reddit.close()
+        executor.shutdown(wait=False)
+
+app = Starlette(
+    routes=[
+        Route('/receive_url_fast', receive_url_fast, methods=['POST']),
+        Route('/add_bias_analysis', add_bias_analysis, methods=['POST']),
+        Route('/stream_url', stream_url, methods=['POST']),
+        Route('/receive_url', receive_url, methods=['POST']),
+        Route('/thread_summary', thread_summary, methods=['POST']),
+        Route('/bulk_analysis', bulk_analysis, methods=['POST']),
+        Route('/jobs', submit_job, methods=['POST']),
+        Route('/jobs/{job_id}', get_job),
+        Route('/jobs/{job_id}/stream', stream_job),
+        Route('/', root),
+        Route('/ready', ready),
+        Route('/metrics', metrics_endpoint),
+        Route('/models', models),
+        Route('/models/activate', activate_model, methods=['POST']),
+        Route('/inference-stats', inference_stats),
+    ],
+    middleware=[
+        Middleware(RequestMetricsMiddleware),
+        Middleware(
+            CORSMiddleware,
+            allow_origin_regex=r"^(chrome-extension|opera-extension|moz-extension|safari-web-extension)://.*$"
+                               r"|^https://([a-z0-9-]+\.)?reddit\.com$",
+            allow_methods=["GET", "POST", "OPTIONS"],
+            allow_headers=["Content-Type", "Prefer"],
+            allow_credentials=False,
+        )
+    ],
+    lifespan=lifespan,
+)
@@ -0,0 +1,114 @@
+"""
+Accuracy-parity check for the bias model CPU backends.
+
+Scores the held-out test split (bias_model/model_sweeps/testdata_results-logs/
+results_t2835ru3.csv) with the eager fp32 torch backend of the given model
+directory, then with every other backend, and compares each backend's
+probabilities and labels with that eager reference. The true labels are only
+used for the accuracy line. (The eval export in bias_model/finetuning/eval_export
+comes from a different checkpoint, so it cannot serve as the reference.)
+
+Exits non-zero if any backend drifts past the tolerances:
+    python backend_parity.py --model-path /tmp/bias_model --backends quantized torchscript onnx
+"""
+import os
+import sys
+import time
+import argparse
+import logging
+
+# Compare the full model on every backend; never let the environment wrap it in the fast tier
+os.environ["BIAS_FAST_TIER"] = "0"
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from bias_backends import SUPPORTED_BACKENDS  # noqa: E402
+from reddit_analysis import ID2LABEL, load_bias_model, predict_bias_batch  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+TEST_POSTS = os.path.join(REPO_DIR, "bias_model/model_sweeps/testdata_results-logs/results_t2835ru3.csv")
+REFERENCE_BACKEND = "torch"
+
+# Test-split label names in label-id order (label 0 is "Neutral" in the data, "None" in the model)
+TEST_LABELS = ["Neutral", "body", "culture", "disabled", "gender", "race", "social", "victim"]
+
+def load_parity_set(limit=None):
+    """Return (posts, true_label_ids) for the held-out test split."""
+    posts = pd.read_csv(TEST_POSTS)
+    if limit:
+        posts = posts.head(limit)
+    true_ids = posts["actual_bias_type"].fillna("Neutral").map({label: i for i, label in enumerate(TEST_LABELS)})
+    if true_ids.isna().any():
+        raise ValueError(f"Unknown labels in {TEST_POSTS}: {sorted(posts['actual_bias_type'][true_ids.isna()].unique())}")
+    return posts["post"].astype(str).tolist(), true_ids.to_numpy(dtype=np.int64)
+
+def score_backend(model_path, backend, posts):
+    """Return (probs matrix, seconds) for one backend."""
+    model, tokenizer = load_bias_model(model_path, backend=backend)
+    start = time.perf_counter()
+    predictions = predict_bias_batch(posts, model, tokenizer)
+    elapsed = time.perf_counter() - start
+    labels = [ID2LABEL[i] for i in range(len(ID2LABEL))]
+    probs = np.array([[row[label] for label in labels] for row in predictions], dtype=np.float32)
+    return probs, elapsed
+
+def compare(probs, reference, true_ids):
+    """Drift of probs vs. the eager reference; accuracies of both on the true labels."""
+    pred_ids = probs.argmax(axis=1)
+    ref_ids = reference.argmax(axis=1)
+    return {
+        "max_abs_prob_diff": float(np.abs(probs - reference).max()),
+        "mean_abs_prob_diff": float(np.abs(probs - reference).mean()),
+        "label_agreement": float((pred_ids == ref_ids).mean()),
+        "accuracy": float((pred_ids == true_ids).mean()),
+        "reference_accuracy": float((ref_ids == true_ids).mean()),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-path", required=True)
+    parser.add_argument("--backends", nargs="+", default=SUPPORTED_BACKENDS, choices=SUPPORTED_BACKENDS)
+    parser.add_argument("--limit", type=int, default=None, help="Only score the first N test rows")
+    parser.add_argument("--max-mean-prob-diff", type=float, default=0.01)
+    parser.add_argument("--min-label-agreement", type=float, default=0.99)
+    parser.add_argument("--max-accuracy-drop", type=float, default=0.005)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    posts, true_ids = load_parity_set(args.limit)
+
+    reference, elapsed = score_backend(args.model_path, REFERENCE_BACKEND, posts)
+    print(
+        f"{REFERENCE_BACKEND:>12}: {1000 * elapsed / len(posts):6.2f} ms/comment  (reference)  "
+        f"acc={(reference.argmax(axis=1) == true_ids).mean():.4f}"
+    )
+
+    failures = []
+    for backend in args.backends:
+        if backend == REFERENCE_BACKEND:
+            continue
+        probs, elapsed = score_backend(args.model_path, backend, posts)
+        result = compare(probs, reference, true_ids)
+        print(
+            f"{backend:>12}: {1000 * elapsed / len(posts):6.2f} ms/comment  "
+            f"mean|dp|={result['mean_abs_prob_diff']:.5f}  max|dp|={result['max_abs_prob_diff']:.5f}  "
+            f"agree={result['label_agreement']:.4f}  acc={result['accuracy']:.4f} "
+            f"(eager {result['reference_accuracy']:.4f})"
+        )
+        if result["mean_abs_prob_diff"] > args.max_mean_prob_diff:
+            failures.append(f"{backend}: mean prob drift {result['mean_abs_prob_diff']:.5f}")
+        if result["label_agreement"] < args.min_label_agreement:
+            failures.append(f"{backend}: label agreement {result['label_agreement']:.4f}")
+        if result["accuracy"] < result["reference_accuracy"] - args.max_accuracy_drop:
+            failures.append(f"{backend}: accuracy {result['accuracy']:.4f}")
+
+    if failures:
+        print("Parity check FAILED:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("Parity check passed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Shared helpers for the benchmark scripts: latency summaries, peak RSS and regression checks."""
+import os
+import sys
+import json
+import time
+import platform
+import resource
+
+import numpy as np
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far (MB)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def summarize(latencies, items_per_call=1, wall_seconds=None) -> dict:
+    """p50/p95/p99/mean latency (ms), call and item throughput, and peak RSS."""
+    samples = np.asarray(latencies, dtype=float)
+    wall = wall_seconds if wall_seconds is not None else float(samples.sum())
+    return {
+        "calls": int(len(samples)),
+        "p50_ms": round(float(np.percentile(samples, 50)) * 1000, 3),
+        "p95_ms": round(float(np.percentile(samples, 95)) * 1000, 3),
+        "p99_ms": round(float(np.percentile(samples, 99)) * 1000, 3),
+        "mean_ms": round(float(samples.mean()) * 1000, 3),
+        "calls_per_s": round(len(samples) / wall, 3) if wall else None,
+        "items_per_s": round(len(samples) * items_per_call / wall, 1) if wall else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def measure(fn, iterations, warmup=1, items_per_call=1):
+    """Call fn() warmup + iterations times and summarise the timed calls."""
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies, items_per_call)
+
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "timestamp": int(time.time()),
+    }
+
+def write_report(results, path=None):
+    report = {"environment": environment(), "results": results}
+    text = json.dumps(report, indent=2)
+    if path:
+        with open(path, "w") as f:
+            f.write(text)
+    print(text)
+    return report
+
+def compare_to_baseline(results, baseline_path, tolerance=0.25, metric="p95_ms"):
+    """
+    Return the benchmarks whose metric regressed by more than tolerance vs a
+    previous report. Benchmarks missing from either side are ignored.
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name, {}).get(metric)
+        after = result.get(metric)
+        if before and after and after > before * (1 + tolerance):
+            regressions.append({"benchmark": name, metric: after, "baseline": before,
+                                "change": round(after / before - 1, 3)})
+    return regressions
@@ -0,0 +1,133 @@
+"""
+Epoch-time benchmark: fine-tuning data path before / after data_pipeline.py.
+
+legacy: Dataset.map(tokenize_function) with the tokenizer re-loaded per mapped
+        batch and max_length padding, DataLoader + custom_collate_fn (row-by-row
+        torch.tensor), as in bias_model/finetuning/finetuning_eval_func.py.
+new:    pretokenize() (cold = empty Arrow cache, warm = cached), length-grouped
+        batches and DynamicPaddingCollator.
+
+Reports preparation time, one epoch over the DataLoader and, with --model, one
+training epoch (forward + backward + AdamW step) per path. Without --model only
+the data path is timed, which is what the model sees as input width anyway.
+Defaults to the 4.6k-post test split in model_sweeps/testdata_results-logs;
+--repeat scales it up. Needs torch, transformers and datasets.
+
+Usage:
+    python benchmarks/bench_finetune_data.py --tokenizer GroNLP/hateBERT --batch-size 8
+    python benchmarks/bench_finetune_data.py --tokenizer /tmp/bias_model --model /tmp/bias_model --limit 512
+"""
+import os
+import sys
+import time
+import tempfile
+import argparse
+
+import pandas as pd
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_DIR, "bias_model", "finetuning"))
+
+from data_pipeline import pretokenize, make_dataloader, get_tokenizer, padding_stats  # noqa: E402
+
+DEFAULT_CSV = os.path.join(REPO_DIR, "bias_model/model_sweeps/testdata_results-logs/results_t2835ru3.csv")
+
+def load_frame(csv_path, limit=None, repeat=1):
+    df = pd.read_csv(csv_path)
+    label_col = "bias_type" if "bias_type" in df.columns else "actual_bias_type"
+    labels = df[label_col].fillna("Neutral")
+    label2id = {label: i for i, label in enumerate(sorted(labels.unique()))}
+    frame = pd.DataFrame({"post": df["post"].astype(str), "label": labels.map(label2id)})
+    if limit:
+        frame = frame.head(limit)
+    return pd.concat([frame] * repeat, ignore_index=True), len(label2id)
+
+def legacy_loader(frame, tokenizer_name, batch_size):
+    """The pre-data_pipeline path, reproduced verbatim apart from the tokenizer name."""
+    import torch
+    from datasets import Dataset
+    from transformers import AutoTokenizer
+    from torch.utils.data import DataLoader
+
+    def tokenize_function(examples):
+        tokenizer = AutoTokenizer.from_pretrained(tokenizer_name)
+        return tokenizer(examples["post"], padding="max_length", truncation=True)
+
+    def custom_collate_fn(batch):
+        collated_batch = {}
+        collated_batch['input_ids'] = torch.tensor([item['input_ids'] for item in batch], dtype=torch.long)
+        collated_batch['attention_mask'] = torch.tensor([item['attention_mask'] for item in batch], dtype=torch.long)
+        if 'label' in batch[0]:
+            collated_batch['labels'] = torch.tensor([item['label'] for item in batch], dtype=torch.long)
+        return collated_batch
+
+    dataset = Dataset.from_pandas(frame, preserve_index=False).map(tokenize_function, batched=True)
+    dataset = dataset.remove_columns([c for c in dataset.column_names if c not in ("input_ids", "attention_mask", "label")])
+    return DataLoader(dataset, batch_size=batch_size, shuffle=True, collate_fn=custom_collate_fn)
+
+def run_epoch(loader, model=None, optimizer=None):
+    """Seconds for one pass over the loader, and the padded token slots it produced."""
+    slots = 0
+    start = time.perf_counter()
+    for batch in loader:
+        slots += batch["input_ids"].numel()
+        if model is not None:
+            loss = model(**batch).loss
+            loss.backward()
+            optimizer.step()
+            optimizer.zero_grad()
+    return time.perf_counter() - start, slots
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default=DEFAULT_CSV, help="CSV with post and bias_type / actual_bias_type columns")
+    parser.add_argument("--tokenizer", default="GroNLP/hateBERT")
+    parser.add_argument("--model", default=None, help="Model to train for one epoch per path (slow on CPU)")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    import torch
+
+    frame, num_labels = load_frame(args.csv, args.limit, args.repeat)
+    tokenizer = get_tokenizer(args.tokenizer)
+    print(f"{len(frame)} posts, batch size {args.batch_size}, tokenizer {args.tokenizer}")
+
+    def make_model():
+        if args.model is None:
+            return None, None
+        from transformers import AutoModelForSequenceClassification
+
+        torch.manual_seed(0)
+        model = AutoModelForSequenceClassification.from_pretrained(args.model, num_labels=num_labels)
+        model.train()
+        return model, torch.optim.AdamW(model.parameters(), lr=1e-5)
+
+    results = {}
+    start = time.perf_counter()
+    loader = legacy_loader(frame, args.tokenizer, args.batch_size)
+    prep = time.perf_counter() - start
+    epoch, slots = run_epoch(loader, *make_model())
+    results["legacy"] = (prep, epoch, slots)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for name in ("new (cold cache)", "new (warm cache)"):
+            start = time.perf_counter()
+            dataset = pretokenize(frame, tokenizer, cache_dir=cache_dir)
+            loader = make_dataloader(dataset, batch_size=args.batch_size, tokenizer=tokenizer)
+            prep = time.perf_counter() - start
+            epoch, slots = run_epoch(loader, *make_model())
+            results[name] = (prep, epoch, slots)
+        stats = padding_stats(dataset["length"], args.batch_size)
+
+    print(f"{'path':<18} {'prep (s)':>9} {'epoch (s)':>10} {'total (s)':>10} {'token slots':>12}")
+    for name, (prep, epoch, slots) in results.items():
+        print(f"{name:<18} {prep:>9.2f} {epoch:>10.2f} {prep + epoch:>10.2f} {slots:>12}")
+    legacy_total = sum(results["legacy"][:2])
+    warm_total = sum(results["new (warm cache)"][:2])
+    print(f"Speed-up (warm cache): {legacy_total / warm_total:.2f}x; padding {stats['fixed_padding_ratio']:.1%} "
+          f"-> {stats['dynamic_padding_ratio']:.1%} of token slots")
+
+if __name__ == "__main__":
+    main()
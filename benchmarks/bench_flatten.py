@@ -0,0 +1,101 @@
+"""
+Micro-benchmark: comment flattening + oc_bin_id assignment.
+
+Compares the old recursive flattener with the iterrows() bin loop against the
+iterative column-wise flattener in reddit_analysis, on synthetic comment forests.
+
+Usage:
+    python benchmarks/bench_flatten.py --sizes 2000 10000 50000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+from types import SimpleNamespace
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reddit_analysis import flatten_comment_columns, COMMENT_COLUMNS  # noqa: E402
+
+def make_forest(n_comments, max_depth=12, seed=0):
+    """Build a synthetic forest of n_comments with random reply chains."""
+    rng = random.Random(seed)
+    top_level = []
+    open_nodes = []
+    for i in range(n_comments):
+        parent = rng.choice(open_nodes) if open_nodes and rng.random() < 0.8 else None
+        depth = parent.depth + 1 if parent else 0
+        node = SimpleNamespace(
+            id=f"c{i}",
+            parent_id=f"t1_{parent.id}" if parent else "t3_post",
+            author=f"user{rng.randrange(500)}",
+            body="lorem ipsum " * rng.randrange(1, 20),
+            score=rng.randrange(-10, 1000),
+            created_utc=1700000000 + i,
+            replies=[],
+            depth=depth,
+        )
+        (parent.replies if parent else top_level).append(node)
+        if depth < max_depth:
+            open_nodes.append(node)
+    return top_level
+
+def legacy_flatten(comment_forest, level=0):
+    """Baseline: recursive flattener from before the iterative rewrite."""
+    flat_list = []
+    for comment in comment_forest:
+        flat_list.append({
+            "id": comment.id,
+            "parent_id": comment.parent_id,
+            "author": str(comment.author),
+            "body": comment.body,
+            "score": comment.score,
+            "created_utc": comment.created_utc,
+            "level": level,
+        })
+        if hasattr(comment, "replies"):
+            flat_list.extend(legacy_flatten(comment.replies, level=level + 1))
+    return flat_list
+
+def legacy_build(forest):
+    df = pd.DataFrame(legacy_flatten(forest))
+    df['oc_bin_id'] = None
+    current_bin = None
+    for idx, row in df.iterrows():
+        if row['level'] == 0:
+            current_bin = row['id']
+        df.at[idx, 'oc_bin_id'] = current_bin
+    return df
+
+def new_build(forest):
+    return pd.DataFrame(flatten_comment_columns(forest), columns=COMMENT_COLUMNS)
+
+def best_of(fn, arg, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(arg)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2000, 10000, 50000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'comments':>10} {'legacy (s)':>12} {'iterative (s)':>14} {'speedup':>8}")
+    for size in args.sizes:
+        forest = make_forest(size)
+        legacy_time, legacy_df = best_of(legacy_build, forest, args.repeat)
+        new_time, new_df = best_of(new_build, forest, args.repeat)
+
+        assert list(legacy_df['id']) == list(new_df['id'])
+        assert list(legacy_df['oc_bin_id']) == list(new_df['oc_bin_id'])
+        print(f"{size:>10} {legacy_time:>12.4f} {new_time:>14.4f} {legacy_time / new_time:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
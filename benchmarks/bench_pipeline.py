@@ -0,0 +1,174 @@
+"""
+Serving-path benchmark: micro-benchmarks per stage plus the real Flask routes.
+
+Threads come from benchmarks/fake_reddit.py (synthetic forests or a recorded
+fixture), so no network or Reddit credentials are needed. Tokenization and
+inference benchmarks need a local model directory (--model-path); without it
+they are skipped and routes run sentiment-only.
+
+Output is a JSON report (p50/p95/p99 latency, throughput, peak RSS per
+benchmark). With --baseline, the run fails if any p95 regressed by more than
+--tolerance versus the previous report.
+
+Usage:
+    python benchmarks/bench_pipeline.py --sizes 500 2000 --iterations 20 --output bench.json
+    python benchmarks/bench_pipeline.py --model-path /tmp/bias_model --baseline bench.json
+    python benchmarks/bench_pipeline.py --fixture thread.json --only e2e
+"""
+import os
+import sys
+import asyncio
+import argparse
+import itertools
+
+# The app reads these at import time: no real Reddit client, no eager model load
+os.environ.setdefault("REDDIT_CLIENT_ID", "bench")
+os.environ.setdefault("REDDIT_CLIENT_SECRET", "bench")
+os.environ.setdefault("REDDIT_USER_AGENT", "bench")
+os.environ["EAGER_MODEL_LOAD"] = "0"
+os.environ["BIAS_CACHE_DB"] = ""
+os.environ.pop("INFERENCE_SOCKET", None)
+
+import pandas as pd  # noqa: E402
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import reddit_analysis  # noqa: E402
+from reddit_analysis import (  # noqa: E402
+    COMMENT_COLUMNS, flatten_comment_columns, load_and_prepare_reddit_df, add_sentiment_scores,
+    get_sentiment_analyzer, load_bias_model, predict_bias_batch, BIAS_MAX_LENGTH,
+)
+from bias_cache import get_bias_cache  # noqa: E402
+from tokenization import encode_texts, get_token_cache  # noqa: E402
+from fake_reddit import FakeReddit  # noqa: E402
+from bench_common import measure, write_report, compare_to_baseline  # noqa: E402
+
+_thread_ids = itertools.count()
+
+def unique_url():
+    """A new submission id per call, so the thread cache never short-circuits a run."""
+    return f"https://www.reddit.com/r/benchmark/comments/b{next(_thread_ids):06d}/synthetic_thread/"
+
+def bench_stages(size, reddit, args, model, tokenizer):
+    results = {}
+    loop = asyncio.new_event_loop()
+    forest = reddit._get_forest()
+
+    results[f"flatten/{size}"] = measure(
+        lambda: pd.DataFrame(flatten_comment_columns(forest, max_comments=size), columns=COMMENT_COLUMNS),
+        args.iterations, items_per_call=size,
+    )
+    results[f"load_and_prepare/{size}"] = measure(
+        lambda: loop.run_until_complete(load_and_prepare_reddit_df(unique_url(), reddit, max_comments=size)),
+        args.iterations, items_per_call=size,
+    )
+    df = loop.run_until_complete(load_and_prepare_reddit_df(unique_url(), reddit, max_comments=size))
+
+    def cold_sentiment():
+        reddit_analysis._sentiment_memo.clear()
+        add_sentiment_scores(df.copy())
+
+    results[f"sentiment/{size}"] = measure(cold_sentiment, args.iterations, items_per_call=len(df))
+
+    if tokenizer is not None:
+        texts = df['body'].astype(str).tolist()
+
+        def cold_tokenize():
+            get_token_cache().clear()
+            encode_texts(tokenizer, texts, BIAS_MAX_LENGTH)
+
+        results[f"tokenization/{size}"] = measure(cold_tokenize, args.iterations, items_per_call=len(texts))
+        results[f"tokenization_cached/{size}"] = measure(
+            lambda: encode_texts(tokenizer, texts, BIAS_MAX_LENGTH), args.iterations, items_per_call=len(texts),
+        )
+
+        bias_texts = texts[:args.bias_texts]
+        results[f"inference/{len(bias_texts)}"] = measure(
+            lambda: predict_bias_batch(bias_texts, model, tokenizer),
+            max(1, args.iterations // 4), items_per_call=len(bias_texts),
+        )
+
+    loop.close()
+    return results
+
+def bench_routes(size, reddit, args, with_bias):
+    import main
+
+    main.reddit = reddit
+    if with_bias:
+        main.get_bias_model_path = lambda version=None: args.model_path
+    client = main.app.test_client()
+    headers = {"Accept-Encoding": "gzip"}
+    results = {}
+
+    def fast():
+        response = client.post("/receive_url_fast", json={"url": unique_url()}, headers=headers)
+        assert response.status_code == 200, response.status_code
+        return response
+
+    results[f"e2e/receive_url_fast/{size}"] = measure(fast, args.iterations, items_per_call=size)
+
+    def columnar():
+        response = client.post("/receive_url_fast", json={"url": unique_url()},
+                               headers=dict(headers, Accept=main.COLUMNAR_MEDIA_TYPE))
+        assert response.status_code == 200, response.status_code
+
+    results[f"e2e/receive_url_fast_columnar/{size}"] = measure(columnar, args.iterations, items_per_call=size)
+
+    def stream():
+        response = client.post("/stream_url", json={"url": unique_url(), "bias": with_bias})
+        body = response.get_data()  # drains the generator
+        assert b'"type": "done"' in body, body[-200:]
+
+    results[f"e2e/stream_url/{size}"] = measure(stream, max(1, args.iterations // 2), items_per_call=size)
+
+    if with_bias:
+        def add_bias():
+            thread_id = fast().get_json()["thread_id"]
+            get_bias_cache().invalidate()
+            response = client.post("/add_bias_analysis", json={"thread_id": thread_id}, headers=headers)
+            assert response.status_code == 200, response.status_code
+
+        results[f"e2e/fast_then_bias/{size}"] = measure(add_bias, max(1, args.iterations // 4), items_per_call=size)
+
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 2000])
+    parser.add_argument("--max-depth", type=int, default=10)
+    parser.add_argument("--fixture", help="replay a recorded thread instead of synthetic forests")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--model-path", help="local bias model dir; enables tokenization/inference/bias routes")
+    parser.add_argument("--bias-texts", type=int, default=256, help="texts per inference benchmark call")
+    parser.add_argument("--only", choices=["stages", "e2e"], help="run one group only")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--baseline", help="previous JSON report to compare p95 against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p95 regression (0.25 = +25%%)")
+    args = parser.parse_args()
+
+    get_sentiment_analyzer()  # lexicon download is not part of the measurement
+    model = tokenizer = None
+    if args.model_path:
+        model, tokenizer = load_bias_model(args.model_path)
+
+    results = {}
+    for size in args.sizes:
+        # Oversample the forest so comment selection has something to choose from
+        reddit = FakeReddit(n_comments=size * 2, max_depth=args.max_depth, fixture=args.fixture)
+        if args.only != "e2e":
+            results.update(bench_stages(size, reddit, args, model, tokenizer))
+        if args.only != "stages":
+            results.update(bench_routes(size, reddit, args, with_bias=model is not None))
+
+    write_report(results, args.output)
+
+    if args.baseline:
+        regressions = compare_to_baseline(results, args.baseline, args.tolerance)
+        if regressions:
+            print(f"p95 regressions over {args.tolerance:.0%}: {regressions}", file=sys.stderr)
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
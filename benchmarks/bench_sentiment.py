@@ -0,0 +1,94 @@
+"""
+Micro-benchmark: VADER sentiment scoring on synthetic threads.
+
+Compares the old per-row Series.apply path with score_sentiment_batch
+(deduplication + memo + vectorized labels, optionally fanned out to a process
+pool) on synthetic threads with realistic duplicate bodies.
+
+Usage:
+    python benchmarks/bench_sentiment.py --sizes 2000 10000 50000 100000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import reddit_analysis  # noqa: E402
+from reddit_analysis import get_sentiment_analyzer, score_sentiment_batch, sentiment_labels  # noqa: E402
+
+WORDS = (
+    "great terrible love hate honestly awful amazing fine okay wrong right stupid brilliant "
+    "the a this that people thread post comment really very not never always think know"
+).split()
+REPEATED = ["[deleted]", "[removed]", "lol", "This.", "Thanks!", "Source?", "Same", "nope"]
+
+def make_bodies(n, duplicate_rate=0.15, seed=0):
+    """Synthetic comment bodies; duplicate_rate of them are common repeated replies."""
+    rng = random.Random(seed)
+    bodies = []
+    for _ in range(n):
+        if rng.random() < duplicate_rate:
+            bodies.append(rng.choice(REPEATED))
+        else:
+            bodies.append(" ".join(rng.choice(WORDS) for _ in range(rng.randrange(3, 60))))
+    return bodies
+
+def legacy_scores(df):
+    """Baseline: per-row apply for scores and labels."""
+    analyzer = get_sentiment_analyzer()
+    df['sentiment'] = df['body'].apply(lambda text: analyzer.polarity_scores(str(text))['compound'])
+    df['sentiment_label'] = df['sentiment'].apply(
+        lambda s: 'positive' if s >= 0.05 else 'negative' if s <= -0.05 else 'neutral'
+    )
+    return df
+
+def batch_scores(df):
+    scores = score_sentiment_batch(df['body'].tolist())
+    df['sentiment'] = scores
+    df['sentiment_label'] = sentiment_labels(scores)
+    return df
+
+def timed(fn, df):
+    start = time.perf_counter()
+    result = fn(df.copy())
+    return time.perf_counter() - start, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2000, 10000, 50000, 100000])
+    parser.add_argument("--duplicate-rate", type=float, default=0.15)
+    args = parser.parse_args()
+
+    get_sentiment_analyzer()  # lexicon download is not part of the measurement
+    print(f"{'comments':>10} {'legacy (s)':>11} {'batch (s)':>10} {'pool (s)':>9} {'memo hit (s)':>13}")
+    for size in args.sizes:
+        df = pd.DataFrame({"body": make_bodies(size, args.duplicate_rate)})
+
+        legacy_time, legacy_df = timed(legacy_scores, df)
+
+        # Serial batch path (pool disabled), cold memo
+        reddit_analysis._sentiment_memo.clear()
+        reddit_analysis.SENTIMENT_WORKERS = 0
+        batch_time, batch_df = timed(batch_scores, df)
+
+        # Process-pool path, cold memo (pool start-up excluded by a warm-up call)
+        reddit_analysis.SENTIMENT_WORKERS = max(2, os.cpu_count() or 1)
+        reddit_analysis.SENTIMENT_PARALLEL_THRESHOLD = 0
+        reddit_analysis._get_sentiment_pool().submit(int).result()
+        reddit_analysis._sentiment_memo.clear()
+        pool_time, pool_df = timed(batch_scores, df)
+
+        # Re-scoring the same thread: everything comes from the memo
+        memo_time, _ = timed(batch_scores, df)
+
+        assert (legacy_df['sentiment'].values == batch_df['sentiment'].values).all()
+        assert (legacy_df['sentiment_label'].values == pool_df['sentiment_label'].values).all()
+        print(f"{size:>10} {legacy_time:>11.3f} {batch_time:>10.3f} {pool_time:>9.3f} {memo_time:>13.4f}")
+
+if __name__ == "__main__":
+    main()
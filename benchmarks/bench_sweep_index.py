@@ -0,0 +1,91 @@
+"""
+Sweep summary benchmark: re-reading every metrics CSV vs. the incremental index.
+
+Builds a synthetic sweep of N runs (copies of the real hatebert_logs metric logs
+with jittered values, plus a results export every 10 runs) in a temp directory,
+then times:
+
+  rescan    the old create_eval_summary_df loop (read_csv of every file)
+  cold      SweepIndex.update() into an empty index
+  warm      update() with nothing changed (stat only)
+  1 changed update() after one run appended an eval row
+  queries   best_runs, learning_curves (10 runs), compare_runs
+
+Usage:
+    python benchmarks/bench_sweep_index.py --runs 100 500
+"""
+import os
+import re
+import sys
+import time
+import shutil
+import tempfile
+import argparse
+
+import numpy as np
+import pandas as pd
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_DIR, "bias_model", "finetuning"))
+
+from sweep_index import SweepIndex, SWEEPS_DIR  # noqa: E402
+
+def old_summary(dir_path):
+    """create_eval_summary_df before the index."""
+    all_metrics = []
+    for filename in [f for f in os.listdir(dir_path) if "metrics" in f and f.endswith(".csv")]:
+        run_id = re.search(r"metrics_(.+)\.csv", filename).group(1)
+        df = pd.read_csv(os.path.join(dir_path, filename))
+        eval_rows = df[df['eval_accuracy'].notna()]
+        if not eval_rows.empty:
+            last_eval = eval_rows.iloc[-1]
+            all_metrics.append({"run_id": run_id, "eval_loss": last_eval.get("eval_loss"),
+                                "eval_accuracy": last_eval.get("eval_accuracy"),
+                                "epoch": last_eval.get("epoch"), "step": last_eval.get("step")})
+    return pd.DataFrame(all_metrics).sort_values(by=["eval_accuracy"], ascending=False)
+
+def make_sweep(dir_path, n_runs, seed=0):
+    rng = np.random.default_rng(seed)
+    source = os.path.join(SWEEPS_DIR, "hatebert_logs")
+    templates = [pd.read_csv(os.path.join(source, f)) for f in sorted(os.listdir(source)) if f.startswith("metrics_")]
+    results = os.path.join(source, "results_t2835ru3.csv")
+    for i in range(n_runs):
+        df = templates[i % len(templates)].copy()
+        for column in ("loss", "eval_loss", "eval_accuracy"):
+            df[column] = df[column] * rng.uniform(0.9, 1.1)
+        df.to_csv(os.path.join(dir_path, f"metrics_run{i:05d}.csv"), index=False)
+        if i % 10 == 0:
+            shutil.copy(results, os.path.join(dir_path, f"results_run{i:05d}.csv"))
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, nargs="+", default=[100, 500])
+    args = parser.parse_args()
+
+    print(f"{'runs':>6} {'rescan':>9} {'cold':>9} {'warm':>9} {'1 changed':>10} {'best':>8} {'curves':>8} {'compare':>8}  (ms)")
+    for n_runs in args.runs:
+        with tempfile.TemporaryDirectory() as tmp:
+            sweep = os.path.join(tmp, "sweep")
+            os.mkdir(sweep)
+            make_sweep(sweep, n_runs)
+            with SweepIndex(os.path.join(tmp, "index.sqlite")) as index:
+                rescan, _ = timed(lambda: old_summary(sweep))
+                cold, _ = timed(lambda: index.update([sweep]))
+                warm, _ = timed(lambda: index.update([sweep]))
+                with open(os.path.join(sweep, "metrics_run00001.csv"), "a") as f:
+                    f.write(",,,3.0,3354,1.0,0.75,,,,,,,,\n")
+                changed, stats = timed(lambda: index.update([sweep]))
+                assert stats["ingested"] == 1
+                best, _ = timed(lambda: index.best_runs("eval_accuracy", n=10))
+                curves, _ = timed(lambda: index.learning_curves([f"run{i:05d}" for i in range(10)]))
+                compare, _ = timed(lambda: index.compare_runs(per_class=True))
+        print(f"{n_runs:>6} {rescan * 1000:>9.1f} {cold * 1000:>9.1f} {warm * 1000:>9.1f} {changed * 1000:>10.1f} "
+              f"{best * 1000:>8.1f} {curves * 1000:>8.1f} {compare * 1000:>8.1f}")
+
+if __name__ == "__main__":
+    main()
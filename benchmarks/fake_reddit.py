@@ -0,0 +1,218 @@
+"""
+In-process stand-in for the asyncpraw client, used by the benchmarks.
+
+FakeReddit serves comment forests either generated synthetically (configurable
+size, depth and fan-out) or replayed from a JSON fixture recorded from a real
+thread. It implements only what load_and_prepare_reddit_df and bulk analysis
+touch: reddit.submission(url=...), submission.load(), submission.comments
+(iterable, with an async replace_more) and reddit.subreddit(...).top(...).
+
+Record a fixture from a live thread (needs REDDIT_* credentials):
+    python benchmarks/fake_reddit.py record https://www.reddit.com/r/.../comments/abc123/... thread.json
+"""
+import os
+import sys
+import json
+import random
+import asyncio
+import argparse
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORDS = (
+    "great terrible love hate honestly awful amazing fine okay wrong right stupid brilliant "
+    "the a this that people thread post comment really very not never always think know "
+    "women men they them culture race disabled social"
+).split()
+REPEATED = ["[deleted]", "[removed]", "lol", "This.", "Thanks!", "Source?", "Same", "nope"]
+
+class FakeCommentForest(list):
+    """List of top-level comments with asyncpraw's replace_more() signature."""
+
+    def __init__(self, comments=(), replace_more_delay=0.0):
+        super().__init__(comments)
+        self.replace_more_delay = replace_more_delay
+
+    async def replace_more(self, limit=32, threshold=0):
+        if self.replace_more_delay:
+            await asyncio.sleep(self.replace_more_delay)
+        return []
+
+def make_forest(n_comments, max_depth=10, top_level_share=0.2, duplicate_rate=0.1, seed=0):
+    """Synthetic forest of n_comments; top_level_share of them start new conversations."""
+    rng = random.Random(seed)
+    top_level = []
+    open_nodes = []
+    for i in range(n_comments):
+        parent = rng.choice(open_nodes) if open_nodes and rng.random() > top_level_share else None
+        depth = parent.depth + 1 if parent else 0
+        if rng.random() < duplicate_rate:
+            body = rng.choice(REPEATED)
+        else:
+            body = " ".join(rng.choice(WORDS) for _ in range(rng.randrange(3, 120)))
+        node = SimpleNamespace(
+            id=f"c{i:x}",
+            parent_id=f"t1_{parent.id}" if parent else "t3_post",
+            author=f"user{rng.randrange(2000)}",
+            body=body,
+            score=int(rng.paretovariate(1.2)) - 1,
+            created_utc=1700000000 + i * 7,
+            replies=[],
+            depth=depth,
+        )
+        (parent.replies if parent else top_level).append(node)
+        if depth < max_depth:
+            open_nodes.append(node)
+    return top_level
+
+def forest_to_dicts(forest):
+    """Serialise a (fake or asyncpraw) comment forest to nested dicts for a fixture."""
+    out = []
+    stack = [(comment, out) for comment in reversed(list(forest))]
+    while stack:
+        comment, siblings = stack.pop()
+        node = {
+            "id": comment.id,
+            "parent_id": comment.parent_id,
+            "author": str(comment.author),
+            "body": comment.body,
+            "score": comment.score,
+            "created_utc": comment.created_utc,
+            "replies": [],
+        }
+        siblings.append(node)
+        stack.extend((reply, node["replies"]) for reply in reversed(list(getattr(comment, "replies", []) or [])))
+    return out
+
+def forest_from_dicts(nodes):
+    """Inverse of forest_to_dicts: nested dicts back to comment-like objects."""
+    top_level = []
+    stack = [(node, top_level) for node in reversed(nodes)]
+    while stack:
+        node, siblings = stack.pop()
+        comment = SimpleNamespace(**{k: v for k, v in node.items() if k != "replies"}, replies=[])
+        siblings.append(comment)
+        stack.extend((reply, comment.replies) for reply in reversed(node.get("replies", [])))
+    return top_level
+
+class FakeSubmission:
+    def __init__(self, submission_id, forest, title="Synthetic thread", selftext="", fetch_delay=0.0,
+                 replace_more_delay=0.0, subreddit="benchmark"):
+        self.id = submission_id
+        self.title = title
+        self.selftext = selftext
+        self.author = "op"
+        self.score = 1000
+        self.created_utc = 1700000000
+        self.permalink = f"/r/{subreddit}/comments/{submission_id}/synthetic_thread/"
+        self.comment_sort = "confidence"
+        self.comments = FakeCommentForest(forest, replace_more_delay)
+        self._fetch_delay = fetch_delay
+
+    async def load(self):
+        if self._fetch_delay:
+            await asyncio.sleep(self._fetch_delay)
+        return self
+
+class FakeSubreddit:
+    def __init__(self, reddit, name):
+        self._reddit = reddit
+        self.display_name = name
+
+    async def top(self, time_filter="day", limit=10):
+        for i in range(limit):
+            yield self._reddit._submission(f"{self.display_name[:3]}{i:04d}", self.display_name)
+
+class FakeReddit:
+    """
+    asyncpraw.Reddit replacement.
+
+    fetch_delay / replace_more_delay simulate Reddit round-trips (seconds). With
+    a fixture, every submission id replays the recorded forest.
+    """
+
+    def __init__(self, n_comments=2000, max_depth=10, fixture=None, fetch_delay=0.0, replace_more_delay=0.0):
+        self.n_comments = n_comments
+        self.max_depth = max_depth
+        self.fetch_delay = fetch_delay
+        self.replace_more_delay = replace_more_delay
+        self._fixture = None
+        if fixture:
+            with open(fixture) as f:
+                self._fixture = json.load(f)
+        self._forest = None
+
+    def _get_forest(self):
+        # Flattening never mutates the forest, so one instance is shared by all submissions
+        if self._forest is None:
+            if self._fixture is not None:
+                self._forest = forest_from_dicts(self._fixture["comments"])
+            else:
+                self._forest = make_forest(self.n_comments, self.max_depth)
+        return self._forest
+
+    def _submission(self, submission_id, subreddit="benchmark"):
+        meta = (self._fixture or {}).get("submission", {})
+        return FakeSubmission(
+            submission_id, self._get_forest(),
+            title=meta.get("title", "Synthetic thread"), selftext=meta.get("selftext", ""),
+            fetch_delay=self.fetch_delay, replace_more_delay=self.replace_more_delay, subreddit=subreddit,
+        )
+
+    async def submission(self, id=None, url=None):
+        from reddit_analysis import extract_submission_id
+        return self._submission(id or extract_submission_id(url))
+
+    async def subreddit(self, name):
+        return FakeSubreddit(self, name)
+
+    async def close(self):
+        pass
+
+async def record_fixture(url, path, replace_more_limit=8):
+    """Fetch a live thread with the real client and write it as a replayable fixture."""
+    from server_common import create_reddit_client
+
+    reddit = create_reddit_client()
+    try:
+        submission = await reddit.submission(url=url)
+        await submission.load()
+        submission.comment_sort = "best"
+        await submission.comments.replace_more(limit=replace_more_limit)
+        fixture = {
+            "url": url,
+            "submission": {"id": submission.id, "title": submission.title, "selftext": submission.selftext},
+            "comments": forest_to_dicts(submission.comments),
+        }
+    finally:
+        await reddit.close()
+
+    with open(path, "w") as f:
+        json.dump(fixture, f)
+    print(f"Recorded {url} to {path}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    record = sub.add_parser("record", help="record a live thread as a fixture")
+    record.add_argument("url")
+    record.add_argument("path")
+    record.add_argument("--replace-more-limit", type=int, default=8)
+    synth = sub.add_parser("synth", help="write a synthetic fixture")
+    synth.add_argument("path")
+    synth.add_argument("--comments", type=int, default=2000)
+    synth.add_argument("--max-depth", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.command == "record":
+        asyncio.run(record_fixture(args.url, args.path, args.replace_more_limit))
+    else:
+        fixture = {"submission": {"title": "Synthetic thread", "selftext": ""},
+                   "comments": forest_to_dicts(make_forest(args.comments, args.max_depth))}
+        with open(args.path, "w") as f:
+            json.dump(fixture, f)
+        print(f"Wrote {args.comments} synthetic comments to {args.path}")
+
+if __name__ == "__main__":
+    main()
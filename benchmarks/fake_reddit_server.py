@@ -0,0 +1,160 @@
+"""
+Local stand-in for the Reddit API, for benchmarks and offline load tests.
+
+Serves just enough of the OAuth API for asyncpraw: the token endpoint, thread
+comment listings (/comments/<id>) and subreddit top listings (/r/<sub>/top).
+Threads are synthetic and deterministic per submission id. A fraction of
+requests can be answered with 429 to exercise retry/backoff paths.
+
+Usage:
+    python benchmarks/fake_reddit_server.py --port 8081 --comments 2000 --rate-limit 0.05
+
+    REDDIT_URL=http://127.0.0.1:8081 REDDIT_OAUTH_URL=http://127.0.0.1:8081 \\
+    REDDIT_CLIENT_ID=x REDDIT_CLIENT_SECRET=x REDDIT_USER_AGENT=bench python main.py
+"""
+import time
+import random
+import asyncio
+import hashlib
+import argparse
+
+from aiohttp import web
+
+WORDS = ("the people this thread really think about why never always good bad "
+         "honestly comment post agree wrong right funny sad women men they them").split()
+
+def _seed(value: str) -> int:
+    return int(hashlib.md5(value.encode("utf-8")).hexdigest()[:8], 16)
+
+def make_comments(submission_id, n_comments, max_depth=10):
+    """Synthetic t1 forest for one submission, returned as nested listing children."""
+    rng = random.Random(_seed(submission_id))
+    nodes = []
+    top_level = []
+    for i in range(n_comments):
+        parent = rng.choice(nodes) if nodes and rng.random() < 0.75 else None
+        depth = parent["depth"] + 1 if parent else 0
+        if depth > max_depth:
+            parent, depth = None, 0
+        comment_id = f"{submission_id}c{i:x}"
+        node = {
+            "kind": "t1",
+            "depth": depth,
+            "data": {
+                "id": comment_id,
+                "name": f"t1_{comment_id}",
+                "parent_id": f"t1_{parent['data']['id']}" if parent else f"t3_{submission_id}",
+                "link_id": f"t3_{submission_id}",
+                "author": f"user{rng.randrange(2000)}",
+                "body": " ".join(rng.choice(WORDS) for _ in range(rng.randrange(3, 60))),
+                "score": rng.randrange(-20, 2000),
+                "created_utc": 1700000000.0 + i * 7,
+                "depth": depth,
+                "replies": "",
+            },
+        }
+        nodes.append(node)
+        if parent is None:
+            top_level.append(node)
+        else:
+            replies = parent["data"]["replies"]
+            if not replies:
+                replies = parent["data"]["replies"] = _listing([])
+            replies["data"]["children"].append(node)
+
+    for node in nodes:
+        node.pop("depth", None)
+    return top_level
+
+def make_submission(submission_id, subreddit, n_comments):
+    rng = random.Random(_seed(submission_id))
+    return {
+        "kind": "t3",
+        "data": {
+            "id": submission_id,
+            "name": f"t3_{submission_id}",
+            "title": f"Synthetic thread {submission_id}",
+            "author": f"op{rng.randrange(500)}",
+            "subreddit": subreddit,
+            "subreddit_name_prefixed": f"r/{subreddit}",
+            "permalink": f"/r/{subreddit}/comments/{submission_id}/synthetic_thread/",
+            "url": f"https://www.reddit.com/r/{subreddit}/comments/{submission_id}/synthetic_thread/",
+            "selftext": "",
+            "score": rng.randrange(10, 50000),
+            "upvote_ratio": round(rng.uniform(0.5, 1.0), 2),
+            "num_comments": n_comments,
+            "created_utc": 1700000000.0,
+        },
+    }
+
+def _listing(children):
+    return {"kind": "Listing", "data": {"children": children, "after": None, "before": None}}
+
+def create_app(n_comments=2000, rate_limit=0.0, latency_ms=0.0, subreddit="benchmark"):
+    stats = {"requests": 0, "rate_limited": 0}
+    rng = random.Random(0)
+
+    @web.middleware
+    async def fault_injection(request, handler):
+        stats["requests"] += 1
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+        if rate_limit and request.path != "/api/v1/access_token" and rng.random() < rate_limit:
+            stats["rate_limited"] += 1
+            return web.json_response({"message": "Too Many Requests", "error": 429}, status=429,
+                                     headers={"retry-after": "1"})
+        return await handler(request)
+
+    async def access_token(request):
+        return web.json_response({
+            "access_token": "fake-token", "token_type": "bearer",
+            "expires_in": 86400, "scope": "*",
+        })
+
+    async def comments(request):
+        submission_id = request.match_info["submission_id"]
+        sub = request.match_info.get("subreddit", subreddit)
+        return web.json_response([
+            _listing([make_submission(submission_id, sub, n_comments)]),
+            _listing(make_comments(submission_id, n_comments)),
+        ])
+
+    async def subreddit_top(request):
+        sub = request.match_info["subreddit"]
+        limit = int(request.query.get("limit", 25))
+        children = [make_submission(f"{sub[:3]}{i:04d}", sub, n_comments) for i in range(limit)]
+        return web.json_response(_listing(children))
+
+    async def subreddit_about(request):
+        sub = request.match_info["subreddit"]
+        return web.json_response({"kind": "t5", "data": {"display_name": sub, "name": f"t5_{sub}"}})
+
+    async def server_stats(request):
+        return web.json_response(dict(stats, uptime=time.time() - started))
+
+    app = web.Application(middlewares=[fault_injection])
+    app.router.add_post("/api/v1/access_token", access_token)
+    app.router.add_get("/comments/{submission_id}/", comments)
+    app.router.add_get("/comments/{submission_id}", comments)
+    app.router.add_get("/r/{subreddit}/comments/{submission_id}/{slug}/", comments)
+    app.router.add_get("/r/{subreddit}/top", subreddit_top)
+    app.router.add_get("/r/{subreddit}/top/", subreddit_top)
+    app.router.add_get("/r/{subreddit}/about/", subreddit_about)
+    app.router.add_get("/_stats", server_stats)
+    started = time.time()
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--comments", type=int, default=2000, help="comments per synthetic thread")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="added latency per request")
+    args = parser.parse_args()
+
+    app = create_app(args.comments, args.rate_limit, args.latency_ms)
+    web.run_app(app, host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Concurrent load generator for a running backend.
+
+Fires requests at one or more endpoints from N concurrent workers for a fixed
+duration (or request count) and reports per-endpoint p50/p95/p99 latency,
+throughput and error counts as JSON. Point the backend at the fake Reddit
+server (benchmarks/fake_reddit_server.py) to load-test without touching Reddit.
+
+Usage:
+    python benchmarks/load_test.py --base-url http://127.0.0.1:8080 --concurrency 8 --duration 30 \\
+        --endpoints receive_url_fast stream_url --threads 20
+"""
+import os
+import sys
+import time
+import json
+import random
+import argparse
+import threading
+import urllib.request
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_common import summarize, write_report  # noqa: E402
+
+def thread_urls(n, subreddit="benchmark"):
+    """Synthetic thread URLs; the fake Reddit server generates a forest for any id."""
+    return [f"https://www.reddit.com/r/{subreddit}/comments/lt{i:05d}/load_test/" for i in range(n)]
+
+def make_request(endpoint, url):
+    """Build (path, body) for one endpoint call."""
+    if endpoint == "receive_url_fast":
+        return "/receive_url_fast", {"url": url}
+    if endpoint == "stream_url":
+        return "/stream_url", {"url": url}
+    if endpoint == "receive_url":
+        return "/receive_url", {"url": url}
+    if endpoint == "add_bias_analysis":
+        return "/add_bias_analysis", {"thread_id": url.split("/comments/")[1].split("/")[0]}
+    raise ValueError(f"Unknown endpoint {endpoint}")
+
+def call(base_url, endpoint, url, timeout):
+    path, body = make_request(endpoint, url)
+    request = urllib.request.Request(
+        base_url.rstrip("/") + path,
+        data=json.dumps(body).encode("utf-8"),
+        headers={"Content-Type": "application/json", "Accept-Encoding": "gzip"},
+        method="POST",
+    )
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()  # streamed routes are timed until the last line
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except Exception:
+        status = "error"
+    return time.perf_counter() - start, status
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8080")
+    parser.add_argument("--endpoints", nargs="+", default=["receive_url_fast"],
+                        choices=["receive_url_fast", "stream_url", "receive_url", "add_bias_analysis"])
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to run")
+    parser.add_argument("--requests", type=int, help="stop after this many requests instead")
+    parser.add_argument("--threads", type=int, default=20, help="distinct thread URLs to rotate through")
+    parser.add_argument("--timeout", type=float, default=130.0)
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args()
+
+    urls = thread_urls(args.threads)
+    lock = threading.Lock()
+    samples = {endpoint: [] for endpoint in args.endpoints}
+    errors = {endpoint: {} for endpoint in args.endpoints}
+    issued = [0]
+    deadline = time.perf_counter() + args.duration
+
+    def worker(seed):
+        rng = random.Random(seed)
+        while time.perf_counter() < deadline:
+            with lock:
+                if args.requests is not None and issued[0] >= args.requests:
+                    return
+                issued[0] += 1
+            endpoint = rng.choice(args.endpoints)
+            latency, status = call(args.base_url, endpoint, rng.choice(urls), args.timeout)
+            with lock:
+                if status == 200:
+                    samples[endpoint].append(latency)
+                else:
+                    errors[endpoint][str(status)] = errors[endpoint].get(str(status), 0) + 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for seed in range(args.concurrency):
+            pool.submit(worker, seed)
+    wall = time.perf_counter() - started
+
+    results = {}
+    for endpoint in args.endpoints:
+        summary = summarize(samples[endpoint], wall_seconds=wall) if samples[endpoint] else {"calls": 0}
+        summary["errors"] = errors[endpoint]
+        summary["concurrency"] = args.concurrency
+        # RSS of the load generator itself is not interesting; use the server's /metrics instead
+        summary.pop("peak_rss_mb", None)
+        summary.pop("items_per_s", None)
+        results[f"load/{endpoint}"] = summary
+    write_report(results, args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import os
+import logging
+from types import SimpleNamespace
+
+# torch / transformers are imported inside the loaders so importing this module stays cheap
+logger = logging.getLogger(__name__)
+
+# Backend selection: torch (eager fp32), quantized (dynamic int8), torchscript, onnx
+BIAS_BACKEND = os.getenv("BIAS_BACKEND", "torch")
+SUPPORTED_BACKENDS = ["torch", "quantized", "torchscript", "onnx"]
+
+# Exported graphs are written next to the model files and reused on later loads
+TORCHSCRIPT_FILE = "model.torchscript.pt"
+ONNX_FILE = "model.onnx"
+
+class _TracedBackend:
+    """Wrap a traced/exported graph so it is called like a HF model: model(**inputs).logits."""
+
+    def __init__(self, run, name):
+        self._run = run
+        self.name = name
+
+    def __call__(self, input_ids, attention_mask, **kwargs):
+        return SimpleNamespace(logits=self._run(input_ids, attention_mask))
+
+    def eval(self):
+        return self
+
+def _example_inputs():
+    import torch
+
+    input_ids = torch.tensor([[101, 1045, 2066, 2023, 102], [101, 7592, 102, 0, 0]], dtype=torch.long)
+    attention_mask = (input_ids != 0).long()
+    return input_ids, attention_mask
+
+def _load_eager(model_path, **kwargs):
+    from transformers import BertForSequenceClassification
+
+    model = BertForSequenceClassification.from_pretrained(model_path, local_files_only=True, **kwargs)
+    model.eval()
+    return model
+
+def _load_quantized(model_path):
+    import torch
+
+    model = _load_eager(model_path)
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+def _load_torchscript(model_path):
+    import torch
+
+    traced_path = os.path.join(model_path, TORCHSCRIPT_FILE)
+    if not os.path.exists(traced_path):
+        logger.info(f"Tracing TorchScript graph to {traced_path}")
+        model = _load_eager(model_path, torchscript=True)
+        with torch.no_grad():
+            traced = torch.jit.trace(model, _example_inputs(), strict=False)
+        torch.jit.save(traced, traced_path)
+    traced = torch.jit.load(traced_path)
+    traced.eval()
+    return _TracedBackend(lambda ids, mask: traced(ids, mask)[0], "torchscript")
+
+def _load_onnx(model_path):
+    import torch
+
+    try:
+        import onnxruntime as ort
+    except ImportError as e:
+        raise ImportError("BIAS_BACKEND=onnx requires onnxruntime (pip install onnxruntime onnx)") from e
+
+    onnx_path = os.path.join(model_path, ONNX_FILE)
+    if not os.path.exists(onnx_path):
+        logger.info(f"Exporting ONNX graph to {onnx_path}")
+        model = _load_eager(model_path, torchscript=True)
+        dynamic = {0: "batch", 1: "sequence"}
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                _example_inputs(),
+                onnx_path,
+                input_names=["input_ids", "attention_mask"],
+                output_names=["logits"],
+                dynamic_axes={"input_ids": dynamic, "attention_mask": dynamic, "logits": {0: "batch"}},
+                opset_version=14,
+            )
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+
+    def run(input_ids, attention_mask):
+        logits = session.run(["logits"], {
+            "input_ids": input_ids.numpy(),
+            "attention_mask": attention_mask.numpy(),
+        })[0]
+        return torch.from_numpy(logits)
+
+    return _TracedBackend(run, "onnx")
+
+_LOADERS = {
+    "torch": _load_eager,
+    "quantized": _load_quantized,
+    "torchscript": _load_torchscript,
+    "onnx": _load_onnx,
+}
+
+def load_model_backend(model_path, backend=None):
+    """
+    Load the bias classifier with the requested CPU backend.
+
+    Every backend is called the same way (model(**inputs).logits), so the batched
+    inference path does not need to know which one is active.
+    """
+    backend = backend or BIAS_BACKEND
+    if backend not in _LOADERS:
+        raise ValueError(f"Unknown bias backend '{backend}', expected one of {SUPPORTED_BACKENDS}")
+    logger.info(f"Loading bias model with '{backend}' backend")
+    return _LOADERS[backend](model_path)
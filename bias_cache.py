@@ -0,0 +1,209 @@
+import os
+import json
+import hashlib
+import logging
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Cache sizing - memory tier is per worker, disk tier is shared across workers
+DEFAULT_CACHE_SIZE = int(os.getenv("BIAS_CACHE_SIZE", "50000"))
+DEFAULT_CACHE_DB = os.getenv("BIAS_CACHE_DB", "")
+# Disk tier bounds - /tmp is memory-backed on Cloud Run, so rows cost RAM
+DEFAULT_DB_MAX_ROWS = int(os.getenv("BIAS_CACHE_DB_MAX_ROWS", "100000"))
+DEFAULT_DB_TTL = float(os.getenv("BIAS_CACHE_DB_TTL", str(24 * 3600)))
+# Rows written (by this worker) between prunes
+PRUNE_EVERY = 1000
+
+# Global cache instance - created on first use
+_bias_cache = None
+_bias_cache_lock = threading.Lock()
+
+def normalize_text(text) -> str:
+    """Collapse whitespace so trivially different bodies share one cache entry."""
+    return " ".join(str(text).split())
+
+def model_revision(model_path: str) -> str:
+    """
+    Build a revision id for a local model directory.
+
+    Model directories are reused across downloads (e.g. /tmp/bias_model), so the
+    path alone is not enough: the weights file size/mtime and the config contents
+    are folded in so a re-downloaded model never serves stale predictions.
+    """
+    digest = hashlib.sha256(str(model_path).encode("utf-8"))
+    for filename in ("config.json", "model.safetensors"):
+        file_path = os.path.join(model_path, filename)
+        if not os.path.exists(file_path):
+            continue
+        stat = os.stat(file_path)
+        digest.update(f"{filename}:{stat.st_size}:{int(stat.st_mtime)}".encode("utf-8"))
+        if filename == "config.json":
+            with open(file_path, "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+def make_cache_key(model_id: str, text, max_length: int) -> str:
+    """Content-addressed key over (model revision, normalized text, max_length)."""
+    payload = f"{model_id}\x00{max_length}\x00{normalize_text(text)}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class BiasCache:
+    """
+    Two-tier cache for bias predictions.
+
+    The memory tier is a bounded LRU local to the worker process. The optional
+    SQLite tier lives on disk, so it is shared by all gunicorn workers and
+    survives worker restarts; rows older than db_ttl seconds are dropped and the
+    oldest rows beyond db_max_rows are evicted every PRUNE_EVERY writes.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_CACHE_SIZE, db_path: str = None,
+                 db_max_rows: int = DEFAULT_DB_MAX_ROWS, db_ttl: float = DEFAULT_DB_TTL):
+        self.max_entries = max_entries
+        self.db_path = db_path or None
+        self.db_max_rows = db_max_rows
+        self.db_ttl = db_ttl
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._writes_since_prune = 0
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.disk_pruned = 0
+
+        if self.db_path:
+            try:
+                self._db = sqlite3.connect(self.db_path, check_same_thread=False, timeout=5)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS bias_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL)"
+                )
+                columns = [row[1] for row in self._db.execute("PRAGMA table_info(bias_cache)")]
+                if "created" not in columns:
+                    # Tables from before pruning: their untimestamped rows go in the first prune
+                    self._db.execute("ALTER TABLE bias_cache ADD COLUMN created REAL")
+                self._db.execute("CREATE INDEX IF NOT EXISTS bias_cache_created ON bias_cache (created)")
+                self._db.commit()
+                with self._lock:
+                    self._prune()
+                logger.info(f"Bias cache disk tier at {self.db_path}")
+            except sqlite3.Error as e:
+                logger.warning(f"Bias cache disk tier disabled: {e}")
+                self._db = None
+
+    def get_many(self, keys) -> dict:
+        """Return {key: prediction} for every key found in either tier."""
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+
+            pending = [k for k in dict.fromkeys(keys) if k not in found]
+            if pending and self._db is not None:
+                try:
+                    for start in range(0, len(pending), 500):
+                        chunk = pending[start:start + 500]
+                        placeholders = ",".join("?" * len(chunk))
+                        rows = self._db.execute(
+                            f"SELECT key, value FROM bias_cache WHERE key IN ({placeholders})", chunk
+                        ).fetchall()
+                        for key, value in rows:
+                            found[key] = json.loads(value)
+                            self._remember(key, found[key])
+                            self.disk_hits += 1
+                except sqlite3.Error as e:
+                    logger.warning(f"Bias cache disk read failed: {e}")
+
+            for key in keys:
+                if key in found:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+        return found
+
+    def put_many(self, items: dict):
+        """Store {key: prediction} in both tiers; None (failed inference) is never stored."""
+        items = {key: value for key, value in items.items() if value is not None}
+        if not items:
+            return
+        with self._lock:
+            for key, value in items.items():
+                self._remember(key, value)
+            if self._db is not None:
+                now = time.time()
+                try:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO bias_cache (key, value, created) VALUES (?, ?, ?)",
+                        [(key, json.dumps(value), now) for key, value in items.items()],
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.warning(f"Bias cache disk write failed: {e}")
+                self._writes_since_prune += len(items)
+                if self._writes_since_prune >= PRUNE_EVERY:
+                    self._prune()
+
+    def _prune(self):
+        """Drop expired disk rows, then the oldest beyond db_max_rows (lock held by caller)."""
+        self._writes_since_prune = 0
+        try:
+            removed = self._db.execute(
+                "DELETE FROM bias_cache WHERE created IS NULL OR created < ?", (time.time() - self.db_ttl,)
+            ).rowcount
+            excess = self._db.execute("SELECT COUNT(*) FROM bias_cache").fetchone()[0] - self.db_max_rows
+            if excess > 0:
+                removed += self._db.execute(
+                    "DELETE FROM bias_cache WHERE key IN (SELECT key FROM bias_cache ORDER BY created LIMIT ?)",
+                    (excess,),
+                ).rowcount
+            self._db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Bias cache disk prune failed: {e}")
+            return
+        if removed:
+            self.disk_pruned += removed
+            logger.info(f"Bias cache pruned {removed} disk rows")
+
+    def invalidate(self):
+        """Drop the memory tier (disk entries are keyed by model revision and simply stop matching until pruned)."""
+        with self._lock:
+            self._memory.clear()
+        logger.info("Bias cache invalidated")
+
+    def stats(self) -> dict:
+        """Hit/miss counters for logging and health endpoints."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._memory),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "disk_tier": self._db is not None,
+            "disk_pruned": self.disk_pruned,
+        }
+
+    def _remember(self, key, value):
+        """Insert into the memory LRU, evicting the oldest entries (lock held by caller)."""
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+def get_bias_cache() -> BiasCache:
+    """Get or create the process-wide bias cache (configured from env vars)."""
+    global _bias_cache
+    if _bias_cache is None:
+        with _bias_cache_lock:
+            if _bias_cache is None:
+                _bias_cache = BiasCache(DEFAULT_CACHE_SIZE, DEFAULT_CACHE_DB)
+    return _bias_cache
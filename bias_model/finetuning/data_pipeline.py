@@ -0,0 +1,220 @@
+"""
+Tokenization and batching for fine-tuning / evaluating the bias model.
+
+- get_tokenizer() loads each tokenizer once per process.
+- pretokenize() tokenizes a split once (fast tokenizer, truncation only, no
+  padding) and saves it as an Arrow dataset under TOKENIZED_CACHE_DIR, keyed by a
+  hash of the tokenizer, max_length and the texts + labels. Later runs load it
+  memory-mapped instead of re-tokenizing.
+- DynamicPaddingCollator pads each batch to its own longest row (optionally a
+  multiple of 8), built with NumPy instead of per-row torch.tensor calls.
+- LengthGroupedBatchSampler batches rows of similar length so little padding is
+  needed, while still shuffling between epochs.
+
+With a DataLoader:
+    train = pretokenize(train_df, "GroNLP/hateBERT")
+    loader = make_dataloader(train, batch_size=16, shuffle=True)
+
+With the HF Trainer (it groups by the same "length" column):
+    args = TrainingArguments(..., group_by_length=True, length_column_name="length")
+    Trainer(..., train_dataset=train, data_collator=DynamicPaddingCollator(tokenizer.pad_token_id))
+"""
+import os
+import json
+import shutil
+import hashlib
+from functools import lru_cache
+
+import numpy as np
+
+DEFAULT_MODEL_NAME = "GroNLP/hateBERT"
+DEFAULT_MAX_LENGTH = 512
+TOKENIZED_CACHE_DIR = os.getenv(
+    "TOKENIZED_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".tokenized_cache")
+)
+# Texts per tokenizer call while pre-tokenizing
+TOKENIZE_BATCH_SIZE = 1000
+# Length-grouped batches are sorted within windows of this many batches, then shuffled
+LENGTH_GROUP_WINDOW = 50
+
+@lru_cache(maxsize=None)
+def get_tokenizer(name_or_path=DEFAULT_MODEL_NAME):
+    """Fast tokenizer, loaded once per process."""
+    from transformers import AutoTokenizer
+
+    return AutoTokenizer.from_pretrained(name_or_path, use_fast=True)
+
+def tokenizer_fingerprint(tokenizer) -> str:
+    """Hash of everything that changes token ids: vocab, normalizer, special tokens."""
+    backend = getattr(tokenizer, "backend_tokenizer", None)
+    if backend is not None:
+        state = backend.to_str()
+    else:
+        state = json.dumps(sorted(tokenizer.get_vocab().items())) + str(tokenizer.all_special_tokens)
+    return hashlib.sha256(state.encode("utf-8")).hexdigest()
+
+def dataset_fingerprint(texts, labels=None) -> str:
+    digest = hashlib.sha256()
+    for text in texts:
+        digest.update(str(text).encode("utf-8"))
+        digest.update(b"\0")
+    if labels is not None:
+        digest.update(np.asarray(labels, dtype=np.int64).tobytes())
+    return digest.hexdigest()
+
+def tokenize_texts(tokenizer, texts, max_length=DEFAULT_MAX_LENGTH, batch_size=TOKENIZE_BATCH_SIZE):
+    """Token ids per text (truncated, unpadded), tokenized in large batches."""
+    input_ids = []
+    for start in range(0, len(texts), batch_size):
+        encoded = tokenizer(
+            texts[start:start + batch_size], truncation=True, max_length=max_length,
+            padding=False, return_attention_mask=False, return_token_type_ids=False,
+        )
+        input_ids.extend(encoded["input_ids"])
+    return input_ids
+
+def pretokenize(df, tokenizer=DEFAULT_MODEL_NAME, text_col="post", label_col="label",
+                max_length=DEFAULT_MAX_LENGTH, cache_dir=TOKENIZED_CACHE_DIR):
+    """
+    Tokenized datasets.Dataset (input_ids, length, label) for a split, cached on disk.
+
+    tokenizer is a tokenizer or a name / path for get_tokenizer. The result is
+    memory-mapped from the Arrow cache, so re-running a sweep does not tokenize
+    again; any change to the texts, labels, tokenizer or max_length misses the
+    cache.
+    """
+    from datasets import Dataset, load_from_disk
+
+    if isinstance(tokenizer, str):
+        tokenizer = get_tokenizer(tokenizer)
+    texts = df[text_col].astype(str).tolist()
+    labels = df[label_col].astype(int).to_numpy() if label_col in df.columns else None
+
+    key = hashlib.sha256(
+        f"{tokenizer_fingerprint(tokenizer)}:{max_length}:{dataset_fingerprint(texts, labels)}".encode("utf-8")
+    ).hexdigest()[:24]
+    path = os.path.join(cache_dir, key)
+    if os.path.exists(os.path.join(path, "dataset_info.json")):
+        return load_from_disk(path)
+
+    input_ids = tokenize_texts(tokenizer, texts, max_length)
+    columns = {"input_ids": input_ids, "length": [len(ids) for ids in input_ids]}
+    if labels is not None:
+        columns["label"] = labels.tolist()
+
+    # Write to a temp dir first so an interrupted run never leaves a half-written cache entry
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    Dataset.from_dict(columns).save_to_disk(tmp_path)
+    try:
+        os.replace(tmp_path, path)
+    except OSError:
+        # Another process cached the same split first
+        if not os.path.exists(path):
+            raise
+        shutil.rmtree(tmp_path, ignore_errors=True)
+    return load_from_disk(path)
+
+class DynamicPaddingCollator:
+    """
+    Collate unpadded rows into input_ids / attention_mask / labels tensors.
+
+    Pads to the longest row of the batch (rounded up to pad_to_multiple_of, e.g.
+    8 for tensor cores) instead of max_length.
+    """
+
+    def __init__(self, pad_token_id=0, pad_to_multiple_of=None):
+        self.pad_token_id = pad_token_id
+        self.pad_to_multiple_of = pad_to_multiple_of
+
+    def __call__(self, batch):
+        import torch
+
+        rows = [item["input_ids"] for item in batch]
+        lengths = np.fromiter((len(ids) for ids in rows), dtype=np.int64, count=len(rows))
+        width = int(lengths.max()) if len(rows) else 0
+        if self.pad_to_multiple_of:
+            width = -(-width // self.pad_to_multiple_of) * self.pad_to_multiple_of
+
+        input_ids = np.full((len(rows), width), self.pad_token_id, dtype=np.int64)
+        for i, ids in enumerate(rows):
+            input_ids[i, :len(ids)] = ids
+        attention_mask = (np.arange(width) < lengths[:, None]).astype(np.int64)
+
+        collated = {"input_ids": torch.from_numpy(input_ids), "attention_mask": torch.from_numpy(attention_mask)}
+        label_key = "label" if "label" in batch[0] else "labels" if "labels" in batch[0] else None
+        if label_key is not None:
+            # The model expects 'labels'
+            collated["labels"] = torch.as_tensor([item[label_key] for item in batch], dtype=torch.long)
+        return collated
+
+class LengthGroupedBatchSampler:
+    """
+    Batches of row indices with similar lengths.
+
+    Each epoch the rows are shuffled, split into windows of LENGTH_GROUP_WINDOW
+    batches, sorted by length within each window and cut into batches; the
+    batch order is then shuffled. Call set_epoch() for a new shuffle per epoch.
+    """
+
+    def __init__(self, lengths, batch_size, shuffle=True, seed=42, drop_last=False, window=LENGTH_GROUP_WINDOW):
+        self.lengths = np.asarray(lengths)
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.seed = seed
+        self.drop_last = drop_last
+        self.window = window
+        self.epoch = 0
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def __len__(self):
+        if self.drop_last:
+            return len(self.lengths) // self.batch_size
+        return -(-len(self.lengths) // self.batch_size)
+
+    def __iter__(self):
+        rng = np.random.default_rng(self.seed + self.epoch)
+        order = rng.permutation(len(self.lengths)) if self.shuffle else np.arange(len(self.lengths))
+        span = self.batch_size * self.window
+        batches = []
+        for start in range(0, len(order), span):
+            chunk = order[start:start + span]
+            chunk = chunk[np.argsort(-self.lengths[chunk], kind="stable")]
+            batches.extend(chunk[i:i + self.batch_size] for i in range(0, len(chunk), self.batch_size))
+        if self.drop_last:
+            batches = [batch for batch in batches if len(batch) == self.batch_size]
+        if self.shuffle:
+            batches = [batches[i] for i in rng.permutation(len(batches))]
+        for batch in batches:
+            yield batch.tolist()
+
+def make_dataloader(dataset, batch_size=8, shuffle=True, seed=42, pad_token_id=None,
+                    pad_to_multiple_of=None, num_workers=0, tokenizer=DEFAULT_MODEL_NAME):
+    """DataLoader over a pretokenize() dataset with length grouping and dynamic padding."""
+    from torch.utils.data import DataLoader
+
+    if pad_token_id is None:
+        pad_token_id = (get_tokenizer(tokenizer) if isinstance(tokenizer, str) else tokenizer).pad_token_id
+    sampler = LengthGroupedBatchSampler(dataset["length"], batch_size, shuffle=shuffle, seed=seed)
+    return DataLoader(
+        dataset,
+        batch_sampler=sampler,
+        collate_fn=DynamicPaddingCollator(pad_token_id, pad_to_multiple_of),
+        num_workers=num_workers,
+    )
+
+def padding_stats(lengths, batch_size, max_length=DEFAULT_MAX_LENGTH, seed=42) -> dict:
+    """Share of padded token slots: fixed max_length padding vs. length-grouped dynamic padding."""
+    lengths = np.asarray(lengths)
+    real = int(lengths.sum())
+    dynamic = sum(
+        len(batch) * int(lengths[batch].max())
+        for batch in LengthGroupedBatchSampler(lengths, batch_size, seed=seed)
+    )
+    fixed = len(lengths) * max_length
+    return {
+        "real_tokens": real,
+        "fixed_padding_ratio": round(1 - real / fixed, 4) if fixed else 0.0,
+        "dynamic_padding_ratio": round(1 - real / dynamic, 4) if dynamic else 0.0,
+    }
@@ -22,6 +22,9 @@ import json
 import re
 from tensorboard.backend.event_processing.event_accumulator import EventAccumulator
 
+from data_pipeline import get_tokenizer, pretokenize, make_dataloader, DynamicPaddingCollator, DEFAULT_MODEL_NAME
+from sweep_index import SweepIndex
+
 
 #for portabitliy on your local machine do:
 #conda env export --no-builds > environment.yml
@@ -37,35 +40,13 @@ print(sys.executable)
 
 
 def create_eval_summary_df(dir_path):
-    # Directory where your CSVs are stored
-    csv_dir = dir_path #"/content/drive/MyDrive/capstone_2025/hatebert_logs/"
-
-    csv_files = [f for f in os.listdir(dir_path) if "metrics" in f and f.endswith(".csv")]
-
-    all_metrics = []
-    print(f"Found {len(csv_files)} metric files in {csv_dir}")
-    # List all metric CSV files
-    for filename in csv_files:
-        match = re.search(r"metrics_(.+)\.csv", filename)
-        run_id = match.group(1) if match else None
-        file_path = os.path.join(csv_dir, filename)
-        df = pd.read_csv(file_path)
-
-        # ✅ Only consider rows with real eval_accuracy values
-        eval_rows = df[df['eval_accuracy'].notna()]
-
-        if not eval_rows.empty:
-            last_eval = eval_rows.iloc[-1]
-            all_metrics.append({
-                "run_id": run_id,
-                "eval_loss": last_eval.get("eval_loss", None),
-                "eval_accuracy": last_eval.get("eval_accuracy", None),
-                "epoch": last_eval.get("epoch", None),
-                "step": last_eval.get("step", None)
-            })
-
-    summary_df = pd.DataFrame(all_metrics)
-    summary_df = summary_df.sort_values(by=["eval_accuracy"], ascending=False)
+    # Last eval row per run, served from the incremental sweep index (sweep_index.py):
+    # only metric files added or changed since the last call are re-read. Like the
+    # old os.listdir scan, only files directly in dir_path count
+    with SweepIndex() as index:
+        stats = index.update([dir_path], recursive=False)
+        summary_df = index.eval_summary([dir_path], recursive=False)
+    print(f"Found {len(summary_df)} evaluated runs in {dir_path} ({stats['ingested']} files re-indexed)")
     return summary_df
 
 def process_csv_social_bias(dir_path):
@@ -120,20 +101,32 @@ class WeightedTrainer(Trainer):
         return (loss, outputs) if return_outputs else loss
 
 def tokenize_function(examples):
-    model_name = "GroNLP/hateBERT"
-    tokenizer = AutoTokenizer.from_pretrained(model_name)
-    return tokenizer(examples["post"], padding="max_length", truncation=True)
+    # Kept for Dataset.map callers: truncation only, the collator pads each batch to its longest row.
+    # New code should use build_sweep_datasets (cached, no per-run tokenizing)
+    tokenizer = get_tokenizer(DEFAULT_MODEL_NAME)
+    return tokenizer(examples["post"], truncation=True)
 
 # Define a custom collate function for the DataLoader
 def custom_collate_fn(batch):
-    # Select and collate only the necessary columns
-    collated_batch = {}
-    collated_batch['input_ids'] = torch.tensor([item['input_ids'] for item in batch], dtype=torch.long)
-    collated_batch['attention_mask'] = torch.tensor([item['attention_mask'] for item in batch], dtype=torch.long)
-    if 'label' in batch[0]: # Check if label exists in the first item
-         collated_batch['labels'] = torch.tensor([item['label'] for item in batch], dtype=torch.long) # Note: model expects 'labels'
-
-    return collated_batch
+    # Pads to the longest row of the batch (not max_length); returns input_ids, attention_mask, labels
+    return sweep_data_collator()(batch)
+
+def build_sweep_datasets(*dfs, model_name=DEFAULT_MODEL_NAME):
+    """Unpadded, Arrow-cached datasets (input_ids, length, label) for each split, in order."""
+    tokenizer = get_tokenizer(model_name)
+    return [pretokenize(df, tokenizer) for df in dfs]
+
+def sweep_data_collator(model_name=DEFAULT_MODEL_NAME, pad_to_multiple_of=None):
+    """data_collator for the Trainer: dynamic padding (use with TrainingArguments(group_by_length=True))."""
+    return DynamicPaddingCollator(get_tokenizer(model_name).pad_token_id, pad_to_multiple_of)
+
+def make_train_dataloader(dataset, batch_size=8, model_name=DEFAULT_MODEL_NAME, seed=42):
+    """Length-grouped, dynamically padded DataLoader for manual training loops."""
+    return make_dataloader(dataset, batch_size=batch_size, shuffle=True, seed=seed, tokenizer=model_name)
+
+def make_eval_dataloader(dataset, batch_size=8, model_name=DEFAULT_MODEL_NAME):
+    """Dynamically padded DataLoader in dataset order, so predictions line up with test_df rows."""
+    return DataLoader(dataset, batch_size=batch_size, shuffle=False, collate_fn=sweep_data_collator(model_name))
 
 def load_csv_sweep_results_csv(dir_path, csv_filename="results.csv"):
     # Load the CSV file into a DataFrame
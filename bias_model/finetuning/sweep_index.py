@@ -0,0 +1,457 @@
+"""
+Incremental SQLite index of model-sweep logs.
+
+Ingests the HF Trainer metric logs (metrics_<run>.csv, focal_metrics_<run>.csv)
+and test-set prediction exports (results_<run>.csv, results_focal_<run>.csv)
+under the sweep directories, so summaries no longer re-read every CSV:
+
+- update() stats every file and only re-reads those whose size / mtime changed;
+  a changed file whose content hash is unchanged is not re-ingested. Files are
+  parsed on a process pool and written in one transaction; deleted files drop
+  out of the index.
+- Metric logs are stored long-format (one row per logged value), indexed by
+  metric, so best-run, learning-curve and comparison queries are single SQL
+  queries. Results files are reduced to accuracy / macro F1 / log loss and
+  per-class precision / recall / F1 at ingestion.
+
+    index = SweepIndex()
+    index.update()
+    index.best_runs("eval_accuracy", n=5)
+    index.learning_curves(["t2835ru3"], metrics=("loss", "eval_loss"))
+    index.compare_runs(["t2835ru3", "wpwb9oxw"], per_class=True)
+
+Usage:
+    python sweep_index.py --best eval_accuracy
+    python sweep_index.py --curve t2835ru3 --compare t2835ru3 wpwb9oxw
+"""
+import os
+import re
+import io
+import csv
+import math
+import time
+import sqlite3
+import hashlib
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+SWEEPS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "model_sweeps")
+DEFAULT_ROOTS = tuple(
+    os.path.join(SWEEPS_DIR, name) for name in ("hatebert_logs", "logs_focal", "testdata_results-logs")
+)
+SWEEP_INDEX_DB = os.getenv("SWEEP_INDEX_DB", os.path.join(SWEEPS_DIR, ".sweep_index.sqlite"))
+# Parser processes; small updates are parsed in-process
+SWEEP_INDEX_WORKERS = int(os.getenv("SWEEP_INDEX_WORKERS", str(min(8, os.cpu_count() or 1))))
+PARALLEL_MIN_FILES = 4
+
+# metrics_<run>.csv, focal_metrics_<run>.csv, results_<run>.csv, results_focal_<run>.csv
+FILE_PATTERN = re.compile(r"^(?:(focal)_)?(metrics|results)_(?:(focal)_)?(.+)\.csv$")
+# Logged once per eval: the row that create_eval_summary_df reports
+EVAL_MARKER = "eval_accuracy"
+# Per-run test-set metrics, stored in the results table
+RESULT_METRICS = ("test_accuracy", "test_macro_f1", "test_log_loss")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    file_id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL, kind TEXT NOT NULL, run_id TEXT NOT NULL,
+    family TEXT NOT NULL, mtime_ns INTEGER, size INTEGER, sha256 TEXT, rows INTEGER, ingested REAL
+);
+CREATE INDEX IF NOT EXISTS files_run ON files (run_id);
+CREATE TABLE IF NOT EXISTS metrics (
+    file_id INTEGER NOT NULL, row INTEGER NOT NULL, step INTEGER, epoch REAL, metric TEXT NOT NULL, value REAL
+);
+CREATE INDEX IF NOT EXISTS metrics_by_metric ON metrics (metric, file_id, row);
+CREATE INDEX IF NOT EXISTS metrics_by_row ON metrics (file_id, row);
+CREATE TABLE IF NOT EXISTS results (
+    file_id INTEGER PRIMARY KEY, n INTEGER, test_accuracy REAL, test_macro_f1 REAL, test_log_loss REAL
+);
+CREATE TABLE IF NOT EXISTS result_classes (
+    file_id INTEGER NOT NULL, label TEXT NOT NULL, support INTEGER, precision REAL, recall REAL, f1 REAL
+);
+CREATE INDEX IF NOT EXISTS result_classes_file ON result_classes (file_id);
+"""
+
+def classify_file(filename):
+    """(kind, run_id, family) for a sweep log file name, or None for other files."""
+    match = FILE_PATTERN.match(filename)
+    if match is None:
+        return None
+    focal_prefix, kind, focal_infix, run_id = match.groups()
+    return kind, run_id, "focal" if focal_prefix or focal_infix else "hatebert"
+
+def _file_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def _to_float(cell):
+    try:
+        value = float(cell)
+    except ValueError:
+        return None
+    return None if math.isnan(value) else value
+
+def _parse_metrics(data):
+    """
+    Long-format (row, step, epoch, metric, value) tuples for every logged value.
+
+    Trainer logs are a few dozen short rows, so the csv module is several times
+    faster here than building a DataFrame per file.
+    """
+    reader = csv.reader(io.StringIO(data.decode("utf-8")))
+    header = next(reader, [])
+    step_col = header.index("step") if "step" in header else None
+    epoch_col = header.index("epoch") if "epoch" in header else None
+    parsed, n_rows = [], 0
+    for row_number, cells in enumerate(reader):
+        n_rows += 1
+        values = [_to_float(cell) if cell else None for cell in cells]
+        step = values[step_col] if step_col is not None and step_col < len(values) else None
+        epoch = values[epoch_col] if epoch_col is not None and epoch_col < len(values) else None
+        step = int(step) if step is not None else None
+        for col, value in enumerate(values):
+            if value is not None and col != step_col and col != epoch_col and col < len(header):
+                parsed.append((row_number, step, epoch, header[col], value))
+    return parsed, n_rows
+
+def _parse_results(data):
+    """Test-set summary and per-class rows from a prediction export."""
+    df = pd.read_csv(io.BytesIO(data))
+    actual = df["actual_bias_type"].fillna("Neutral").astype(str).to_numpy()
+    predicted = df["predicted_bias_type"].fillna("Neutral").astype(str).to_numpy()
+    labels = sorted(set(actual) | set(predicted))
+
+    classes, f1s = [], []
+    for label in labels:
+        tp = int(np.sum((actual == label) & (predicted == label)))
+        support = int(np.sum(actual == label))
+        n_predicted = int(np.sum(predicted == label))
+        precision = tp / n_predicted if n_predicted else 0.0
+        recall = tp / support if support else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        classes.append((label, support, precision, recall, f1))
+        if support:
+            f1s.append(f1)
+
+    log_loss = None
+    prob_columns = [f"prob_{label}" for label in labels]
+    if all(column in df.columns for column in prob_columns):
+        probs = df[prob_columns].to_numpy(dtype=float)
+        true_prob = probs[np.arange(len(df)), np.searchsorted(labels, actual)]
+        log_loss = float(-np.mean(np.log(np.clip(true_prob, 1e-12, 1.0)))) if len(df) else None
+
+    summary = (
+        len(df),
+        float(np.mean(actual == predicted)) if len(df) else None,
+        float(np.mean(f1s)) if f1s else None,
+        log_loss,
+    )
+    return summary, classes
+
+def parse_file(path, kind, known_sha256=None):
+    """
+    Read and parse one log file (runs in a worker process).
+
+    Returns {"sha256", "unchanged": True} when the content hash matches
+    known_sha256, else the parsed rows for the given kind.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    sha256 = _file_hash(data)
+    if sha256 == known_sha256:
+        return {"sha256": sha256, "unchanged": True}
+    if kind == "metrics":
+        rows, n_rows = _parse_metrics(data)
+        return {"sha256": sha256, "rows": n_rows, "metrics": rows}
+    summary, classes = _parse_results(data)
+    return {"sha256": sha256, "rows": summary[0], "summary": summary, "classes": classes}
+
+class SweepIndex:
+    """SQLite-backed index of sweep metric logs and test results."""
+
+    def __init__(self, db_path=SWEEP_INDEX_DB):
+        self.db_path = db_path or ":memory:"
+        self._db = sqlite3.connect(self.db_path, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _scan(self, roots, recursive=True):
+        """{path: (kind, run_id, family, mtime_ns, size)} for every sweep log under roots."""
+        found = {}
+        for root in roots:
+            for dirpath, dirnames, filenames in os.walk(os.path.abspath(root)):
+                if not recursive:
+                    dirnames.clear()
+                for filename in filenames:
+                    info = classify_file(filename)
+                    if info is None:
+                        continue
+                    path = os.path.join(dirpath, filename)
+                    stat = os.stat(path)
+                    found[path] = (*info, stat.st_mtime_ns, stat.st_size)
+        return found
+
+    def update(self, roots=DEFAULT_ROOTS, workers=SWEEP_INDEX_WORKERS, recursive=True) -> dict:
+        """
+        Bring the index in line with the files under roots; returns what changed.
+        With recursive=False only files directly in each root are scanned (and
+        only those can be removed from the index).
+        """
+        start = time.perf_counter()
+        roots = [os.path.abspath(root) for root in roots]
+        found = self._scan(roots, recursive)
+        known = {
+            path: (file_id, mtime_ns, size, sha256)
+            for file_id, path, mtime_ns, size, sha256 in self._db.execute(
+                "SELECT file_id, path, mtime_ns, size, sha256 FROM files"
+            )
+            if any(path.startswith(root + os.sep) and (recursive or os.path.dirname(path) == root)
+                   for root in roots)
+        }
+
+        stale = [
+            path for path, (_, _, _, mtime_ns, size) in found.items()
+            if path not in known or known[path][1:3] != (mtime_ns, size)
+        ]
+        jobs = [(path, found[path][0], known[path][3] if path in known else None) for path in stale]
+        if workers > 1 and len(jobs) >= PARALLEL_MIN_FILES:
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(jobs)), mp_context=multiprocessing.get_context("spawn")
+            ) as pool:
+                parsed = list(pool.map(parse_file, *zip(*jobs)))
+        else:
+            parsed = [parse_file(*job) for job in jobs]
+
+        removed = [known[path][0] for path in known if path not in found]
+        stats = {"scanned": len(found), "ingested": 0, "touched": 0, "removed": len(removed)}
+        now = time.time()
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            for file_id in removed:
+                self._delete_rows(file_id, drop_file=True)
+            for path, result in zip(stale, parsed):
+                kind, run_id, family, mtime_ns, size = found[path]
+                if result.get("unchanged"):
+                    # Same content (e.g. copied or touched): only refresh the stat fields
+                    self._db.execute(
+                        "UPDATE files SET mtime_ns = ?, size = ? WHERE path = ?", (mtime_ns, size, path)
+                    )
+                    stats["touched"] += 1
+                    continue
+                self._ingest(path, kind, run_id, family, mtime_ns, size, now, result)
+                stats["ingested"] += 1
+            self._db.execute("COMMIT")
+        except Exception:
+            self._db.execute("ROLLBACK")
+            raise
+        stats["unchanged"] = stats["scanned"] - stats["ingested"] - stats["touched"]
+        stats["seconds"] = round(time.perf_counter() - start, 3)
+        return stats
+
+    def _delete_rows(self, file_id, drop_file=False):
+        for table in ("metrics", "results", "result_classes"):
+            self._db.execute(f"DELETE FROM {table} WHERE file_id = ?", (file_id,))
+        if drop_file:
+            self._db.execute("DELETE FROM files WHERE file_id = ?", (file_id,))
+
+    def _ingest(self, path, kind, run_id, family, mtime_ns, size, now, result):
+        row = self._db.execute("SELECT file_id FROM files WHERE path = ?", (path,)).fetchone()
+        if row is None:
+            file_id = self._db.execute(
+                "INSERT INTO files (path, kind, run_id, family) VALUES (?, ?, ?, ?)", (path, kind, run_id, family)
+            ).lastrowid
+        else:
+            file_id = row[0]
+            self._delete_rows(file_id)
+        self._db.execute(
+            "UPDATE files SET kind = ?, run_id = ?, family = ?, mtime_ns = ?, size = ?, sha256 = ?, rows = ?, "
+            "ingested = ? WHERE file_id = ?",
+            (kind, run_id, family, mtime_ns, size, result["sha256"], result["rows"], now, file_id),
+        )
+        if kind == "metrics":
+            self._db.executemany(
+                "INSERT INTO metrics (file_id, row, step, epoch, metric, value) VALUES (?, ?, ?, ?, ?, ?)",
+                [(file_id, *values) for values in result["metrics"]],
+            )
+        else:
+            self._db.execute(
+                "INSERT INTO results (file_id, n, test_accuracy, test_macro_f1, test_log_loss) VALUES (?, ?, ?, ?, ?)",
+                (file_id, *result["summary"]),
+            )
+            self._db.executemany(
+                "INSERT INTO result_classes (file_id, label, support, precision, recall, f1) VALUES (?, ?, ?, ?, ?, ?)",
+                [(file_id, *values) for values in result["classes"]],
+            )
+
+    def _query(self, sql, params=()):
+        return pd.read_sql_query(sql, self._db, params=params)
+
+    @staticmethod
+    def _filters(run_ids=None, family=None, roots=None, alias="f", recursive=True):
+        """
+        SQL WHERE fragments + params restricting files by run, family and directory
+        (files directly in roots only, with recursive=False).
+        """
+        clauses, params = [], []
+        if run_ids is not None:
+            run_ids = [run_ids] if isinstance(run_ids, str) else list(run_ids)
+            clauses.append(f"{alias}.run_id IN ({','.join('?' * len(run_ids))})")
+            params.extend(run_ids)
+        if family is not None:
+            clauses.append(f"{alias}.family = ?")
+            params.append(family)
+        if roots is not None:
+            roots = [os.path.abspath(root) + os.sep for root in ([roots] if isinstance(roots, str) else roots)]
+            match = f"substr({alias}.path, 1, ?) = ?"
+            if not recursive:
+                match += f" AND instr(substr({alias}.path, ?), ?) = 0"
+            clauses.append("(" + " OR ".join(match for _ in roots) + ")")
+            for root in roots:
+                params.extend([len(root), root])
+                if not recursive:
+                    params.extend([len(root) + 1, os.sep])
+        return "".join(f" AND {clause}" for clause in clauses), params
+
+    def runs(self) -> pd.DataFrame:
+        """Indexed files: run, family, kind, rows and path."""
+        return self._query("SELECT run_id, family, kind, rows, path FROM files ORDER BY run_id, kind, path")
+
+    def last_eval(self, run_ids=None, family=None, roots=None, recursive=True) -> pd.DataFrame:
+        """Every value logged on the last eval row of each metrics file, one row per run."""
+        where, params = self._filters(run_ids, family, roots, recursive=recursive)
+        df = self._query(
+            "SELECT f.run_id, f.family, f.path, m.epoch, m.step, m.metric, m.value FROM files f "
+            "JOIN (SELECT file_id, MAX(row) AS row FROM metrics WHERE metric = ? GROUP BY file_id) last "
+            "ON last.file_id = f.file_id "
+            "JOIN metrics m ON m.file_id = last.file_id AND m.row = last.row "
+            f"WHERE f.kind = 'metrics'{where}",
+            [EVAL_MARKER, *params],
+        )
+        if df.empty:
+            return pd.DataFrame(columns=["run_id", "family", "epoch", "step"])
+        wide = df.pivot_table(index=["path", "run_id", "family", "epoch", "step"], columns="metric", values="value")
+        wide.columns.name = None
+        return wide.reset_index().drop(columns="path")
+
+    def eval_summary(self, roots=None, recursive=True) -> pd.DataFrame:
+        """Last eval loss / accuracy per run, best first (the create_eval_summary_df table)."""
+        df = self.last_eval(roots=roots, recursive=recursive)
+        columns = ["run_id", "eval_loss", "eval_accuracy", "epoch", "step"]
+        df = df.reindex(columns=columns)
+        return df.sort_values(by=["eval_accuracy", "run_id"], ascending=[False, True]).reset_index(drop=True)
+
+    def best_runs(self, metric="eval_accuracy", n=10, at="last", ascending=None, family=None) -> pd.DataFrame:
+        """
+        Top n runs by metric.
+
+        Metric-log values are taken from the last row that logged the metric
+        (at="last") or the best value over the run (at="best"); test_* metrics
+        come from the results files. Losses sort ascending unless told otherwise.
+        """
+        if ascending is None:
+            ascending = "loss" in metric
+        order = "ASC" if ascending else "DESC"
+        where, params = self._filters(family=family)
+        if metric in RESULT_METRICS:
+            return self._query(
+                f"SELECT f.run_id, f.family, MAX(r.{metric}) AS value, r.n FROM results r "
+                f"JOIN files f ON f.file_id = r.file_id WHERE r.{metric} IS NOT NULL{where} "
+                f"GROUP BY f.run_id, f.family ORDER BY value {order} LIMIT ?",
+                [*params, n],
+            )
+        if at == "last":
+            picked = "SELECT file_id, MAX(row) AS row FROM metrics WHERE metric = ? GROUP BY file_id"
+            match = "m.row = p.row"
+        elif at == "best":
+            picked = f"SELECT file_id, {'MIN' if ascending else 'MAX'}(value) AS value FROM metrics WHERE metric = ? GROUP BY file_id"
+            match = "m.value = p.value"
+        else:
+            raise ValueError(f"at must be 'last' or 'best', got {at!r}")
+        df = self._query(
+            f"SELECT f.run_id, f.family, m.value, m.epoch, m.step FROM ({picked}) p "
+            f"JOIN metrics m ON m.file_id = p.file_id AND m.metric = ? AND {match} "
+            f"JOIN files f ON f.file_id = p.file_id WHERE 1 = 1{where} "
+            f"ORDER BY m.value {order}, m.step",
+            [metric, metric, *params],
+        )
+        # at="best" can tie within a run; keep its earliest step
+        return df.drop_duplicates("run_id").head(n).reset_index(drop=True)
+
+    def learning_curves(self, run_ids=None, metrics=("loss", "eval_loss", "eval_accuracy"), family=None) -> pd.DataFrame:
+        """Long-format (run_id, family, metric, step, epoch, value) curves, ordered by step."""
+        metrics = [metrics] if isinstance(metrics, str) else list(metrics)
+        where, params = self._filters(run_ids, family)
+        return self._query(
+            "SELECT f.run_id, f.family, m.metric, m.step, m.epoch, m.value FROM metrics m "
+            "JOIN files f ON f.file_id = m.file_id "
+            f"WHERE m.metric IN ({','.join('?' * len(metrics))}){where} "
+            "ORDER BY f.run_id, m.metric, m.row",
+            [*metrics, *params],
+        )
+
+    def compare_runs(self, run_ids=None, metrics=("eval_loss", "eval_accuracy"), per_class=False,
+                     family=None) -> pd.DataFrame:
+        """One row per run: last-eval metrics next to its test-set results (and per-class F1)."""
+        metrics = [metrics] if isinstance(metrics, str) else list(metrics)
+        evals = self.last_eval(run_ids, family).reindex(columns=["run_id", "family", "epoch", "step", *metrics])
+        where, params = self._filters(run_ids, family)
+        # A run exported to several directories keeps its most recently ingested results
+        latest = (
+            "SELECT f.run_id, f.family, r.* FROM results r JOIN files f ON f.file_id = r.file_id "
+            f"WHERE f.ingested = (SELECT MAX(g.ingested) FROM files g WHERE g.kind = 'results' AND g.run_id = f.run_id)"
+            f"{where}"
+        )
+        tests = self._query(latest, params).drop_duplicates("run_id")
+        df = evals.merge(tests[["run_id", "family", "n", *RESULT_METRICS]], on=["run_id", "family"], how="outer")
+        df["n"] = df["n"].astype("Int64")
+        if per_class and not tests.empty:
+            file_ids = tests["file_id"].tolist()
+            classes = self._query(
+                f"SELECT file_id, label, f1 FROM result_classes WHERE file_id IN ({','.join('?' * len(file_ids))})",
+                file_ids,
+            )
+            classes["run_id"] = classes["file_id"].map(dict(zip(tests["file_id"], tests["run_id"])))
+            f1 = classes.pivot_table(index="run_id", columns="label", values="f1").add_prefix("f1_")
+            f1.columns.name = None
+            df = df.merge(f1.reset_index(), on="run_id", how="left")
+        sort_by = next((m for m in ("test_macro_f1", *metrics) if m in df.columns and df[m].notna().any()), "run_id")
+        return df.sort_values(sort_by, ascending="loss" in sort_by).reset_index(drop=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("roots", nargs="*", default=list(DEFAULT_ROOTS), help="Sweep log directories")
+    parser.add_argument("--db", default=SWEEP_INDEX_DB)
+    parser.add_argument("--best", metavar="METRIC", help="Rank runs by METRIC (e.g. eval_accuracy, test_macro_f1)")
+    parser.add_argument("--at", choices=("last", "best"), default="last")
+    parser.add_argument("-n", type=int, default=10)
+    parser.add_argument("--curve", nargs="+", metavar="RUN", help="Print learning curves of these runs")
+    parser.add_argument("--compare", nargs="*", metavar="RUN", help="Compare these runs (all when empty)")
+    args = parser.parse_args()
+
+    with SweepIndex(args.db) as index:
+        stats = index.update(args.roots)
+        print(f"Indexed {stats['scanned']} files ({stats['ingested']} ingested, {stats['touched']} touched, "
+              f"{stats['removed']} removed) in {stats['seconds']}s")
+        if args.best:
+            print(index.best_runs(args.best, n=args.n, at=args.at).to_string(index=False))
+        if args.curve:
+            curves = index.learning_curves(args.curve)
+            print(curves.pivot_table(index=["run_id", "step"], columns="metric", values="value").to_string())
+        if args.compare is not None:
+            print(index.compare_runs(args.compare or None, per_class=True).to_string(index=False))
+        if not (args.best or args.curve or args.compare is not None):
+            print(index.eval_summary().to_string(index=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+import os
+import re
+import time
+import random
+import asyncio
+import logging
+
+import numpy as np
+import pandas as pd
+
+from reddit_analysis import load_thread_with_sentiment, add_bias_scores, extract_submission_id
+from comment_scheduler import plan_order, record_throughput, estimate_inference_seconds
+
+logger = logging.getLogger(__name__)
+
+# Bulk job limits
+BULK_MAX_THREADS = int(os.getenv("BULK_MAX_THREADS", "50"))
+BULK_CONCURRENCY = int(os.getenv("BULK_CONCURRENCY", "4"))
+BULK_MAX_RETRIES = 4
+BULK_BACKOFF_BASE = 1.0      # seconds, doubled per retry
+BULK_BIAS_PER_THREAD = int(os.getenv("BULK_BIAS_PER_THREAD", "200"))
+# Wall-clock budget for a whole bulk request's bias work, counted from its start;
+# keep fetches + bias under gunicorn's 120s timeout
+BULK_BIAS_BUDGET = float(os.getenv("BULK_BIAS_BUDGET", "75"))
+
+# Cross-thread inference batching
+BIAS_QUEUE_MAX_TEXTS = 256
+BIAS_QUEUE_MAX_WAIT = 0.05   # seconds
+
+SENTIMENT_LABELS = ["positive", "neutral", "negative"]
+
+def subreddit_from_url(url: str):
+    """Lower-cased subreddit of a /r/<name>/ URL; None for short links (redd.it, /comments/<id>)."""
+    match = re.search(r"/r/([^/]+)/", url or "")
+    return match.group(1).lower() if match else None
+
+def _is_rate_limited(error) -> bool:
+    """True for 429s / transient server errors worth retrying."""
+    name = type(error).__name__
+    if name in ("TooManyRequests", "ServerError", "RequestException"):
+        return True
+    response = getattr(error, "response", None)
+    return getattr(response, "status", None) in (429, 500, 502, 503, 504)
+
+def _retry_after(error):
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after") or headers.get("x-ratelimit-reset"))
+    except (TypeError, ValueError):
+        return None
+
+async def with_backoff(fn, *args, retries=BULK_MAX_RETRIES, base_delay=BULK_BACKOFF_BASE):
+    """Await fn(*args), retrying rate-limit / transient errors with jittered exponential backoff."""
+    for attempt in range(retries + 1):
+        try:
+            return await fn(*args)
+        except Exception as e:
+            if attempt == retries or not _is_rate_limited(e):
+                raise
+            delay = _retry_after(e) or base_delay * (2 ** attempt) * (0.5 + random.random())
+            logger.warning(f"Reddit rate limited ({type(e).__name__}); retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+class BiasBatchQueue:
+    """
+    Collects bias requests from concurrently processed threads into shared batches.
+
+    Each thread awaits predict(texts); texts that arrive within max_wait of each
+    other are scored by one add_bias_scores call in the executor. With a
+    deadline (time.perf_counter()), a batch whose estimated inference time would
+    run past it is not started: its texts get None predictions instead.
+    """
+
+    def __init__(self, model_path, executor=None, max_texts=BIAS_QUEUE_MAX_TEXTS, max_wait=BIAS_QUEUE_MAX_WAIT,
+                 deadline=None):
+        self.model_path = model_path
+        self.executor = executor
+        self.max_texts = max_texts
+        self.max_wait = max_wait
+        self.deadline = deadline
+        self._queue = asyncio.Queue()
+        self._worker = None
+        self.batches = 0
+        self.texts = 0
+        self.skipped = 0
+        self.budget_exhausted = False
+
+    async def predict(self, texts):
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((list(texts), future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            size = len(batch[0][0])
+            deadline = loop.time() + self.max_wait
+            while size < self.max_texts:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                size += len(item[0])
+
+            if self._over_budget(size):
+                for item_texts, future in batch:
+                    if not future.done():
+                        future.set_result([None] * len(item_texts))
+                self.skipped += size
+                continue
+
+            texts = [text for item_texts, _ in batch for text in item_texts]
+            try:
+                df = pd.DataFrame({"body": texts})
+                batch_start = time.perf_counter()
+                df = await loop.run_in_executor(self.executor, add_bias_scores, df, self.model_path)
+                record_throughput(time.perf_counter() - batch_start, size)
+                predictions = df["bias"].tolist()
+                offset = 0
+                for item_texts, future in batch:
+                    if not future.done():
+                        future.set_result(predictions[offset:offset + len(item_texts)])
+                    offset += len(item_texts)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            self.batches += 1
+            self.texts += size
+
+    def _over_budget(self, size) -> bool:
+        if self.deadline is None:
+            return False
+        if not self.budget_exhausted and time.perf_counter() + estimate_inference_seconds(size) > self.deadline:
+            self.budget_exhausted = True
+            logger.warning(f"Bulk bias budget reached after {self.texts} texts")
+        return self.budget_exhausted
+
+    def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+
+def summarize_thread(df) -> dict:
+    """Compact per-thread stats used in bulk results and subreddit rollups."""
+    summary = {
+        "comments": int(len(df)),
+        "sentiment_sum": float(df["sentiment"].sum()) if len(df) else 0.0,
+        "sentiment_mean": float(df["sentiment"].mean()) if len(df) else 0.0,
+        "sentiment_labels": {label: int((df["sentiment_label"] == label).sum()) for label in SENTIMENT_LABELS},
+    }
+    if "bias" in df.columns:
+        rows = [b for b in df["bias"] if isinstance(b, dict)]
+        if rows:
+            labels = list(rows[0].keys())
+            matrix = np.array([[row[label] for label in labels] for row in rows])
+            top = np.asarray(labels)[matrix.argmax(axis=1)]
+            summary["bias_scored"] = len(rows)
+            summary["bias_sum"] = dict(zip(labels, matrix.sum(axis=0).round(4).tolist()))
+            summary["bias_top_label"] = {label: int((top == label).sum()) for label in labels}
+    return summary
+
+def rollup_by_subreddit(summaries) -> dict:
+    """Aggregate per-thread summaries into per-subreddit sentiment/bias rollups."""
+    rollups = {}
+    for subreddit, summary in summaries:
+        r = rollups.setdefault(subreddit, {
+            "threads": 0, "comments": 0, "sentiment_sum": 0.0,
+            "sentiment_labels": {label: 0 for label in SENTIMENT_LABELS},
+            "bias_scored": 0, "bias_sum": {}, "bias_top_label": {},
+        })
+        r["threads"] += 1
+        r["comments"] += summary["comments"]
+        r["sentiment_sum"] += summary["sentiment_sum"]
+        for label, count in summary["sentiment_labels"].items():
+            r["sentiment_labels"][label] += count
+        r["bias_scored"] += summary.get("bias_scored", 0)
+        for label, value in summary.get("bias_sum", {}).items():
+            r["bias_sum"][label] = r["bias_sum"].get(label, 0.0) + value
+        for label, count in summary.get("bias_top_label", {}).items():
+            r["bias_top_label"][label] = r["bias_top_label"].get(label, 0) + count
+
+    for r in rollups.values():
+        r["sentiment_mean"] = round(r.pop("sentiment_sum") / r["comments"], 4) if r["comments"] else 0.0
+        bias_sum = r.pop("bias_sum")
+        r["bias_mean"] = {label: round(v / r["bias_scored"], 4) for label, v in bias_sum.items()} \
+            if r["bias_scored"] else {}
+    return rollups
+
+async def _list_top(reddit_client, subreddit, time_filter, limit):
+    sub = await reddit_client.subreddit(subreddit)
+    return [f"https://www.reddit.com{submission.permalink}"
+            async for submission in sub.top(time_filter=time_filter, limit=limit)]
+
+async def _permalink(reddit_client, url):
+    submission = await reddit_client.submission(url=url)
+    await submission.load()
+    return f"https://www.reddit.com{submission.permalink}"
+
+async def resolve_targets(reddit_client, subreddit=None, urls=None, limit=10, time_filter="day"):
+    """
+    Expand a subreddit listing and/or explicit URLs into a de-duplicated URL list.
+
+    Short links (redd.it, /comments/<id>) are resolved to their permalink so
+    every thread is attributed to its subreddit; one that cannot be resolved is
+    kept as given and reported with subreddit None.
+    """
+    targets = list(urls or [])
+    if subreddit:
+        targets.extend(await with_backoff(_list_top, reddit_client, subreddit, time_filter, limit))
+
+    seen, unique = set(), []
+    for url in targets:
+        try:
+            key = extract_submission_id(url)
+        except Exception:
+            logger.warning(f"Skipping invalid bulk URL: {url}")
+            continue
+        if key not in seen:
+            seen.add(key)
+            unique.append(url)
+    unique = unique[:BULK_MAX_THREADS]
+
+    short = [i for i, url in enumerate(unique) if subreddit_from_url(url) is None]
+    resolved = await asyncio.gather(
+        *(with_backoff(_permalink, reddit_client, unique[i]) for i in short), return_exceptions=True
+    )
+    for i, permalink in zip(short, resolved):
+        if isinstance(permalink, Exception):
+            logger.warning(f"Could not resolve bulk URL {unique[i]}: {permalink}")
+        else:
+            unique[i] = permalink
+    return unique
+
+async def analyze_bulk(reddit_client, urls, model_path=None, concurrency=BULK_CONCURRENCY,
+                       include_comments=False, executor=None, bias_budget=BULK_BIAS_BUDGET):
+    """
+    Analyse many threads concurrently and yield results as each one finishes.
+
+    Yields {"type": "thread", ...} per thread (or {"type": "thread_error", ...}),
+    then a final {"type": "rollup", ...} with per-subreddit aggregates. Reddit
+    fetches share one semaphore; bias requests from all threads share one
+    inference batch queue when model_path is given. Bias work stops at
+    bias_budget seconds into the request; later threads are sentiment-only.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    started = time.perf_counter()
+    bias_queue = BiasBatchQueue(model_path, executor, deadline=started + bias_budget) if model_path else None
+
+    async def process(url):
+        try:
+            async with semaphore:
+                df = await with_backoff(load_thread_with_sentiment, url, reddit_client, 2000, None, executor)
+            if bias_queue is not None:
+                top = df.iloc[plan_order(df, BULK_BIAS_PER_THREAD)]
+                predictions = await bias_queue.predict(top["body"].astype(str).tolist())
+                df = df.copy()
+                df["bias"] = pd.Series(predictions, index=top.index).reindex(df.index)
+            return url, df, None
+        except Exception as e:
+            logger.error(f"Bulk thread {url} failed: {e}")
+            return url, None, e
+
+    tasks = [asyncio.create_task(process(url)) for url in urls]
+    summaries = []
+    unattributed = 0  # threads whose subreddit is unknown: reported, but not rolled up
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            url, df, error = await next_done
+            if error is not None:
+                yield {"type": "thread_error", "url": url, "message": str(error)}
+                continue
+
+            subreddit = subreddit_from_url(url)
+            summary = summarize_thread(df)
+            if subreddit is not None:
+                summaries.append((subreddit, summary))
+            else:
+                unattributed += 1
+
+            result = {
+                "type": "thread",
+                "thread_id": extract_submission_id(url),
+                "url": url,
+                "subreddit": subreddit,
+                "summary": summary,
+            }
+            if include_comments:
+                result["data"] = df.astype(object).where(df.notna(), None).to_dict(orient="records")
+            yield result
+    finally:
+        if bias_queue is not None:
+            bias_queue.close()
+        for task in tasks:
+            task.cancel()
+
+    yield {
+        "type": "rollup",
+        "threads": len(summaries) + unattributed,
+        "threads_without_subreddit": unattributed,
+        "seconds": round(time.perf_counter() - started, 3),
+        "inference_batches": bias_queue.batches if bias_queue else 0,
+        "bias_texts_skipped": bias_queue.skipped if bias_queue else 0,
+        "bias_budget_exhausted": bias_queue.budget_exhausted if bias_queue else False,
+        "subreddits": rollup_by_subreddit(summaries),
+    }
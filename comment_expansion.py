@@ -0,0 +1,212 @@
+import os
+import time
+import heapq
+import asyncio
+import logging
+import itertools
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Concurrent continue-thread loads per thread, and the wall-clock budget for expansion.
+# /api/morechildren only allows one request at a time (asyncpraw raises TooManyRequests
+# otherwise), so those always run one by one
+EXPANSION_CONCURRENCY = int(os.getenv("EXPANSION_CONCURRENCY", "4"))
+EXPANSION_DEADLINE = float(os.getenv("EXPANSION_DEADLINE", "10"))
+# Same request budget as the replace_more(limit=8) this replaced
+EXPANSION_MAX_FETCHES = int(os.getenv("EXPANSION_MAX_FETCHES", "8"))
+# A failed fetch is retried with exponential backoff before its branch is dropped
+EXPANSION_RETRIES = int(os.getenv("EXPANSION_RETRIES", "2"))
+EXPANSION_RETRY_BACKOFF = float(os.getenv("EXPANSION_RETRY_BACKOFF", "1.0"))
+
+def _is_more(node) -> bool:
+    from asyncpraw.models import MoreComments
+    return isinstance(node, MoreComments)
+
+def _node_depth(node, depths) -> int:
+    parent_id = getattr(node, "parent_id", "") or ""
+    if parent_id.startswith("t3_"):
+        return 0
+    return depths.get(parent_id, -1) + 1
+
+class _Frontier:
+    """MoreComments waiting to be fetched: shallowest first, then largest count."""
+
+    def __init__(self):
+        self._heap = []
+        self._seq = itertools.count()
+
+    def push(self, more, depth):
+        heapq.heappush(self._heap, (depth, -more.count, next(self._seq), more))
+
+    def pop(self):
+        depth, _, _, more = heapq.heappop(self._heap)
+        return more, depth
+
+    def drain(self):
+        items = [more for _, _, _, more in self._heap]
+        self._heap = []
+        return items
+
+    def __len__(self):
+        return len(self._heap)
+
+def _scan(nodes, depths, frontier, parent_list=None, submission=None):
+    """
+    Breadth-first walk over nodes: record comment depths, queue MoreComments
+    (remembering which list to remove them from). Returns the comments seen.
+    """
+    seen = 0
+    queue = deque((None, node) for node in nodes)
+    while queue:
+        parent, node = queue.popleft()
+        if _is_more(node):
+            node._remove_from = parent.replies._comments if parent is not None else parent_list
+            if submission is not None:
+                node.submission = submission
+            frontier.push(node, _node_depth(node, depths))
+            continue
+        depths[node.fullname] = _node_depth(node, depths)
+        seen += 1
+        queue.extend((node, reply) for reply in node.replies)
+    return seen
+
+def _is_continue_thread(more) -> bool:
+    """count == 0 MoreComments load a comment's page ("continue this thread"), not /api/morechildren."""
+    return more.count == 0
+
+async def _fetch(more, retries=None, backoff=None):
+    """more.comments() with retries and exponential backoff (rate limits, transient errors)."""
+    retries = EXPANSION_RETRIES if retries is None else retries
+    backoff = EXPANSION_RETRY_BACKOFF if backoff is None else backoff
+    for attempt in range(retries + 1):
+        try:
+            return await more.comments(update=False)
+        except Exception as e:
+            if attempt == retries:
+                raise
+            delay = backoff * 2 ** attempt
+            logger.info(f"MoreComments fetch failed ({e}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+def _remove(more):
+    try:
+        more._remove_from.remove(more)
+    except (AttributeError, ValueError):
+        pass
+
+async def expand_comment_forest(forest, max_comments=None, max_fetches=None, deadline=None,
+                                concurrency=None):
+    """
+    Expand MoreComments in a submission's comment forest.
+
+    A drop-in for forest.replace_more(limit=max_fetches), shallowest / largest
+    first, so the highest-ranked branches arrive first. /api/morechildren
+    requests run one at a time (Reddit rejects concurrent ones); continue-thread
+    loads run alongside them, up to `concurrency` requests in total. Failed
+    fetches are retried with backoff (EXPANSION_RETRIES). Expansion stops once
+    the forest holds max_comments comments, max_fetches requests were made or
+    `deadline` seconds passed; every MoreComments left over (including branches
+    whose fetch kept failing) is removed from the tree so it can be flattened
+    directly. Returns a stats dict.
+    """
+    concurrency = concurrency or EXPANSION_CONCURRENCY
+    max_fetches = EXPANSION_MAX_FETCHES if max_fetches is None else max_fetches
+    deadline = EXPANSION_DEADLINE if deadline is None else deadline
+
+    if not hasattr(forest, "_insert_comment"):
+        # Not an asyncpraw CommentForest (e.g. the benchmark fake): plain sequential expansion
+        await forest.replace_more(limit=max_fetches)
+        return {"fetches": None, "comments": None, "stopped_by": "replace_more"}
+
+    started = time.perf_counter()
+    submission = forest._submission
+    depths = {}
+    frontier = _Frontier()
+    comments = _scan(forest._comments, depths, frontier, parent_list=forest._comments)
+
+    fetches = 0
+    failed = 0
+    in_flight = {}
+    stopped_by = "exhausted"
+
+    def budget_left():
+        if max_comments is not None and comments >= max_comments:
+            return "max_comments"
+        if max_fetches is not None and fetches >= max_fetches:
+            return "max_fetches"
+        if time.perf_counter() - started >= deadline:
+            return "deadline"
+        return None
+
+    try:
+        while frontier or in_flight:
+            # Keep up to `concurrency` requests in flight while the budget allows, at most
+            # one of them to /api/morechildren; morechildren entries that must wait are held
+            # back and returned to the frontier
+            held = []
+            morechildren_busy = any(not _is_continue_thread(more) for more in in_flight.values())
+            while frontier and len(in_flight) < concurrency:
+                reason = budget_left()
+                if reason:
+                    stopped_by = reason
+                    break
+                more, depth = frontier.pop()
+                if not _is_continue_thread(more):
+                    if morechildren_busy:
+                        held.append((more, depth))
+                        continue
+                    morechildren_busy = True
+                task = asyncio.ensure_future(_fetch(more))
+                in_flight[task] = more
+                fetches += 1
+            for more, depth in held:
+                frontier.push(more, depth)
+
+            if not in_flight:
+                break
+
+            remaining = deadline - (time.perf_counter() - started)
+            done, _ = await asyncio.wait(in_flight, timeout=max(0.0, remaining),
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                stopped_by = "deadline"
+                break
+
+            for task in done:
+                more = in_flight.pop(task)
+                try:
+                    new_comments = task.result()
+                except Exception as e:
+                    logger.warning(f"MoreComments fetch failed after {EXPANSION_RETRIES} retries, "
+                                   f"dropping branch of {more.count} comments: {e}")
+                    failed += 1
+                    _remove(more)
+                    continue
+
+                # Queue nested mores before inserting, like replace_more: the response is a flat
+                # list in tree order and _insert_comment places nested MoreComments at top level
+                comments += _scan(new_comments, depths, frontier, parent_list=forest._comments,
+                                  submission=submission)
+                for comment in new_comments:
+                    try:
+                        forest._insert_comment(comment)
+                    except Exception as e:
+                        logger.warning(f"Failed to insert expanded comment: {e}")
+                _remove(more)
+    finally:
+        for task, more in in_flight.items():
+            task.cancel()
+            _remove(more)
+        for more in frontier.drain():
+            _remove(more)
+
+    stats = {
+        "fetches": fetches,
+        "failed": failed,
+        "comments": comments,
+        "stopped_by": stopped_by,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    logger.info(f"Expanded comment forest: {stats}")
+    return stats
@@ -0,0 +1,212 @@
+import os
+import time
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Wall-clock budget for bias inference per request; keep well under gunicorn's 120s timeout
+BIAS_TIME_BUDGET = float(os.getenv("BIAS_TIME_BUDGET", "45"))
+BIAS_SCHEDULE_CHUNK = int(os.getenv("BIAS_SCHEDULE_CHUNK", "64"))
+
+# Top comments per oc_bin_id scheduled before the rest, so every conversation gets a sample
+BIAS_PER_BIN_MIN = int(os.getenv("BIAS_PER_BIN_MIN", "1"))
+
+# Flatten up to this many times max_comments before picking which comments to keep
+COMMENT_OVERSAMPLE = int(os.getenv("COMMENT_OVERSAMPLE", "3"))
+
+# Relative weight of each ranking signal (missing columns contribute 0)
+PRIORITY_WEIGHTS = {"score": 0.4, "extremity": 0.25, "depth": 0.2, "length": 0.15}
+
+# Bodies longer than this do not rank any higher
+LENGTH_SATURATION = 1000
+
+SKIP_BODIES = {"", "[deleted]", "[removed]"}
+
+# Seconds of inference per uncached text, shared across requests (EWMA)
+_seconds_per_text = None
+
+def eligible_mask(df) -> np.ndarray:
+    """Rows worth scoring: drop empty, deleted and removed bodies."""
+    if "body" not in df.columns:
+        return np.zeros(len(df), dtype=bool)
+    bodies = df["body"].fillna("").astype(str).str.strip()
+    return ~bodies.isin(SKIP_BODIES).to_numpy()
+
+def priority_scores(df) -> np.ndarray:
+    """
+    Rank comments for expensive processing, in [0, 1].
+
+    Combines score (percentile rank), shallowness (1 / (1 + level)), body length
+    (log-scaled, saturating) and VADER extremity (|compound|, when scored).
+    """
+    n = len(df)
+    priority = np.zeros(n)
+    if n == 0:
+        return priority
+
+    if "score" in df.columns:
+        scores = pd.to_numeric(df["score"], errors="coerce").fillna(0)
+        priority += PRIORITY_WEIGHTS["score"] * scores.rank(pct=True).to_numpy()
+    if "sentiment" in df.columns:
+        sentiment = pd.to_numeric(df["sentiment"], errors="coerce").fillna(0).to_numpy()
+        priority += PRIORITY_WEIGHTS["extremity"] * np.abs(sentiment)
+    if "level" in df.columns:
+        level = pd.to_numeric(df["level"], errors="coerce").fillna(0).clip(lower=0).to_numpy()
+        priority += PRIORITY_WEIGHTS["depth"] / (1.0 + level)
+    if "body" in df.columns:
+        length = df["body"].fillna("").astype(str).str.len().clip(upper=LENGTH_SATURATION).to_numpy()
+        priority += PRIORITY_WEIGHTS["length"] * np.log1p(length) / np.log1p(LENGTH_SATURATION)
+    return priority
+
+def plan_order(df, limit=None, per_bin=BIAS_PER_BIN_MIN, eligible_only=True) -> np.ndarray:
+    """
+    Positional row order for processing: the top per_bin comments of every
+    oc_bin_id first (bins ordered by their best comment), then everything else
+    by priority. Ineligible rows are left out unless eligible_only is False; the
+    plan is cut at limit.
+    """
+    priority = priority_scores(df)
+    order = np.argsort(-priority, kind="stable")
+    if eligible_only:
+        order = order[eligible_mask(df)[order]]
+
+    if per_bin and "oc_bin_id" in df.columns and len(order):
+        bins = df["oc_bin_id"].to_numpy()[order]
+        rank_in_bin = pd.Series(bins).groupby(bins, sort=False).cumcount().to_numpy()
+        order = np.concatenate([order[rank_in_bin < per_bin], order[rank_in_bin >= per_bin]])
+
+    return order[:limit] if limit is not None else order
+
+def select_comments(df, max_comments):
+    """
+    Keep the max_comments highest-priority comments of a flattened thread.
+
+    The original post (row 0) is always kept, and each kept reply brings its
+    ancestors along so the reply tree stays connected. Deleted and removed
+    comments compete like any other row (they are only skipped for inference).
+    Row order is preserved.
+    """
+    if len(df) <= max_comments + 1:
+        return df
+
+    ids = df["id"].tolist()
+    position = {comment_id: i for i, comment_id in enumerate(ids)}
+    parents = [position.get(str(parent)[3:]) for parent in df["parent_id"]]
+
+    keep = np.zeros(len(df), dtype=bool)
+    keep[0] = True
+    kept = 0
+    for i in plan_order(df.iloc[1:], eligible_only=False) + 1:
+        chain = []
+        node = i
+        while node is not None and not keep[node]:
+            chain.append(node)
+            node = parents[node]
+        if kept + len(chain) > max_comments:
+            continue
+        keep[chain] = True
+        kept += len(chain)
+        if kept >= max_comments:
+            break
+
+    logger.info(f"Selected {kept} of {len(df) - 1} comments by priority")
+    return df[keep].reset_index(drop=True)
+
+def record_throughput(seconds, n_texts):
+    """Update the shared inference-speed estimate; cache-hit batches are ignored."""
+    global _seconds_per_text
+    if n_texts == 0 or seconds / n_texts < 1e-4:
+        return
+    sample = seconds / n_texts
+    _seconds_per_text = sample if _seconds_per_text is None else 0.7 * _seconds_per_text + 0.3 * sample
+
+def estimate_inference_seconds(n_texts) -> float:
+    """Expected seconds to score n_texts uncached texts (0 until a batch has been timed)."""
+    return (_seconds_per_text or 0.0) * n_texts
+
+class BiasSchedule:
+    """
+    Budgeted bias inference for one request.
+
+    Comments are planned with plan_order() and fed to predict_chunks in priority
+    order. Before each chunk the remaining time budget is checked against the
+    estimated chunk cost; once it would overrun, scheduling stops and the rest of
+    the thread is reported as not covered instead of timing out.
+    """
+
+    def __init__(self, df, limit=None, budget_seconds=None, chunk_size=BIAS_SCHEDULE_CHUNK):
+        self.df = df
+        self.order = plan_order(df, limit)
+        self.budget_seconds = BIAS_TIME_BUDGET if budget_seconds is None else budget_seconds
+        self.chunk_size = chunk_size
+        self.scored_positions = []
+        # Filled by iter_bias_predictions(stats=...): how many planned texts shared a prediction
+        self.dedup = {}
+        self.budget_exhausted = False
+        self.started = None
+        self.finished = None
+
+    def _over_budget(self) -> bool:
+        elapsed = time.perf_counter() - self.started
+        return elapsed + estimate_inference_seconds(self.chunk_size) > self.budget_seconds
+
+    def run(self, predict_chunks):
+        """
+        Yield (row_positions, predictions) as chunks finish.
+
+        predict_chunks(texts, chunk_size) must yield (indices_into_texts, predictions),
+        e.g. reddit_analysis.iter_bias_predictions.
+        """
+        self.started = time.perf_counter()
+        texts = self.df["body"].astype(str).to_numpy()[self.order].tolist()
+        chunks = iter(predict_chunks(texts, self.chunk_size))
+        try:
+            while True:
+                if self.scored_positions and self._over_budget():
+                    self.budget_exhausted = True
+                    break
+                chunk_start = time.perf_counter()
+                try:
+                    rows, predictions = next(chunks)
+                except StopIteration:
+                    break
+                record_throughput(time.perf_counter() - chunk_start, len(rows))
+
+                positions = self.order[rows].tolist()
+                self.scored_positions.extend(positions)
+                yield positions, predictions
+        finally:
+            if hasattr(chunks, "close"):
+                chunks.close()
+            self.finished = time.perf_counter()
+
+        if self.budget_exhausted:
+            logger.warning(
+                f"Bias budget of {self.budget_seconds}s reached after "
+                f"{len(self.scored_positions)}/{len(self.order)} planned comments"
+            )
+
+    def coverage(self) -> dict:
+        """How much of the thread got bias scores, for the response and logs."""
+        eligible = int(eligible_mask(self.df).sum())
+        scored = len(self.scored_positions)
+        report = {
+            "comments": len(self.df),
+            "eligible": eligible,
+            "planned": len(self.order),
+            "scored": scored,
+            "ratio": round(scored / eligible, 4) if eligible else 1.0,
+            "budget_seconds": self.budget_seconds,
+            "budget_exhausted": self.budget_exhausted,
+            "seconds": round((self.finished or time.perf_counter()) - self.started, 3) if self.started else 0.0,
+        }
+        if "oc_bin_id" in self.df.columns:
+            bins = self.df["oc_bin_id"].to_numpy()
+            report["bins"] = int(pd.Series(bins[eligible_mask(self.df)]).nunique())
+            report["bins_covered"] = int(pd.Series(bins[self.scored_positions]).nunique()) if scored else 0
+        if self.dedup:
+            report["dedup"] = self.dedup
+        return report
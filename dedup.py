@@ -0,0 +1,195 @@
+import os
+import re
+import string
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Group comments whose normalized bodies match exactly (case, whitespace, markdown
+# emphasis and quote markers ignored), and near-duplicates by MinHash similarity,
+# so sentiment / bias inference runs once per group
+COMMENT_DEDUP = os.getenv("COMMENT_DEDUP", "1") == "1"
+DEDUP_NEAR = os.getenv("DEDUP_NEAR", "1") == "1"
+# Estimated Jaccard similarity of word 3-gram shingles needed to share a result
+DEDUP_NEAR_THRESHOLD = float(os.getenv("DEDUP_NEAR_THRESHOLD", "0.9"))
+# Shorter bodies only match exactly ("I love it" vs "I hate it")
+DEDUP_MIN_TOKENS = int(os.getenv("DEDUP_MIN_TOKENS", "8"))
+
+SHINGLE_SIZE = 3
+MINHASH_PERMUTATIONS = 64
+# 8 bands of 8 rows: pairs at Jaccard 0.9 become candidates ~99% of the time, at 0.5 ~3%
+LSH_BANDS = 8
+_SIGNATURE_BLOCK = 50000
+
+# Fixed seed: signatures only need to be consistent within one process.
+# Permutations are multiply-shift hashes: ((a * h + b) mod 2**64) >> 32 with odd a
+_rng = np.random.default_rng(20240601)
+_PERM_A = _rng.integers(0, 2**63, size=(MINHASH_PERMUTATIONS, 1), dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+_PERM_B = _rng.integers(0, 2**63, size=(MINHASH_PERMUTATIONS, 1), dtype=np.uint64)
+_BAND_MIX = _rng.integers(1, 2**63, size=MINHASH_PERMUTATIONS // LSH_BANDS, dtype=np.uint64)
+_SHINGLE_MIX = np.uint64(0x9E3779B97F4A7C15)
+_SHIFT = np.uint64(32)
+
+_QUOTE = re.compile(r"^[ \t]*(?:&gt;|>)+", re.MULTILINE)
+_STRIP_MARKUP = str.maketrans("", "", "*_~`")
+_PUNCTUATION_TO_SPACE = str.maketrans({c: " " for c in string.punctuation})
+
+def normalize_text(text) -> str:
+    """Key for exact-duplicate matching on the (uncased) bias path: casefolded, markdown-stripped, whitespace-collapsed."""
+    text = str(text).translate(_STRIP_MARKUP)
+    if ">" in text:
+        text = _QUOTE.sub(" ", text)
+    return " ".join(text.split()).casefold()
+
+def collapse_whitespace(text) -> str:
+    """Key for sentiment grouping: VADER tokenizes on whitespace but is sensitive to case and punctuation."""
+    return " ".join(str(text).split())
+
+def minhash_signatures(token_lists):
+    """
+    (n, MINHASH_PERMUTATIONS) MinHash signatures over word shingles, computed for
+    all texts at once: tokens are factorized to ids, shingle hashes are combined
+    from consecutive ids, and the per-text minimum is taken in blocks. Rows of
+    texts shorter than SHINGLE_SIZE stay zero.
+    """
+    lengths = np.array([len(tokens) for tokens in token_lists], dtype=np.int64)
+    signatures = np.zeros((len(token_lists), MINHASH_PERMUTATIONS), dtype=np.uint64)
+    if not lengths.sum():
+        return signatures
+    token_ids = pd.factorize(np.array([t for tokens in token_lists for t in tokens], dtype=object))[0]
+    token_ids = token_ids.astype(np.uint64)
+
+    # Shingle starting at each token; those running past the end of their text are dropped
+    n_shingles = np.maximum(lengths - SHINGLE_SIZE + 1, 0)
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    first = np.repeat(starts, n_shingles) + (np.arange(n_shingles.sum()) - np.repeat(np.cumsum(n_shingles) - n_shingles, n_shingles))
+    hashes = np.zeros(len(first), dtype=np.uint64)
+    for k in range(SHINGLE_SIZE):
+        hashes = (hashes + token_ids[first + k]) * _SHINGLE_MIX
+    hashes >>= _SHIFT
+
+    offsets = np.concatenate([[0], np.cumsum(n_shingles)])
+    rows = np.flatnonzero(n_shingles)
+    # Whole texts per block, ~_SIGNATURE_BLOCK shingles each, to bound the (permutations x shingles) matrix
+    for block in np.array_split(rows, max(1, int(offsets[-1]) // _SIGNATURE_BLOCK)):
+        if not len(block):
+            continue
+        lo, hi = offsets[block[0]], offsets[block[-1] + 1]
+        permuted = (_PERM_A * hashes[lo:hi] + _PERM_B) >> _SHIFT
+        signatures[block] = np.minimum.reduceat(permuted, offsets[block] - lo, axis=1).T
+    return signatures
+
+class TextClusters:
+    """
+    Group assignment for a list of texts.
+
+    codes[i] is the group of texts[i]; representatives[g] is the position of the
+    first text of group g, the one that gets scored.
+    """
+
+    def __init__(self, codes, representatives, exact_duplicates=0, near_duplicates=0):
+        self.codes = np.asarray(codes, dtype=np.int64)
+        self.representatives = list(representatives)
+        self.exact_duplicates = exact_duplicates
+        self.near_duplicates = near_duplicates
+
+    def __len__(self):
+        return len(self.representatives)
+
+    def members(self):
+        """Positions of every text in each group, in order."""
+        order = np.argsort(self.codes, kind="stable")
+        splits = np.flatnonzero(np.diff(self.codes[order])) + 1
+        return [group.tolist() for group in np.split(order, splits)] if len(order) else []
+
+    def expand(self, values):
+        """Fan per-group values out to every text."""
+        return np.asarray(values)[self.codes]
+
+    def stats(self) -> dict:
+        texts = len(self.codes)
+        return {
+            "texts": texts,
+            "unique": len(self.representatives),
+            "exact_duplicates": self.exact_duplicates,
+            "near_duplicates": self.near_duplicates,
+            "ratio": round(1 - len(self.representatives) / texts, 4) if texts else 0.0,
+        }
+
+def merge_stats(a, b):
+    """Combine two stats() dicts (e.g. a cached thread plus its incremental update)."""
+    if not a or not b:
+        return a or b
+    merged = {key: a[key] + b[key] for key in ("texts", "unique", "exact_duplicates", "near_duplicates")}
+    merged["ratio"] = round(1 - merged["unique"] / merged["texts"], 4) if merged["texts"] else 0.0
+    return merged
+
+def cluster_texts(texts, near=None, threshold=DEDUP_NEAR_THRESHOLD, normalize=normalize_text) -> TextClusters:
+    """
+    Group duplicate and near-duplicate texts.
+
+    Without COMMENT_DEDUP only identical strings are grouped. Otherwise texts are
+    grouped by normalize(body), and (with near=True, default DEDUP_NEAR) each new
+    long-enough text is compared, via LSH-banded MinHash signatures, to the
+    existing group representatives and joins the first one at or above threshold.
+    Comparing to representatives only keeps groups from drifting through chains
+    of small edits.
+    """
+    texts = [str(text) for text in texts]
+    if not COMMENT_DEDUP:
+        codes, uniques = pd.factorize(np.array(texts, dtype=object))
+        representatives = np.unique(codes, return_index=True)[1].tolist()
+        return TextClusters(codes, representatives, exact_duplicates=len(texts) - len(uniques))
+
+    # Exact duplicates: one entry per distinct normalized body, in order of first appearance
+    normalized_codes, normalized = pd.factorize(np.array([normalize(t) for t in texts], dtype=object))
+    group_of = np.arange(len(normalized))
+
+    near = DEDUP_NEAR if near is None else near
+    if near and len(normalized):
+        # Signatures are taken over the casefolded form even if grouping used another key
+        if normalize is not normalize_text:
+            normalized = [normalize_text(text) for text in normalized]
+        token_lists = [text.translate(_PUNCTUATION_TO_SPACE).split() for text in normalized]
+        comparable = np.array([len(tokens) >= DEDUP_MIN_TOKENS for tokens in token_lists])
+        signatures = minhash_signatures([tokens if ok else [] for tokens, ok in zip(token_lists, comparable)])
+        # One integer key per LSH band (wrapping multiply-add of its rows, salted with the band index)
+        band_rows = signatures.reshape(len(normalized), LSH_BANDS, -1)
+        band_keys = ((band_rows * _BAND_MIX).sum(axis=2, dtype=np.uint64) ^ np.arange(LSH_BANDS, dtype=np.uint64)).tolist()
+
+        group_of[:] = -1
+        n_groups, representatives, bands = 0, [], {}
+        for u in range(len(normalized)):
+            group = None
+            if comparable[u]:
+                keys = band_keys[u]
+                for g in dict.fromkeys(g for key in keys for g in bands.get(key, ())):
+                    if (signatures[representatives[g]] == signatures[u]).mean() >= threshold:
+                        group = g
+                        break
+                if group is None:
+                    for key in keys:
+                        bands.setdefault(key, []).append(n_groups)
+            if group is None:
+                group, n_groups = n_groups, n_groups + 1
+                representatives.append(u)
+            group_of[u] = group
+
+    codes = group_of[normalized_codes]
+    n_groups = int(group_of.max()) + 1 if len(group_of) else 0
+    first = np.full(n_groups, len(texts), dtype=np.int64)
+    np.minimum.at(first, codes, np.arange(len(texts)))
+    return TextClusters(codes, first.tolist(), len(texts) - len(normalized), len(normalized) - n_groups)
+
+def cluster_for_sentiment(texts) -> TextClusters:
+    """
+    Exact grouping on whitespace-collapsed raw text, for VADER.
+
+    Casefolding / markdown stripping would copy one member's score to bodies
+    VADER scores differently ("GOOD" vs "good", "**great**" vs "great"), and
+    MinHash near-duplicates cost more than scoring them, so neither is used.
+    """
+    return cluster_texts(texts, near=False, normalize=collapse_whitespace)
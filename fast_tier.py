@@ -0,0 +1,166 @@
+import os
+import logging
+from types import SimpleNamespace
+
+# torch is imported inside functions so importing this module stays cheap
+logger = logging.getLogger(__name__)
+
+# Two-tier bias inference: an exit head on an intermediate BERT layer scores every
+# comment; only comments whose top-2 probability margin is below the threshold
+# continue through the remaining layers and the full classifier
+BIAS_FAST_TIER = os.getenv("BIAS_FAST_TIER", "0") == "1"
+EXIT_HEAD_FILE = "exit_head.pt"
+
+# Optional overrides of the layer / margin saved with the exit head
+_EXIT_LAYER_ENV = os.getenv("BIAS_EXIT_LAYER")
+_ESCALATION_MARGIN_ENV = os.getenv("BIAS_ESCALATION_MARGIN")
+
+def build_exit_head(config, init_from=None):
+    """
+    Exit head shaped like BERT's pooler + classifier. For training it is initialised
+    from the full model's pooler and classifier weights (init_from).
+    """
+    import torch
+
+    head = torch.nn.Sequential(
+        torch.nn.Linear(config.hidden_size, config.hidden_size),
+        torch.nn.Tanh(),
+        torch.nn.Linear(config.hidden_size, config.num_labels),
+    )
+    if init_from is not None:
+        head[0].load_state_dict(init_from.bert.pooler.dense.state_dict())
+        head[2].load_state_dict(init_from.classifier.state_dict())
+    return head
+
+def train_exit_head(model, features, teacher_probs, epochs=30, lr=1e-4, weight_decay=0.01, batch_size=64, seed=0):
+    """
+    Distil the full model into an exit head on intermediate [CLS] features.
+
+    features: (n, hidden) float tensor of layer-K [CLS] states; teacher_probs: (n, labels)
+    full-model probabilities. Trained with KL divergence, so no labels are needed.
+    """
+    import torch
+
+    torch.manual_seed(seed)
+    head = build_exit_head(model.config, init_from=model)
+    head.train()
+    optimizer = torch.optim.AdamW(head.parameters(), lr=lr, weight_decay=weight_decay)
+    loss_fn = torch.nn.KLDivLoss(reduction="batchmean")
+    n = features.shape[0]
+    for _ in range(epochs):
+        order = torch.randperm(n)
+        for start in range(0, n, batch_size):
+            idx = order[start:start + batch_size]
+            log_probs = torch.log_softmax(head(features[idx]), dim=1)
+            loss = loss_fn(log_probs, teacher_probs[idx])
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+    head.eval()
+    return head
+
+def save_exit_head(head, model_path, exit_layer, margin):
+    import torch
+
+    path = os.path.join(model_path, EXIT_HEAD_FILE)
+    torch.save({"state_dict": head.state_dict(), "exit_layer": exit_layer, "margin": margin}, path)
+    logger.info(f"Saved exit head (layer {exit_layer}, margin {margin}) to {path}")
+    return path
+
+class EarlyExitModel:
+    """
+    Wraps a BertForSequenceClassification so it is still called as model(**inputs).logits.
+
+    Runs embeddings + the first exit_layer encoder layers for the whole batch and
+    scores them with the exit head. Rows whose top-2 probability margin is below
+    `margin` resume from the same hidden states through the remaining layers, the
+    pooler and the original classifier, so escalated rows cost the same as before
+    and confident rows skip (L - exit_layer) layers.
+    """
+
+    def __init__(self, model, head, exit_layer, margin):
+        self.model = model
+        self.head = head
+        self.exit_layer = exit_layer
+        self.margin = margin
+        self.total_layers = len(model.bert.encoder.layer)
+        self.rows = 0
+        self.escalated = 0
+
+    def eval(self):
+        self.model.eval()
+        self.head.eval()
+        return self
+
+    def __call__(self, input_ids, attention_mask, token_type_ids=None, **kwargs):
+        import torch
+
+        bert = self.model.bert
+        extended_mask = bert.get_extended_attention_mask(attention_mask, input_ids.shape)
+        hidden = bert.embeddings(input_ids=input_ids, token_type_ids=token_type_ids)
+        for layer in bert.encoder.layer[:self.exit_layer]:
+            hidden = layer(hidden, attention_mask=extended_mask)[0]
+
+        # Log-probabilities as logits: softmax downstream recovers the exit-head probabilities
+        logits = torch.log_softmax(self.head(hidden[:, 0]), dim=1)
+        top2 = torch.softmax(logits, dim=1).topk(2, dim=1).values
+        escalate = (top2[:, 0] - top2[:, 1]) < self.margin
+
+        if escalate.any():
+            rows = escalate.nonzero(as_tuple=True)[0]
+            deep = hidden[rows]
+            deep_mask = extended_mask[rows]
+            for layer in bert.encoder.layer[self.exit_layer:]:
+                deep = layer(deep, attention_mask=deep_mask)[0]
+            full_logits = self.model.classifier(self.model.dropout(bert.pooler(deep)))
+            logits[rows] = torch.log_softmax(full_logits, dim=1)
+
+        self.rows += int(input_ids.shape[0])
+        self.escalated += int(escalate.sum())
+        return SimpleNamespace(logits=logits)
+
+    def stats(self) -> dict:
+        escalation_rate = self.escalated / self.rows if self.rows else 0.0
+        layers = self.exit_layer + escalation_rate * (self.total_layers - self.exit_layer)
+        return {
+            "exit_layer": self.exit_layer,
+            "margin": self.margin,
+            "rows": self.rows,
+            "escalation_rate": round(escalation_rate, 4),
+            "relative_layer_compute": round(layers / self.total_layers, 4) if self.rows else 1.0,
+        }
+
+def fast_tier_id(model_path) -> str:
+    """Cache-namespace component: predictions differ between the fast tier and the full model."""
+    if not BIAS_FAST_TIER or not os.path.exists(os.path.join(model_path, EXIT_HEAD_FILE)):
+        return "full"
+    config = _load_head_config(model_path)
+    return f"exit{config['exit_layer']}@{config['margin']}"
+
+def _load_head_config(model_path):
+    import torch
+
+    saved = torch.load(os.path.join(model_path, EXIT_HEAD_FILE), map_location="cpu")
+    if _EXIT_LAYER_ENV:
+        saved["exit_layer"] = int(_EXIT_LAYER_ENV)
+    if _ESCALATION_MARGIN_ENV:
+        saved["margin"] = float(_ESCALATION_MARGIN_ENV)
+    return saved
+
+def maybe_wrap_fast_tier(model, model_path):
+    """Wrap the model in EarlyExitModel when BIAS_FAST_TIER=1 and an exit head ships with it."""
+    if not BIAS_FAST_TIER:
+        return model
+    head_path = os.path.join(model_path, EXIT_HEAD_FILE)
+    if not os.path.exists(head_path):
+        logger.warning(f"BIAS_FAST_TIER=1 but {head_path} is missing; using the full model")
+        return model
+    if not hasattr(model, "bert"):
+        logger.warning("Fast tier needs the torch or quantized backend; using the full model")
+        return model
+
+    config = _load_head_config(model_path)
+    head = build_exit_head(model.config)
+    head.load_state_dict(config["state_dict"])
+    logger.info(f"Fast tier enabled: exit at layer {config['exit_layer']}, escalation margin {config['margin']}")
+    return EarlyExitModel(model, head, config["exit_layer"], config["margin"]).eval()
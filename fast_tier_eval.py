@@ -0,0 +1,170 @@
+"""
+Evaluate the early-exit fast tier for the bias model.
+
+Runs the full model once over the held-out test split (the one used by
+backend_parity.py), keeping the [CLS] state after every encoder layer. For each
+candidate exit layer an exit head is distilled from the full model's
+probabilities with 2-fold cross-fitting, so every comment is scored by a head
+that never saw it. Escalation margins are then swept: comments whose exit-head
+top-2 margin is below the threshold take the full model's prediction.
+
+For each (layer, margin) it reports accuracy on the true labels, agreement with
+the full model, escalation rate and the relative encoder compute per comment.
+The cheapest configuration within --max-accuracy-drop / --min-agreement is
+timed end to end against the full model. Exits non-zero if no configuration
+qualifies. --save writes exit_head.pt (trained on the whole split) into the
+model directory:
+    python fast_tier_eval.py --model-path /tmp/bias_model --layers 2 3 4 6 --save
+"""
+import os
+import sys
+import time
+import argparse
+import logging
+
+# Score and time both tiers explicitly; never let the environment wrap the model
+os.environ["BIAS_FAST_TIER"] = "0"
+
+import numpy as np  # noqa: E402
+
+from backend_parity import load_parity_set  # noqa: E402
+from fast_tier import EarlyExitModel, train_exit_head, save_exit_head  # noqa: E402
+from reddit_analysis import (  # noqa: E402
+    load_bias_model, predict_bias_batch, make_length_batches, BIAS_MAX_LENGTH, BIAS_MAX_BATCH_TOKENS, ID2LABEL,
+)
+from tokenization import encode_texts  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MARGINS = [0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9]
+
+def extract_features(model, tokenizer, posts, layers):
+    """Return ({layer: (n, hidden) [CLS] states}, (n, labels) full-model probs) as tensors."""
+    import torch
+
+    input_ids, _ = encode_texts(tokenizer, posts, BIAS_MAX_LENGTH)
+    features = {layer: [None] * len(posts) for layer in layers}
+    teacher = [None] * len(posts)
+
+    for batch in make_length_batches([len(ids) for ids in input_ids], BIAS_MAX_BATCH_TOKENS):
+        inputs = tokenizer.pad([{"input_ids": input_ids[i]} for i in batch], padding=True, return_tensors="pt")
+        with torch.no_grad():
+            output = model(**inputs, output_hidden_states=True)
+        probs = torch.softmax(output.logits, dim=1)
+        for row, i in enumerate(batch):
+            teacher[i] = probs[row]
+            # hidden_states[0] is the embedding output, hidden_states[k] the output of layer k
+            for layer in layers:
+                features[layer][i] = output.hidden_states[layer][row, 0]
+
+    return {layer: torch.stack(rows) for layer, rows in features.items()}, torch.stack(teacher)
+
+def cross_fit_exit_probs(model, features, teacher, folds, epochs):
+    """Exit-head probabilities for every row, each from a head trained on the other fold."""
+    import torch
+
+    exit_probs = torch.zeros_like(teacher)
+    for fold in range(2):
+        train_rows = np.where(folds != fold)[0]
+        test_rows = np.where(folds == fold)[0]
+        head = train_exit_head(model, features[train_rows], teacher[train_rows], epochs=epochs)
+        with torch.no_grad():
+            exit_probs[test_rows] = torch.softmax(head(features[test_rows]), dim=1)
+    return exit_probs.numpy()
+
+def sweep(exit_probs, teacher_probs, true_ids, layer, total_layers, margins):
+    """Accuracy / agreement / escalation / compute for each margin at one exit layer."""
+    top2 = np.sort(exit_probs, axis=1)[:, -2:]
+    exit_margin = top2[:, 1] - top2[:, 0]
+    exit_ids = exit_probs.argmax(axis=1)
+    full_ids = teacher_probs.argmax(axis=1)
+
+    rows = []
+    for margin in margins:
+        escalate = exit_margin < margin
+        final_ids = np.where(escalate, full_ids, exit_ids)
+        escalation_rate = float(escalate.mean())
+        rows.append({
+            "layer": layer,
+            "margin": margin,
+            "accuracy": float((final_ids == true_ids).mean()),
+            "agreement": float((final_ids == full_ids).mean()),
+            "escalation_rate": escalation_rate,
+            "relative_compute": (layer + escalation_rate * (total_layers - layer)) / total_layers,
+        })
+    return rows
+
+def time_tiers(model, tokenizer, head, config, posts):
+    """Return (full ms/comment, fast ms/comment, fast-tier stats) on the given posts."""
+    fast = EarlyExitModel(model, head, config["layer"], config["margin"]).eval()
+    timings = {}
+    for name, scorer in (("full", model), ("fast", fast)):
+        predict_bias_batch(posts[:16], scorer, tokenizer)  # warm-up
+        start = time.perf_counter()
+        predict_bias_batch(posts, scorer, tokenizer)
+        timings[name] = 1000 * (time.perf_counter() - start) / len(posts)
+    return timings["full"], timings["fast"], fast.stats()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-path", required=True)
+    parser.add_argument("--layers", type=int, nargs="+", default=[2, 3, 4, 6])
+    parser.add_argument("--margins", type=float, nargs="+", default=DEFAULT_MARGINS)
+    parser.add_argument("--limit", type=int, default=None, help="Only use the first N test rows")
+    parser.add_argument("--epochs", type=int, default=30)
+    parser.add_argument("--max-accuracy-drop", type=float, default=0.005)
+    parser.add_argument("--min-agreement", type=float, default=0.98)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", action="store_true", help="Write exit_head.pt for the selected configuration")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    posts, true_ids = load_parity_set(args.limit)
+    model, tokenizer = load_bias_model(args.model_path, backend="torch")
+    total_layers = len(model.bert.encoder.layer)
+    layers = sorted(layer for layer in set(args.layers) if 0 < layer < total_layers)
+
+    features, teacher = extract_features(model, tokenizer, posts, layers)
+    teacher_probs = teacher.numpy()
+    full_accuracy = float((teacher_probs.argmax(axis=1) == true_ids).mean())
+    print(f"Full model: acc={full_accuracy:.4f} on {len(posts)} comments ({total_layers} layers, "
+          f"labels {', '.join(ID2LABEL.values())})")
+
+    folds = np.random.default_rng(args.seed).permutation(len(posts)) % 2
+    results = []
+    for layer in layers:
+        exit_probs = cross_fit_exit_probs(model, features[layer], teacher, folds, args.epochs)
+        results.extend(sweep(exit_probs, teacher_probs, true_ids, layer, total_layers, args.margins))
+
+    for row in results:
+        print(
+            f"layer {row['layer']:>2} margin {row['margin']:.2f}: acc={row['accuracy']:.4f} "
+            f"agree={row['agreement']:.4f} escalated={row['escalation_rate']:.3f} "
+            f"compute={row['relative_compute']:.3f}"
+        )
+
+    qualifying = [
+        row for row in results
+        if row["accuracy"] >= full_accuracy - args.max_accuracy_drop and row["agreement"] >= args.min_agreement
+    ]
+    if not qualifying:
+        print("No fast-tier configuration holds accuracy within the tolerances")
+        sys.exit(1)
+    best = min(qualifying, key=lambda row: row["relative_compute"])
+    print(f"Selected: layer {best['layer']}, margin {best['margin']:.2f} "
+          f"({best['relative_compute']:.1%} of full encoder compute, acc {best['accuracy']:.4f})")
+
+    # Wall-clock check on the held-out fold with a head trained on the other one
+    train_rows, test_rows = np.where(folds == 0)[0], np.where(folds == 1)[0]
+    head = train_exit_head(model, features[best["layer"]][train_rows], teacher[train_rows], epochs=args.epochs)
+    full_ms, fast_ms, stats = time_tiers(model, tokenizer, head, best, [posts[i] for i in test_rows])
+    print(f"Timing: full {full_ms:.2f} ms/comment, fast tier {fast_ms:.2f} ms/comment "
+          f"({full_ms / fast_ms:.2f}x), escalated {stats['escalation_rate']:.3f}")
+
+    if args.save:
+        head = train_exit_head(model, features[best["layer"]], teacher, epochs=args.epochs)
+        path = save_exit_head(head, args.model_path, best["layer"], best["margin"])
+        print(f"Saved {path}; enable with BIAS_FAST_TIER=1")
+
+if __name__ == "__main__":
+    main()
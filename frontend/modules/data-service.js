@@ -1,8 +1,47 @@
 // modules/data-service.js - Data Fetching and sentiment/bias score attribution
 
+const COLUMNAR_MEDIA_TYPE = 'application/vnd.reddit-analysis.columnar+json';
+
+/**
+ * Decode a columnar payload (column arrays, vocab-coded strings and a
+ * base64 float32 bias matrix) back into the record objects the charts use.
+ */
+export function decodeColumnar(payload) {
+  if (!payload || payload.format !== 'columnar') {
+    return payload;
+  }
+
+  const records = Array.from({ length: payload.length }, () => ({}));
+
+  Object.entries(payload.columns || {}).forEach(([name, values]) => {
+    values.forEach((value, i) => { records[i][name] = value; });
+  });
+
+  Object.entries(payload.categorical || {}).forEach(([name, { vocab, codes }]) => {
+    codes.forEach((code, i) => { records[i][name] = code >= 0 ? vocab[code] : null; });
+  });
+
+  if (payload.bias) {
+    const { labels, shape, data } = payload.bias;
+    const bytes = Uint8Array.from(atob(data), c => c.charCodeAt(0));
+    const matrix = new Float32Array(bytes.buffer);
+    const width = shape[1];
+    records.forEach((record, i) => {
+      if (Number.isNaN(matrix[i * width])) return;
+      const bias = {};
+      labels.forEach((label, j) => { bias[label] = matrix[i * width + j]; });
+      record.bias = bias;
+    });
+  }
+
+  return records;
+}
+
 export class DataService {
   constructor() {
     this.backendUrl = 'https://reddit-extension-backend-541360204677.us-central1.run.app';
+    this.threadId = null;
+    this.biasCoverage = null;
   }
 
   async getRedditUrl() {
@@ -21,7 +60,7 @@ export class DataService {
   async fetchSentimentData(url) {
     const response = await fetch(`${this.backendUrl}/receive_url_fast`, {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
+      headers: { 'Content-Type': 'application/json', 'Accept': COLUMNAR_MEDIA_TYPE },
       body: JSON.stringify({ url })
     });
 
@@ -34,19 +73,30 @@ export class DataService {
       throw new Error(result.message || 'Failed to fetch sentiment data');
     }
 
-    return result.data;
+    // Lets bias requests send ids only; the server resolves bodies from its thread cache
+    this.threadId = result.thread_id || null;
+    return decodeColumnar(result.data);
   }
 
   /**
    * Add bias analysis to existing comment data
    */
   async addBiasAnalysis(comments) {
-    const response = await fetch(`${this.backendUrl}/add_bias_analysis`, {
+    const request = (body) => fetch(`${this.backendUrl}/add_bias_analysis`, {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({ comments })
+      headers: { 'Content-Type': 'application/json', 'Accept': COLUMNAR_MEDIA_TYPE },
+      body: JSON.stringify(body)
     });
 
+    let response;
+    if (this.threadId) {
+      response = await request({ thread_id: this.threadId, ids: comments.map(c => c.id) });
+    }
+    // Thread evicted from the server cache (or unknown): send the comments themselves
+    if (!response || response.status === 404) {
+      response = await request({ comments });
+    }
+
     if (!response.ok) {
       throw new Error(`HTTP error! status: ${response.status}`);
     }
@@ -56,23 +106,19 @@ export class DataService {
       throw new Error(result.message || 'Failed to fetch bias data');
     }
 
-    return result.data;
+    // How much of the thread the server's time budget covered
+    this.biasCoverage = result.coverage || null;
+    return decodeColumnar(result.data);
   }
 
   /**
-   * NEW: Get bias analysis for only the top 50 posts by score
-   * Used specifically for advanced visualizations hovertips
+   * Get bias analysis for the comments the server schedules within its time budget.
+   * The server ranks comments (score, depth, length, sentiment extremity), samples
+   * every top-level conversation and reports coverage; unscored comments keep no bias.
    */
-  async addBiasAnalysisTop50(sentimentData) {
-    // Sort by score descending and take top 50
-    const sortedData = [...sentimentData].sort((a, b) => (b.score || 0) - (a.score || 0));
-    const top50 = sortedData.slice(0, 50);
-    
-    console.log(`Getting bias analysis for top 50 posts (out of ${sentimentData.length} total)`);
-    
-    // Get bias data for top 50
-    const biasResults = await this.addBiasAnalysis(top50);
-    
+  async addBiasAnalysisScheduled(sentimentData) {
+    const biasResults = await this.addBiasAnalysis(sentimentData);
+
     // Create a map of id -> bias data for easy lookup
     const biasMap = new Map();
     biasResults.forEach(item => {
@@ -80,20 +126,22 @@ export class DataService {
         biasMap.set(item.id, item.bias);
       }
     });
-    
+
     // Merge bias data back into original dataset
     const enhancedData = sentimentData.map(item => {
       const biasData = biasMap.get(item.id);
       return biasData ? { ...item, bias: biasData } : item;
     });
-    
-    console.log(`Enhanced ${biasMap.size} posts with bias data`);
+
+    const coverage = this.biasCoverage;
+    console.log(`Enhanced ${biasMap.size} of ${sentimentData.length} posts with bias data` +
+      (coverage && coverage.budget_exhausted ? ' (time budget reached)' : ''));
     return enhancedData;
   }
 
   /**
    * Parallel data fetching with callbacks for progressive rendering
-   * NOW INCLUDES TOP 50 BIAS FOR ADVANCED VISUALIZATIONS
+   * Bias is added for the comments the server schedules (see addBiasAnalysisScheduled)
    */
   async fetchDataParallel(url, onSentimentReady, onBiasReady) {
     try {
@@ -104,8 +152,8 @@ export class DataService {
       const sentimentData = await sentimentPromise;
       onSentimentReady(sentimentData);
       
-      // For advanced visualizations, get bias for top 50 posts only
-      const biasPromise = this.addBiasAnalysisTop50(sentimentData);
+      // Server picks which comments get bias within its time budget
+      const biasPromise = this.addBiasAnalysisScheduled(sentimentData);
       
       // Get bias data and render when ready
       const biasData = await biasPromise;
@@ -119,13 +167,108 @@ export class DataService {
     }
   }
 
+  /**
+   * Streaming fetch: renders sentiment as soon as the first comment batch arrives,
+   * then merges bias scores in as inference batches finish.
+   * Reads newline-delimited JSON from /stream_url.
+   */
+  async fetchDataStreaming(url, onSentimentReady, onBiasReady) {
+    const response = await fetch(`${this.backendUrl}/stream_url`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ url })
+    });
+
+    if (!response.ok || !response.body) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+
+    const comments = [];
+    const biasMap = new Map();
+    const mergeBias = () => comments.map(item => {
+      const biasData = biasMap.get(item.id);
+      return biasData ? { ...item, bias: biasData } : item;
+    });
+
+    let firstPaintDone = false;
+    let sentimentComplete = false;
+
+    const handleMessage = (message) => {
+      switch (message.type) {
+        case 'comments':
+          comments.push(...message.data);
+          // Paint once on the first batch; the full set is painted when bias starts
+          if (!firstPaintDone) {
+            firstPaintDone = true;
+            onSentimentReady([...comments]);
+          }
+          break;
+        case 'bias':
+          if (!sentimentComplete) {
+            sentimentComplete = true;
+            onSentimentReady([...comments]);
+          }
+          message.data.forEach(item => biasMap.set(item.id, item.bias));
+          break;
+        case 'done':
+          this.biasCoverage = message.coverage || null;
+          break;
+        case 'error':
+          throw new Error(message.message || 'Failed to stream data');
+        default:
+          break;
+      }
+    };
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      let newline;
+      while ((newline = buffer.indexOf('\n')) >= 0) {
+        const line = buffer.slice(0, newline).trim();
+        buffer = buffer.slice(newline + 1);
+        if (line) handleMessage(JSON.parse(line));
+      }
+    }
+
+    if (!sentimentComplete) {
+      onSentimentReady([...comments]);
+    }
+
+    const enhancedData = mergeBias();
+    console.log(`Streamed ${comments.length} comments, ${biasMap.size} with bias data`);
+    onBiasReady(enhancedData);
+    return enhancedData;
+  }
+
   // Keep existing methods unchanged...
   async fetchFullData(url) {
-    const response = await fetch(`${this.backendUrl}/receive_url`, {
+    // Opt in to 202 + polling instead of holding the request open for the whole run
+    const submit = () => fetch(`${this.backendUrl}/receive_url`, {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
+      headers: { 'Content-Type': 'application/json', 'Prefer': 'respond-async' },
       body: JSON.stringify({ url })
     });
+    let response = await submit();
+
+    // Long bias runs continue as a server-side job: long-poll it until it finishes.
+    // Jobs live on one backend instance; a poll routed elsewhere gets a 404, so
+    // resubmit (which joins or restarts the job on the instance we reached)
+    let resubmits = 0;
+    while (response.status === 202) {
+      const { job } = await response.json();
+      response = await fetch(`${this.backendUrl}/jobs/${job.job_id}?wait=20`);
+      if (response.status === 404 && resubmits < 3) {
+        resubmits += 1;
+        response = await submit();
+      }
+    }
 
     if (!response.ok) {
       throw new Error(`HTTP error! status: ${response.status}`);
@@ -31,12 +31,22 @@ class PopupCoordinator {
       // Show initial loading state
       this.uiManager.showLoadingState();
 
-      // Fetch data with parallel processing
-      await this.dataService.fetchDataParallel(
-        url,
-        (sentimentData) => this.onSentimentReady(sentimentData),
-        (biasData) => this.onBiasReady(biasData)
-      );
+      // Stream data so charts render from the first comment batch;
+      // fall back to the two-request flow if streaming is unavailable
+      try {
+        await this.dataService.fetchDataStreaming(
+          url,
+          (sentimentData) => this.onSentimentReady(sentimentData),
+          (biasData) => this.onBiasReady(biasData)
+        );
+      } catch (streamError) {
+        console.warn('Streaming failed, falling back to parallel fetch:', streamError);
+        await this.dataService.fetchDataParallel(
+          url,
+          (sentimentData) => this.onSentimentReady(sentimentData),
+          (biasData) => this.onBiasReady(biasData)
+        );
+      }
 
     } catch (error) {
       console.error('Error processing data:', error);
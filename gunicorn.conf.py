@@ -0,0 +1,32 @@
+# Gunicorn hooks - picked up automatically from the working directory.
+# When INFERENCE_SOCKET is set, one shared inference process is started next to
+# the web workers so the bias model is loaded once per container.
+import os
+import time
+import secrets
+import subprocess
+
+# Random per-container key for the inference socket. Set here, at config load,
+# so the service and every worker (forked or preloaded) inherit it from the environment
+if os.getenv("INFERENCE_SOCKET") and not os.getenv("INFERENCE_AUTHKEY"):
+    os.environ["INFERENCE_AUTHKEY"] = secrets.token_hex(32)
+
+_inference_process = None
+
+def on_starting(server):
+    global _inference_process
+    socket_path = os.getenv("INFERENCE_SOCKET")
+    if not socket_path:
+        return
+    server.log.info(f"Starting shared inference service on {socket_path}")
+    _inference_process = subprocess.Popen(["python", "inference_server.py"])
+
+    # Give the service a moment to bind; workers fall back to local inference until it is up
+    for _ in range(50):
+        if os.path.exists(socket_path) or _inference_process.poll() is not None:
+            break
+        time.sleep(0.1)
+
+def on_exit(server):
+    if _inference_process is not None and _inference_process.poll() is None:
+        _inference_process.terminate()
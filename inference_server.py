@@ -0,0 +1,256 @@
+"""
+Shared bias inference service.
+
+One process per container holds the only copy of the bias model. Web workers
+send texts over a local socket; requests that arrive within a short window
+(`INFERENCE_MAX_WAIT_MS`) are coalesced into one micro-batched inference call
+and the results are split back per request.
+
+Started automatically by gunicorn.conf.py when INFERENCE_SOCKET is set, which
+also generates a per-container INFERENCE_AUTHKEY for the service and workers.
+By hand (any shared secret works, clients need the same value):
+    INFERENCE_AUTHKEY=$(openssl rand -hex 32) python inference_server.py
+"""
+import os
+import time
+import queue
+import logging
+import threading
+from multiprocessing.connection import Listener, Client
+
+from tokenization import get_token_cache
+from model_registry import get_model_registry
+
+logger = logging.getLogger(__name__)
+
+# Service settings (shared by server and clients)
+INFERENCE_SOCKET = os.getenv("INFERENCE_SOCKET", "")
+# No default: gunicorn.conf.py generates a random key per container
+INFERENCE_AUTHKEY = os.getenv("INFERENCE_AUTHKEY", "").encode("utf-8")
+# Seconds a client waits for a reply before falling back to local inference
+INFERENCE_TIMEOUT = float(os.getenv("INFERENCE_TIMEOUT", "30"))
+INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "20"))
+INFERENCE_MAX_BATCH_TEXTS = int(os.getenv("INFERENCE_MAX_BATCH_TEXTS", "256"))
+
+# Batch size buckets reported by the stats call
+BATCH_SIZE_BUCKETS = [1, 8, 32, 128, 512, 2048]
+
+# Global client - created on first use
+_inference_client = None
+
+class InferenceRequest:
+    """One client call waiting for its slice of a coalesced batch."""
+
+    def __init__(self, texts, model_path=None):
+        self.texts = texts
+        self.model_path = model_path
+        self.enqueued_at = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class InferenceService:
+    """Collects requests from all connections and runs them as micro-batches."""
+
+    def __init__(self, predict_fn, max_wait_ms=INFERENCE_MAX_WAIT_MS, max_batch_texts=INFERENCE_MAX_BATCH_TEXTS):
+        self.predict_fn = predict_fn
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch_texts = max_batch_texts
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+
+        self.requests_total = 0
+        self.texts_total = 0
+        self.batches_total = 0
+        self.max_queue_depth = 0
+        self.queue_wait_seconds = 0.0
+        self.inference_seconds = 0.0
+        self.batch_size_counts = {bucket: 0 for bucket in BATCH_SIZE_BUCKETS + ["+Inf"]}
+
+    def submit(self, texts, model_path=None):
+        """Enqueue texts and block until their predictions are ready."""
+        request = InferenceRequest(texts, model_path)
+        self._queue.put(request)
+        with self._lock:
+            self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def run_forever(self):
+        """Batcher loop: wait for a request, then gather more until the window closes."""
+        while True:
+            batch = [self._queue.get()]
+            size = len(batch[0].texts)
+            deadline = time.perf_counter() + self.max_wait
+            while size < self.max_batch_texts:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(request)
+                size += len(request.texts)
+            self._run_batch(batch, size)
+
+    def _run_batch(self, batch, size):
+        # Requests for different model versions share the window but not the forward pass
+        groups = {}
+        for request in batch:
+            groups.setdefault(request.model_path, []).append(request)
+
+        start = time.perf_counter()
+        for model_path, requests in groups.items():
+            texts = [text for request in requests for text in request.texts]
+            try:
+                predictions = self.predict_fn(texts, model_path) if texts else []
+                offset = 0
+                for request in requests:
+                    request.result = predictions[offset:offset + len(request.texts)]
+                    offset += len(request.texts)
+            except Exception as e:
+                logger.error(f"Inference batch of {len(texts)} texts failed: {e}")
+                for request in requests:
+                    request.error = e
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self.requests_total += len(batch)
+            self.texts_total += size
+            self.batches_total += 1
+            self.inference_seconds += elapsed
+            self.queue_wait_seconds += sum(start - request.enqueued_at for request in batch)
+            bucket = next((b for b in BATCH_SIZE_BUCKETS if size <= b), "+Inf")
+            self.batch_size_counts[bucket] += 1
+
+        for request in batch:
+            request.done.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self.max_queue_depth,
+                "requests_total": self.requests_total,
+                "texts_total": self.texts_total,
+                "batches_total": self.batches_total,
+                "avg_batch_texts": round(self.texts_total / self.batches_total, 2) if self.batches_total else 0.0,
+                "avg_queue_wait_ms": round(1000 * self.queue_wait_seconds / self.requests_total, 2)
+                                     if self.requests_total else 0.0,
+                "inference_seconds": round(self.inference_seconds, 3),
+                "batch_size_counts": {str(k): v for k, v in self.batch_size_counts.items()},
+                "tokenization": get_token_cache().stats(),
+                "models": get_model_registry().stats(),
+            }
+
+def _serve_connection(conn, service):
+    """Handle one client connection until it closes."""
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                break
+            op = message.get("op")
+            try:
+                if op == "predict":
+                    data = service.submit(message["texts"], message.get("model_path"))
+                    conn.send({"status": "success", "data": data})
+                elif op == "stats":
+                    conn.send({"status": "success", "data": service.stats()})
+                else:
+                    conn.send({"status": "error", "message": f"Unknown op: {op}"})
+            except Exception as e:
+                conn.send({"status": "error", "message": str(e)})
+    except OSError as e:
+        # The client gave up on this connection (e.g. INFERENCE_TIMEOUT) before the reply
+        logger.info(f"Inference client disconnected: {e}")
+    finally:
+        conn.close()
+
+def serve(address=INFERENCE_SOCKET, model_path=None):
+    """Load the model once and serve inference requests on a local socket."""
+    from reddit_analysis import load_bias_model, predict_bias_batch
+    from server_common import get_bias_model_path
+
+    if not address:
+        raise ValueError("INFERENCE_SOCKET must be set to serve inference")
+    if not INFERENCE_AUTHKEY:
+        raise ValueError("INFERENCE_AUTHKEY must be set to serve inference")
+
+    if os.path.exists(address):
+        os.remove(address)
+    listener = Listener(address, family="AF_UNIX", authkey=INFERENCE_AUTHKEY)
+    logger.info(f"Inference service listening on {address}")
+
+    # Bind first so early requests queue up while the model loads instead of
+    # sending every web worker to its own local fallback copy
+    service = InferenceService(None)
+    threading.Thread(target=_accept_loop, args=(listener, service), name="accept", daemon=True).start()
+
+    # Other versions (requested by model_path) load on demand through the model registry
+    default_path = model_path or get_bias_model_path()
+    load_bias_model(default_path)
+    service.predict_fn = lambda texts, path: predict_bias_batch(texts, *load_bias_model(path or default_path))
+    logger.info("Inference service model loaded")
+    service.run_forever()
+
+def _accept_loop(listener, service):
+    while True:
+        try:
+            conn = listener.accept()
+        except Exception as e:
+            logger.warning(f"Rejected inference connection: {e}")
+            continue
+        threading.Thread(target=_serve_connection, args=(conn, service), daemon=True).start()
+
+class InferenceClient:
+    """Thin client used by web workers; one connection per thread."""
+
+    def __init__(self, address=INFERENCE_SOCKET, timeout=INFERENCE_TIMEOUT):
+        self.address = address
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _call(self, message):
+        conn = getattr(self._local, "conn", None)
+        try:
+            if conn is None:
+                conn = Client(self.address, family="AF_UNIX", authkey=INFERENCE_AUTHKEY)
+                self._local.conn = conn
+            conn.send(message)
+            if not conn.poll(self.timeout):
+                # A late reply would be read by the next call, so this connection is done
+                conn.close()
+                raise TimeoutError(f"No reply from inference service within {self.timeout}s")
+            reply = conn.recv()
+        except (OSError, EOFError):
+            # Drop the broken connection so the next call reconnects
+            self._local.conn = None
+            raise
+        if reply.get("status") != "success":
+            raise RuntimeError(reply.get("message", "Inference service error"))
+        return reply["data"]
+
+    def predict(self, texts, model_path=None):
+        """Predict bias for texts via the shared service, results in input order."""
+        return self._call({"op": "predict", "texts": list(texts), "model_path": model_path})
+
+    def stats(self) -> dict:
+        return self._call({"op": "stats"})
+
+def get_inference_client():
+    """Return the shared-service client, or None when INFERENCE_SOCKET or INFERENCE_AUTHKEY is unset."""
+    global _inference_client
+    if not INFERENCE_SOCKET or not INFERENCE_AUTHKEY:
+        return None
+    if _inference_client is None:
+        _inference_client = InferenceClient(INFERENCE_SOCKET)
+    return _inference_client
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    serve()
@@ -0,0 +1,336 @@
+import os
+import json
+import gzip
+import time
+import uuid
+import asyncio
+import logging
+import sqlite3
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Job store shared by all gunicorn workers, so a job can be polled through any of them.
+# It is per container: with several Cloud Run instances, enable session affinity so
+# polls reach the instance that owns the job (clients resubmit on a 404 otherwise)
+JOB_DB = os.getenv("JOB_DB", "/tmp/analysis_jobs.sqlite")
+# Concurrent jobs per worker, and the bias budget of a job (no request timeout applies)
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "2"))
+JOB_BIAS_BUDGET = float(os.getenv("JOB_BIAS_BUDGET", "300"))
+# A finished job is handed to identical submissions for JOB_RESULT_TTL seconds and
+# kept for polling for JOB_RETENTION seconds
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", "60"))
+JOB_RETENTION = float(os.getenv("JOB_RETENTION", "3600"))
+# Running jobs heartbeat; one silent for JOB_STALE_SECONDS (its worker died) is taken over
+JOB_HEARTBEAT_SECONDS = 5.0
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "30"))
+# How long /receive_url waits on its job before answering 202 with the job id, for
+# clients that opt in to polling; a sync worker is held meanwhile, so keep it well
+# under gunicorn's 120s timeout
+RECEIVE_URL_WAIT = float(os.getenv("RECEIVE_URL_WAIT", "25"))
+# Other clients keep the blocking contract: wait this long for the result, then 504
+# (just under gunicorn's timeout, which would otherwise kill the worker)
+RECEIVE_URL_MAX_WAIT = float(os.getenv("RECEIVE_URL_MAX_WAIT", "110"))
+
+FINISHED_STATUSES = ("done", "failed")
+
+# Global instances - created on first use
+_job_store = None
+_job_runner = None
+
+class SingleFlight:
+    """
+    In-process call deduplication: concurrent calls with the same key share one
+    computation. Works across threads and event loops (callers wait on a
+    concurrent.futures.Future).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.leaders = 0
+        self.joined = 0
+
+    async def run(self, key, coro_fn):
+        """Await coro_fn() unless a call for key is already in flight, then await that one."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self.leaders += 1
+            else:
+                self.joined += 1
+        if not leader:
+            return await asyncio.wrap_future(future)
+
+        try:
+            result = await coro_fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"in_flight": len(self._calls), "leaders": self.leaders, "joined": self.joined}
+
+def job_key(submission_id, model_version) -> str:
+    """Identical analyses share a job: same canonical submission id and model version."""
+    return f"thread:{submission_id}:{model_version}"
+
+class JobStore:
+    """
+    SQLite table of analysis jobs and their (gzipped JSON) results.
+
+    claim() is atomic across processes, so concurrent submissions of the same key
+    from different workers end up on one job.
+    """
+
+    def __init__(self, db_path=JOB_DB):
+        self.db_path = db_path or ":memory:"
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False, timeout=10, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, key TEXT NOT NULL, status TEXT NOT NULL, "
+            "stage TEXT, meta TEXT, created REAL, updated REAL, finished REAL, result BLOB, error TEXT)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_key ON jobs (key, created)")
+
+    def claim(self, key, meta=None):
+        """Return (job_id, created): a live or recently finished job for key, else a new queued one."""
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT id FROM jobs WHERE key = ? AND ("
+                    "(status IN ('queued', 'running') AND updated > ?) OR (status = 'done' AND finished > ?)"
+                    ") ORDER BY created DESC LIMIT 1",
+                    (key, now - JOB_STALE_SECONDS, now - JOB_RESULT_TTL),
+                ).fetchone()
+                if row is not None:
+                    self._db.execute("COMMIT")
+                    return row[0], False
+
+                job_id = uuid.uuid4().hex
+                self._db.execute(
+                    "INSERT INTO jobs (id, key, status, stage, meta, created, updated) VALUES (?, ?, 'queued', ?, ?, ?, ?)",
+                    (job_id, key, "queued", json.dumps(meta or {}), now, now),
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return job_id, True
+
+    def update(self, job_id, status=None, stage=None):
+        """Record progress; also serves as the heartbeat of a running job."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = COALESCE(?, status), stage = COALESCE(?, stage), updated = ? WHERE id = ?",
+                (status, stage, time.time(), job_id),
+            )
+
+    def finish(self, job_id, result):
+        body = gzip.compress(json.dumps(result, separators=(",", ":")).encode("utf-8"), compresslevel=5)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = 'done', stage = 'done', result = ?, updated = ?, finished = ? WHERE id = ?",
+                (body, now, now, job_id),
+            )
+
+    def fail(self, job_id, error):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, updated = ?, finished = ? WHERE id = ?",
+                (str(error), now, now, job_id),
+            )
+
+    def get(self, job_id, include_result=True):
+        """Job status dict (with the decoded result once done), or None for unknown ids."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, status, stage, meta, created, updated, finished, error, "
+                f"{'result' if include_result else 'NULL'} FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        job_id, status, stage, meta, created, updated, finished, error, result = row
+        if status in ("queued", "running") and time.time() - updated > JOB_STALE_SECONDS:
+            status, error = "failed", "Job worker stopped responding; resubmit"
+        job = {
+            "job_id": job_id,
+            "status": status,
+            "stage": stage,
+            **json.loads(meta or "{}"),
+            "elapsed_seconds": round((finished or time.time()) - created, 3),
+        }
+        if error:
+            job["error"] = error
+        if result is not None:
+            job["result"] = json.loads(gzip.decompress(result))
+        return job
+
+    def purge(self, retention=JOB_RETENTION):
+        with self._lock:
+            self._db.execute("DELETE FROM jobs WHERE updated < ?", (time.time() - retention,))
+
+    def counts(self) -> dict:
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+class JobRunner:
+    """
+    Runs thread-analysis jobs on a background event loop with its own Reddit
+    client, so jobs outlive the request that submitted them.
+    """
+
+    def __init__(self, store, client_factory=None, concurrency=JOB_CONCURRENCY):
+        self.store = store
+        self.client_factory = client_factory
+        self.concurrency = concurrency
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="job")
+        self._loop = None
+        self._reddit = None
+        self._semaphore = None
+        self._start_lock = threading.Lock()
+        self.submitted = 0
+        self.deduplicated = 0
+
+    def _ensure_started(self):
+        with self._start_lock:
+            if self._loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="jobs", daemon=True).start()
+            self._semaphore = asyncio.run_coroutine_threadsafe(self._make_semaphore(), loop).result()
+            self._loop = loop
+
+    async def _make_semaphore(self):
+        return asyncio.Semaphore(self.concurrency)
+
+    async def _client(self):
+        # asyncpraw sessions are bound to the loop they were created on
+        if self._reddit is None:
+            if self.client_factory is None:
+                from server_common import create_reddit_client
+                self._reddit = create_reddit_client()
+            else:
+                self._reddit = self.client_factory()
+        return self._reddit
+
+    def submit(self, url, model_version):
+        """Start (or join) the analysis job for a thread URL. Returns (job_id, created)."""
+        from reddit_analysis import extract_submission_id
+
+        job_id, created = self.store.claim(
+            job_key(extract_submission_id(url), model_version), {"url": url, "model_version": model_version}
+        )
+        if created:
+            self.submitted += 1
+            self.store.purge()
+            self._ensure_started()
+            asyncio.run_coroutine_threadsafe(self._run(job_id, url, model_version), self._loop)
+        else:
+            self.deduplicated += 1
+        return job_id, created
+
+    async def _run(self, job_id, url, model_version):
+        from reddit_analysis import (
+            load_thread_with_sentiment, add_bias_scores_budgeted, extract_submission_id, run_blocking,
+        )
+        from server_common import BIAS_COMMENT_LIMIT, get_bias_model_path
+        from aggregates import compute_thread_aggregates
+
+        # Queued jobs heartbeat too, so waiting for a slot never looks like a dead worker
+        heartbeat = asyncio.ensure_future(self._heartbeat(job_id))
+        try:
+            async with self._semaphore:
+                self.store.update(job_id, "running", "reddit_fetch")
+                df = await load_thread_with_sentiment(url, await self._client(), executor=self.executor)
+
+                self.store.update(job_id, stage="bias")
+                model_path = await run_blocking(self.executor, get_bias_model_path, model_version)
+                df, coverage = await run_blocking(
+                    self.executor, add_bias_scores_budgeted, df, model_path, BIAS_COMMENT_LIMIT, JOB_BIAS_BUDGET
+                )
+                summary = await run_blocking(self.executor, compute_thread_aggregates, df)
+                result = {
+                    "data": df.to_dict(orient='records'),
+                    "summary": summary,
+                    "thread_id": extract_submission_id(url),
+                    "coverage": coverage,
+                    "sentiment_dedup": df.attrs.get('sentiment_dedup'),
+                    "model_version": model_version,
+                }
+                await run_blocking(self.executor, self.store.finish, job_id, result)
+                logger.info(f"Job {job_id} finished: {len(df)} comments")
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}")
+            await run_blocking(self.executor, self.store.fail, job_id, e)
+        finally:
+            heartbeat.cancel()
+
+    async def _heartbeat(self, job_id):
+        # Runs on the loop itself: the executor may be busy with bias inference
+        while True:
+            await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+            self.store.update(job_id)
+
+    def wait(self, job_id, timeout, poll_interval=0.25):
+        """Block until the job finishes or timeout passes; returns the latest job dict."""
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.store.get(job_id, include_result=False)
+            if job is None or job["status"] in FINISHED_STATUSES or time.monotonic() >= deadline:
+                break
+            time.sleep(poll_interval)
+        return self.store.get(job_id) if job is not None and job["status"] == "done" else job
+
+    async def wait_async(self, job_id, timeout, poll_interval=0.25, executor=None):
+        """wait() for event loops: sleeps on the loop between polls instead of holding a thread."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            job = self.store.get(job_id, include_result=False)
+            if job is None or job["status"] in FINISHED_STATUSES or loop.time() >= deadline:
+                break
+            await asyncio.sleep(poll_interval)
+        if job is not None and job["status"] == "done":
+            # Decoding the result can take a while for large threads
+            return await loop.run_in_executor(executor, self.store.get, job_id)
+        return job
+
+    def stats(self) -> dict:
+        return {
+            "submitted": self.submitted,
+            "deduplicated": self.deduplicated,
+            "jobs_by_status": self.store.counts(),
+        }
+
+def get_job_store() -> JobStore:
+    """Get or create the process-wide job store."""
+    global _job_store
+    if _job_store is None:
+        _job_store = JobStore(JOB_DB)
+        _job_store.purge()
+    return _job_store
+
+def get_job_runner() -> JobRunner:
+    """Get or create the process-wide job runner."""
+    global _job_runner
+    if _job_runner is None:
+        _job_runner = JobRunner(get_job_store())
+    return _job_runner
@@ -1,14 +1,32 @@
-from flask import Flask, request, jsonify, make_response
+from flask import Flask, request, jsonify, make_response, Response, stream_with_context, g
 from flask_cors import CORS
 import asyncio
-import asyncpraw
+import json
 import os
+import time
 import logging
 import nest_asyncio
 import pandas as pd
 
-from reddit_analysis import load_and_prepare_reddit_df, add_sentiment_scores, add_bias_scores
-from model_loader import download_model_from_gcs
+from reddit_analysis import (
+    load_thread_with_sentiment, add_bias_scores_budgeted, fetch_thread_for_stream,
+    iter_scored_batches, iter_bias_predictions, extract_submission_id
+)
+from comment_scheduler import BiasSchedule
+from thread_cache import get_thread_cache
+from bulk_analysis import analyze_bulk, resolve_targets, BULK_CONCURRENCY
+from wire_format import COLUMNAR_MEDIA_TYPE, wants_columnar, encode_columnar, encode_response
+from inference_server import get_inference_client
+from startup import start_background_warmup, get_startup_pipeline
+from metrics import render_metrics, request_started, request_finished, wants_profile, RequestProfiler
+from server_common import (
+    BIAS_COMMENT_LIMIT, CORS_ORIGINS, validate_environment, validate_reddit_url,
+    get_bias_model_path, resolve_model_version, create_reddit_client, load_summary_thread,
+    wants_async
+)
+from model_registry import get_model_registry
+from aggregates import compute_thread_aggregates
+from jobs import get_job_runner, get_job_store, FINISHED_STATUSES, RECEIVE_URL_WAIT, RECEIVE_URL_MAX_WAIT
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -17,24 +35,14 @@ logger = logging.getLogger(__name__)
 # Allow nested event loops (needed for notebooks or other async contexts)
 nest_asyncio.apply()
 
-# Global model cache - loads once, reuses across requests
-_bias_model_path = None
-
 app = Flask(__name__)
 
 # Browser specific CORS configuration. Now supports the 4 main browsers.
 # SECURE VERSION:
 CORS(app,
-     origins=[
-         "chrome-extension://*",     # Chrome, Edge, Brave, etc.
-         "opera-extension://*",      # Opera
-         "moz-extension://*",        # Firefox
-         "safari-web-extension://*", # Safari
-         "https://*.reddit.com",
-         "https://reddit.com"
-     ],
+     origins=CORS_ORIGINS,
      methods=["GET", "POST", "OPTIONS"],
-     allow_headers=["Content-Type"],
+     allow_headers=["Content-Type", "Prefer"],
      supports_credentials=False
 )
 
@@ -48,37 +56,58 @@ def handle_preflight():
         response.headers.add('Access-Control-Allow-Methods', "*")
         return response
 
-def validate_environment():
-    """Validate required environment variables on startup."""
-    required_vars = ['REDDIT_CLIENT_ID', 'REDDIT_CLIENT_SECRET', 'REDDIT_USER_AGENT']
-    missing = [var for var in required_vars if not os.getenv(var)]
-    if missing:
-        raise ValueError(f"Missing required environment variables: {missing}")
-
-def validate_reddit_url(url):
-    """Basic validation for Reddit URLs."""
-    if not url or not isinstance(url, str):
-        return False
-    return 'reddit.com' in url or 'redd.it' in url
-
-def get_bias_model_path():
-    """Get or load bias model path (cached globally)."""
-    global _bias_model_path
-    if not _bias_model_path:
-        logger.info("Loading bias model from GCS...")
-        _bias_model_path = download_model_from_gcs("bias_model")
-        logger.info(f"Bias model loaded at: {_bias_model_path}")
-    return _bias_model_path
-
-# Validate environment on startup
-validate_environment()
-
-# Set up Reddit client from environment variables
-reddit = asyncpraw.Reddit(
-    client_id=os.getenv("REDDIT_CLIENT_ID"),
-    client_secret=os.getenv("REDDIT_CLIENT_SECRET"),
-    user_agent=os.getenv("REDDIT_USER_AGENT")
-)
+# Request metrics: in-flight gauge, latency histogram, optional per-request profile
+@app.before_request
+def start_request_metrics():
+    g.metrics_endpoint = request.endpoint or "unknown"
+    g.metrics_started = request_started(g.metrics_endpoint)
+    if wants_profile(request.args, request.headers):
+        g.profiler = RequestProfiler(g.metrics_endpoint).start()
+
+@app.after_request
+def record_response_status(response):
+    g.metrics_status = response.status_code
+    if g.get('profiler') is not None:
+        response.headers['X-Profile-File'] = g.profiler.path
+    return response
+
+@app.teardown_request
+def finish_request_metrics(error=None):
+    # Runs after streamed bodies finish, so NDJSON routes are timed end to end
+    if 'metrics_started' not in g:
+        return
+    if g.get('profiler') is not None:
+        g.profiler.stop()
+    request_finished(g.metrics_endpoint, g.get('metrics_status', 500), g.metrics_started)
+
+# Sentiment pool workers are spawned, and under `python main.py` they re-import
+# this file as __mp_main__; only the serving process runs the startup below
+reddit = None
+if __name__ != '__mp_main__':
+    # Validate environment on startup
+    validate_environment()
+
+    # Set up Reddit client from environment variables
+    reddit = create_reddit_client()
+
+    # Download, load and warm up the bias model in the background
+    start_background_warmup()
+
+def data_response(df, **extra):
+    """
+    Success response for a comment frame.
+
+    Record-oriented JSON by default; column arrays with a float32 bias matrix
+    when the client sends Accept: application/vnd.reddit-analysis.columnar+json.
+    Both are gzip/brotli compressed when the client accepts it.
+    """
+    if wants_columnar(request):
+        payload = {"status": "success", "data": encode_columnar(df), **extra}
+        body, headers = encode_response(payload, request, COLUMNAR_MEDIA_TYPE)
+    else:
+        payload = {"status": "success", "data": df.to_dict(orient='records'), **extra}
+        body, headers = encode_response(payload, request)
+    return Response(body, status=200, headers=headers)
 
 # PARALLEL PROCESSING ENDPOINTS
 
@@ -98,14 +127,12 @@ def receive_url_fast():
         if not validate_reddit_url(url):
             return jsonify({"status": "error", "message": "Invalid Reddit URL"}), 400
 
-        # Process Reddit data and sentiment (fast operations)
+        # Process Reddit data and sentiment (fast operations, cached per thread)
         loop = asyncio.get_event_loop()
-        df = loop.run_until_complete(load_and_prepare_reddit_df(url, reddit))
-        df = add_sentiment_scores(df)
+        df = loop.run_until_complete(load_thread_with_sentiment(url, reddit))
         
-        result = df.to_dict(orient='records')
-        logger.info(f"Fast processing completed for {len(result)} comments")
-        return jsonify({"status": "success", "data": result}), 200
+        logger.info(f"Fast processing completed for {len(df)} comments")
+        return data_response(df, thread_id=extract_submission_id(url), sentiment_dedup=df.attrs.get('sentiment_dedup'))
         
     except Exception as e:
         logger.error(f"Error in fast processing: {e}")
@@ -115,36 +142,216 @@ def receive_url_fast():
 def add_bias_analysis():
     """
     Separate route that adds bias analysis to existing comment data.
-    Takes comment data and returns it with bias scores added.
+
+    Accepts either the legacy {"comments": [...records...]} body, or an id-only
+    {"thread_id": ..., "ids": [...]} body resolved against the server-side thread
+    cache (thread_id comes from /receive_url_fast). Id-only requests get back
+    just id + bias for the comments that were scored.
+
+    Which comments get bias inference is decided server-side by a budgeted
+    scheduler (see comment_scheduler.py); the response carries coverage stats.
     """
     try:
         data = request.get_json()
-        if not data or 'comments' not in data:
-            return jsonify({"status": "error", "message": "Comments data required"}), 400
-        
-        comments = data.get('comments')[:60] #limit to 60 comments- bias analysis is slow.
-        
-        # Convert back to DataFrame for processing
-        df = pd.DataFrame(comments)
-        
-        # Add bias analysis (slow operation)
-        model_path = get_bias_model_path()
-        df = add_bias_scores(df, model_path=model_path)
-        
-        result = df.to_dict(orient='records')
-        logger.info(f"Bias analysis completed for {len(result)} comments")
-        return jsonify({"status": "success", "data": result}), 200
+        if not data or ('comments' not in data and 'thread_id' not in data):
+            return jsonify({"status": "error", "message": "Comments data or thread_id required"}), 400
+
+        if 'comments' in data:
+            # Convert back to DataFrame for processing
+            df = pd.DataFrame(data.get('comments'))
+        else:
+            entry = get_thread_cache().get(data.get('thread_id'))
+            if entry is None:
+                return jsonify({"status": "error", "message": "Thread not cached; reload it via /receive_url_fast"}), 404
+            df = entry.df
+            if data.get('ids') is not None:
+                df = df[df['id'].isin(data.get('ids'))]
+            df = df.copy()
+
+        # Add bias analysis (slow operation) to the comments that fit the time budget
+        version = resolve_model_version(data, data.get('thread_id'))
+        model_path = get_bias_model_path(version)
+        df, coverage = add_bias_scores_budgeted(df, model_path, limit=BIAS_COMMENT_LIMIT)
+        if 'comments' not in data:
+            df = df.loc[df['bias'].notna(), ['id', 'bias']]
+
+        logger.info(f"Bias analysis completed for {coverage['scored']}/{coverage['eligible']} comments")
+        return data_response(df, coverage=coverage, model_version=version)
         
+    except ValueError as e:
+        logger.warning(f"Validation error: {e}")
+        return jsonify({"status": "error", "message": str(e)}), 400
     except Exception as e:
         logger.error(f"Error in bias analysis: {e}")
         return jsonify({"status": "error", "message": "Failed to analyze bias"}), 500
 
+@app.route('/thread_summary', methods=['POST'])
+def thread_summary():
+    """
+    Precomputed chart aggregates for a thread instead of its comments.
+
+    Body: {"thread_id": ...} (from /receive_url_fast) and/or {"url": ...}, plus
+    optional "bias" (default true), "model_version" and "time_bucket" seconds.
+    A cached thread_id is used first, then the URL (see server_common.load_summary_thread).
+    Returns per-oc_bin_id, per-level and created_utc-bucket statistics
+    (see aggregates.py) - kilobytes, where the comment records are megabytes.
+    """
+    try:
+        data = request.get_json(silent=True)
+        thread_id, df = asyncio.get_event_loop().run_until_complete(load_summary_thread(data, reddit))
+        if df is None:
+            return jsonify({"status": "error", "message": "Thread not cached; reload it via /receive_url_fast"}), 404
+
+        extra = {"thread_id": thread_id}
+        if data.get('bias', True):
+            version = resolve_model_version(data, thread_id)
+            df, coverage = add_bias_scores_budgeted(df.copy(), get_bias_model_path(version), limit=BIAS_COMMENT_LIMIT)
+            extra.update(coverage=coverage, model_version=version)
+
+        summary = compute_thread_aggregates(df, time_bucket=data.get('time_bucket'))
+        body, headers = encode_response({"status": "success", "summary": summary, **extra}, request)
+        return Response(body, status=200, headers=headers)
+
+    except ValueError as e:
+        logger.warning(f"Validation error: {e}")
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error in thread summary: {e}")
+        return jsonify({"status": "error", "message": "Failed to summarize thread"}), 500
+
+# STREAMING ENDPOINT
+
+# Rows per streamed sentiment batch / texts per streamed bias batch
+STREAM_BATCH_ROWS = int(os.getenv("STREAM_BATCH_ROWS", "200"))
+STREAM_BIAS_CHUNK = int(os.getenv("STREAM_BIAS_CHUNK", "64"))
+
+def _ndjson(message):
+    return json.dumps(message) + "\n"
+
+@app.route('/stream_url', methods=['POST'])
+def stream_url():
+    """
+    Streams newline-delimited JSON so the popup can render before the thread is done.
+
+    Emits, in order: a "comments" message per batch of whole top-level comment
+    groups as soon as it is sentiment-scored, a "bias" message per inference
+    batch ({id, bias} pairs, highest-priority comments first), then "done" with
+    bias coverage stats.
+    """
+    data = request.get_json()
+    if not data or 'url' not in data:
+        return jsonify({"status": "error", "message": "URL is required"}), 400
+
+    url = data.get('url')
+    if not validate_reddit_url(url):
+        return jsonify({"status": "error", "message": "Invalid Reddit URL"}), 400
+    include_bias = data.get('bias', True)
+    try:
+        version = resolve_model_version(data, extract_submission_id(url)) if include_bias else None
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    def generate():
+        try:
+            loop = asyncio.get_event_loop()
+            df, is_scored = loop.run_until_complete(fetch_thread_for_stream(url, reddit))
+            yield _ndjson({"type": "meta", "total_comments": len(df)})
+
+            scored, coverage = [], None
+            for batch in iter_scored_batches(url, df, is_scored, STREAM_BATCH_ROWS):
+                scored.append(batch)
+                yield _ndjson({"type": "comments", "data": batch.to_dict(orient='records')})
+
+            if include_bias and scored:
+                bias_df = pd.concat(scored, ignore_index=True)
+                ids = bias_df['id'].tolist()
+                model_path = get_bias_model_path(version)
+                schedule = BiasSchedule(bias_df, limit=BIAS_COMMENT_LIMIT, chunk_size=STREAM_BIAS_CHUNK)
+                for rows, predictions in schedule.run(
+                    lambda texts, n: iter_bias_predictions(texts, model_path, n, stats=schedule.dedup)
+                ):
+                    yield _ndjson({
+                        "type": "bias",
+                        "data": [{"id": ids[i], "bias": p} for i, p in zip(rows, predictions)],
+                    })
+                coverage = schedule.coverage()
+
+            yield _ndjson({"type": "done", "coverage": coverage, "model_version": version})
+            logger.info(f"Streamed {len(df)} comments")
+
+        except Exception as e:
+            logger.error(f"Error in streaming processing: {e}")
+            yield _ndjson({"type": "error", "message": "Failed to process Reddit thread"})
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+def _iter_async(agen, loop):
+    """Drive an async generator from a sync (streaming) Flask response."""
+    while True:
+        try:
+            yield loop.run_until_complete(agen.__anext__())
+        except StopAsyncIteration:
+            return
+
+@app.route('/bulk_analysis', methods=['POST'])
+def bulk_analysis():
+    """
+    Analyse the top N threads of a subreddit and/or a list of URLs together.
+
+    Body: {"subreddit": "...", "limit": 10, "time_filter": "day", "urls": [...],
+           "bias": true, "comments": false, "concurrency": 4}
+    Streams NDJSON: one "thread" result per thread as it finishes, then a
+    "rollup" with per-subreddit sentiment/bias aggregates.
+    """
+    data = request.get_json()
+    if not data or not (data.get('subreddit') or data.get('urls')):
+        return jsonify({"status": "error", "message": "subreddit or urls required"}), 400
+
+    urls = data.get('urls') or []
+    if any(not validate_reddit_url(url) for url in urls):
+        return jsonify({"status": "error", "message": "Invalid Reddit URL"}), 400
+    try:
+        version = resolve_model_version(data)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    def generate():
+        try:
+            loop = asyncio.get_event_loop()
+            targets = loop.run_until_complete(resolve_targets(
+                reddit, data.get('subreddit'), urls,
+                limit=int(data.get('limit', 10)), time_filter=data.get('time_filter', 'day')
+            ))
+            yield _ndjson({"type": "meta", "threads": len(targets)})
+
+            model_path = get_bias_model_path(version) if data.get('bias', True) else None
+            results = analyze_bulk(
+                reddit, targets, model_path,
+                concurrency=int(data.get('concurrency', BULK_CONCURRENCY)),
+                include_comments=bool(data.get('comments', False)),
+            )
+            for result in _iter_async(results, loop):
+                yield _ndjson(result)
+            logger.info(f"Bulk analysis completed for {len(targets)} threads")
+
+        except Exception as e:
+            logger.error(f"Error in bulk analysis: {e}")
+            yield _ndjson({"type": "error", "message": "Failed to run bulk analysis"})
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 # ORIGINAL COMBINED ENDPOINT (for backward compatibility)
 @app.route('/receive_url', methods=['POST'])
 def receive_url():
     """
     Original endpoint - processes both sentiment and bias sequentially.
     Kept for backward compatibility.
+
+    Runs as a deduplicated job (see /jobs): concurrent requests for the same
+    thread and model version share one computation. Blocks until the result is
+    ready (504 after RECEIVE_URL_MAX_WAIT seconds). Clients that opt in with
+    "Prefer: respond-async" or ?async=1 get a 202 with the job id to poll if the
+    job is still running after RECEIVE_URL_WAIT seconds.
     """
     try:
         # Validate input
@@ -156,18 +363,13 @@ def receive_url():
         if not validate_reddit_url(url):
             return jsonify({"status": "error", "message": "Invalid Reddit URL"}), 400
 
-        # Process the request (full pipeline)
-        loop = asyncio.get_event_loop()
-        df = loop.run_until_complete(load_and_prepare_reddit_df(url, reddit))
-        df = add_sentiment_scores(df)
-        
-        # Get cached model path
-        model_path = get_bias_model_path()
-        df = add_bias_scores(df, model_path=model_path)
-        
-        result = df.to_dict(orient='records')
-        logger.info(f"Successfully processed {len(result)} comments from URL")
-        return jsonify({"status": "success", "data": result}), 200
+        # Join (or start) the job for this thread + model version and wait for it
+        version = resolve_model_version(data, extract_submission_id(url))
+        runner = get_job_runner()
+        job_id, _ = runner.submit(url, version)
+        if wants_async(request):
+            return job_response(runner.wait(job_id, RECEIVE_URL_WAIT))
+        return job_response(runner.wait(job_id, RECEIVE_URL_MAX_WAIT), pending=False)
         
     except ValueError as e:
         logger.warning(f"Validation error: {e}")
@@ -176,6 +378,107 @@ def receive_url():
         logger.error(f"Error processing request: {e}")
         return jsonify({"status": "error", "message": "Failed to process Reddit thread"}), 500
 
+# ASYNC JOB ENDPOINTS
+
+# Longest a single GET /jobs/<id>?wait=N long-poll may block
+JOB_MAX_POLL_WAIT = float(os.getenv("JOB_MAX_POLL_WAIT", "25"))
+
+def job_response(job, pending=True):
+    """
+    Result payload once a job is done, 202 while it runs, 404/500 otherwise.
+    With pending=False (blocking /receive_url) a running job is a 504 instead.
+    """
+    if job is None:
+        return jsonify({"status": "error", "message": "Unknown job id"}), 404
+    result = job.pop("result", None)
+    if job["status"] == "done" and result is not None:
+        df = pd.DataFrame(result.pop("data"))
+        return data_response(df, job=job, **result)
+    if job["status"] == "failed":
+        return jsonify({"status": "error", "job": job, "message": "Failed to process Reddit thread"}), 500
+    if not pending:
+        return jsonify({"status": "error", "job": job, "message": "Timed out waiting for the analysis"}), 504
+    response = jsonify({"status": "pending", "job": job})
+    response.headers["Location"] = f"/jobs/{job['job_id']}"
+    return response, 202
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """
+    Start a thread analysis (sentiment + bias) without holding the request open.
+
+    Body: {"url": ..., "model_version": optional}. Returns 202 with a job id;
+    identical submissions (same submission id and model version) share one job.
+    """
+    data = request.get_json()
+    if not data or 'url' not in data:
+        return jsonify({"status": "error", "message": "URL is required"}), 400
+
+    url = data.get('url')
+    if not validate_reddit_url(url):
+        return jsonify({"status": "error", "message": "Invalid Reddit URL"}), 400
+    try:
+        version = resolve_model_version(data, extract_submission_id(url))
+        job_id, created = get_job_runner().submit(url, version)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error submitting job: {e}")
+        return jsonify({"status": "error", "message": "Failed to submit job"}), 500
+
+    response = jsonify({"status": "accepted", "job_id": job_id, "deduplicated": not created})
+    response.headers["Location"] = f"/jobs/{job_id}"
+    return response, 202
+
+@app.route('/jobs/<job_id>')
+def get_job(job_id):
+    """Job status, or the result once done. ?wait=N long-polls up to JOB_MAX_POLL_WAIT seconds."""
+    wait = min(float(request.args.get('wait', 0) or 0), JOB_MAX_POLL_WAIT)
+    if wait > 0:
+        return job_response(get_job_runner().wait(job_id, wait))
+    return job_response(get_job_store().get(job_id))
+
+@app.route('/jobs/<job_id>/stream')
+def stream_job(job_id):
+    """
+    NDJSON progress for a job: a "status" message whenever the stage changes,
+    then "result" (same fields as the /receive_url body) or "error". The stream
+    holds a sync worker, so it ends with "timeout" after JOB_MAX_POLL_WAIT seconds
+    (well under gunicorn's 120s timeout); reconnect to keep following.
+    """
+    store = get_job_store()
+    if store.get(job_id, include_result=False) is None:
+        return jsonify({"status": "error", "message": "Unknown job id"}), 404
+
+    def generate():
+        deadline = time.monotonic() + JOB_MAX_POLL_WAIT
+        last_stage = None
+        while time.monotonic() < deadline:
+            job = store.get(job_id, include_result=False)
+            if job is None:
+                # Purged (past JOB_RETENTION) while we were following it
+                yield _ndjson({"type": "error", "message": "Unknown job id"})
+                return
+            if job["stage"] != last_stage:
+                last_stage = job["stage"]
+                yield _ndjson({"type": "status", "job": job})
+            if job["status"] in FINISHED_STATUSES:
+                break
+            time.sleep(0.5)
+        else:
+            yield _ndjson({"type": "timeout", "job_id": job_id})
+            return
+
+        job = store.get(job_id)
+        if job is None:
+            yield _ndjson({"type": "error", "message": "Unknown job id"})
+        elif job["status"] == "done":
+            yield _ndjson({"type": "result", **job.pop("result")})
+        else:
+            yield _ndjson({"type": "error", "message": job.get("error", "Job failed")})
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 # HEALTH CHECK AND TESTING ENDPOINTS
 
 @app.route('/')
@@ -183,6 +486,38 @@ def root():
     """Basic health check route for server."""
     return 'Reddit Extension Backend is Live!'
 
+@app.route('/ready')
+def ready():
+    """Readiness check with per-stage startup timings (model download, load, warm-up)."""
+    report = get_startup_pipeline().report()
+    return jsonify(report), 200 if report["ready"] else 503
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus text-format metrics for this worker process."""
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/models')
+def models():
+    """Registered model versions, which are resident, and the active / A/B routing config."""
+    return jsonify({"status": "success", "data": get_model_registry().stats()}), 200
+
+@app.route('/models/activate', methods=['POST'])
+def activate_model():
+    """
+    Switch the active model version without a restart: {"version": "..."}.
+
+    Every worker loads and warms the version in the background and swaps to it
+    once it is ready; traffic keeps using the current version until then.
+    """
+    data = request.get_json()
+    if not data or not data.get('version'):
+        return jsonify({"status": "error", "message": "version is required"}), 400
+    try:
+        return jsonify({"status": "accepted", "data": get_model_registry().request_activation(data['version'])}), 202
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
 @app.route('/test-model-download')
 def test_model_download():
     """Check if model files were downloaded from GCS."""
@@ -197,6 +532,18 @@ def test_model_download():
         logger.error(f"Model download test failed: {e}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+@app.route('/inference-stats')
+def inference_stats():
+    """Queue depth and batch-size metrics from the shared inference service."""
+    client = get_inference_client()
+    if client is None:
+        return jsonify({"status": "error", "message": "Shared inference service not configured"}), 404
+    try:
+        return jsonify({"status": "success", "data": client.stats()}), 200
+    except Exception as e:
+        logger.error(f"Inference stats failed: {e}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
 @app.route('/test-bias', methods=['GET'])
 def test_bias():
     """
@@ -208,11 +555,11 @@ def test_bias():
             return jsonify({'error': 'Bias model not loaded or missing'}), 500
 
         import torch
-        from transformers import BertTokenizer, BertForSequenceClassification
+        from transformers import BertTokenizerFast, BertForSequenceClassification
         import torch.nn.functional as F
 
         model = BertForSequenceClassification.from_pretrained(model_path, local_files_only=True)
-        tokenizer = BertTokenizer.from_pretrained(model_path, local_files_only=True)
+        tokenizer = BertTokenizerFast.from_pretrained(model_path, local_files_only=True)
         model.eval()
 
         test_text = request.args.get('text', 'I hate you')
@@ -0,0 +1,234 @@
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Stage latency buckets (seconds) and comment-count buckets used as a label
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+COMMENT_BUCKETS = (100, 500, 1000, 2000, 5000)
+
+# Per-request profiling (?profile=1 or X-Profile: 1) is only honoured when enabled
+PROFILING_ENABLED = os.getenv("METRICS_PROFILING", "0") == "1"
+PROFILE_DIR = os.getenv("PROFILE_DIR", "/tmp/profiles")
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.001"))
+
+# Global registry - one per process
+_registry = None
+
+def comment_bucket(n) -> str:
+    """Coarse comment-count label, so stage timings can be compared across thread sizes."""
+    if n is None:
+        return "na"
+    for bound in COMMENT_BUCKETS:
+        if n <= bound:
+            return f"le_{bound}"
+    return f"gt_{COMMENT_BUCKETS[-1]}"
+
+def _label_str(labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+class Registry:
+    """
+    Minimal in-process metrics registry rendered in the Prometheus text format.
+
+    Counters, gauges and histograms are keyed by (name, sorted label pairs).
+    Each gunicorn worker has its own registry.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help = {}
+        self._types = {}
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+
+    def _declare(self, name, kind, help_text):
+        self._types.setdefault(name, kind)
+        if help_text:
+            self._help.setdefault(name, help_text)
+
+    def inc(self, name, value=1.0, help_text=None, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._declare(name, "counter", help_text)
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def set_gauge(self, name, value, help_text=None, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._declare(name, "gauge", help_text)
+            self._gauges[key] = float(value)
+
+    def add_gauge(self, name, delta, help_text=None, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._declare(name, "gauge", help_text)
+            self._gauges[key] = self._gauges.get(key, 0.0) + delta
+
+    def observe(self, name, value, buckets=STAGE_BUCKETS, help_text=None, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._declare(name, "histogram", help_text)
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = {"buckets": buckets, "counts": [0] * len(buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(hist["buckets"]):
+                if value <= bound:
+                    hist["counts"][i] += 1
+            hist["sum"] += value
+            hist["count"] += 1
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name in sorted(self._types):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} {self._types[name]}")
+                for (metric, labels), value in sorted(self._counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_label_str(labels)} {value:g}")
+                for (metric, labels), value in sorted(self._gauges.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_label_str(labels)} {value:g}")
+                for (metric, labels), hist in sorted(self._histograms.items(), key=lambda item: item[0]):
+                    if metric != name:
+                        continue
+                    for bound, count in zip(hist["buckets"], hist["counts"]):
+                        lines.append(f"{name}_bucket{_label_str(labels + (('le', f'{bound:g}'),))} {count}")
+                    lines.append(f"{name}_bucket{_label_str(labels + (('le', '+Inf'),))} {hist['count']}")
+                    lines.append(f"{name}_sum{_label_str(labels)} {hist['sum']:.6f}")
+                    lines.append(f"{name}_count{_label_str(labels)} {hist['count']}")
+        return "\n".join(lines) + "\n"
+
+def get_registry() -> Registry:
+    """Get or create the process-wide metrics registry."""
+    global _registry
+    if _registry is None:
+        _registry = Registry()
+    return _registry
+
+@contextmanager
+def stage(name, comments=None):
+    """Time a pipeline stage into stage_seconds{stage, comments}."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        get_registry().observe(
+            "stage_seconds", time.perf_counter() - start,
+            help_text="Pipeline stage latency by thread size",
+            stage=name, comments=comment_bucket(comments),
+        )
+
+def observe_stage(name, seconds, comments=None):
+    """Record a stage duration that was measured elsewhere."""
+    get_registry().observe(
+        "stage_seconds", seconds,
+        help_text="Pipeline stage latency by thread size",
+        stage=name, comments=comment_bucket(comments),
+    )
+
+def _collect_cache_metrics(registry):
+    """Refresh cache/model gauges from the live cache objects right before rendering."""
+    from bias_cache import get_bias_cache
+    from thread_cache import get_thread_cache
+    from tokenization import get_token_cache
+
+    for cache_name, stats in (
+        ("bias", get_bias_cache().stats()),
+        ("thread", get_thread_cache().stats()),
+        ("token", get_token_cache().stats()),
+    ):
+        if "hit_ratio" in stats:
+            registry.set_gauge("cache_hit_ratio", stats["hit_ratio"], help_text="Cache hit ratio", cache=cache_name)
+        for key in ("hits", "misses", "disk_hits", "incremental_refreshes"):
+            if key in stats:
+                registry.set_gauge("cache_lookups", stats[key], help_text="Cache lookups by outcome",
+                                   cache=cache_name, outcome=key)
+
+    from model_registry import get_model_registry
+    model_registry = get_model_registry()
+    registry.set_gauge("model_resident_mb", model_registry.stats()["resident_mb"],
+                       help_text="Memory of resident bias model versions")
+    active = model_registry.get_loaded()
+    if active is not None and hasattr(active.model, "stats"):
+        # Early-exit fast tier: share of comments escalated to the full model
+        fast_tier = active.model.stats()
+        registry.set_gauge("bias_fast_tier_escalation_rate", fast_tier["escalation_rate"],
+                           help_text="Share of comments escalated past the exit layer")
+        registry.set_gauge("bias_fast_tier_relative_compute", fast_tier["relative_layer_compute"],
+                           help_text="Encoder layers run per comment relative to the full model")
+
+def render_metrics() -> str:
+    """Prometheus text exposition for this process."""
+    registry = get_registry()
+    try:
+        _collect_cache_metrics(registry)
+    except Exception as e:
+        logger.warning(f"Failed to collect cache metrics: {e}")
+    return registry.render()
+
+def request_started(endpoint):
+    get_registry().add_gauge("http_requests_in_flight", 1, help_text="Requests being served", endpoint=endpoint)
+    return time.perf_counter()
+
+def request_finished(endpoint, status, started):
+    registry = get_registry()
+    registry.add_gauge("http_requests_in_flight", -1, endpoint=endpoint)
+    registry.inc("http_requests_total", help_text="Requests served", endpoint=endpoint, status=str(status))
+    registry.observe("http_request_seconds", time.perf_counter() - started,
+                     help_text="Request latency", endpoint=endpoint)
+
+class RequestProfiler:
+    """
+    Per-request profiler, written to PROFILE_DIR.
+
+    Uses the pyinstrument sampling profiler when it is installed, cProfile otherwise.
+    """
+
+    def __init__(self, endpoint):
+        try:
+            from pyinstrument import Profiler
+            self._profiler = Profiler(interval=PROFILE_INTERVAL)
+            self._sampling = True
+        except ImportError:
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._sampling = False
+        suffix = "html" if self._sampling else "prof"
+        self.path = os.path.join(PROFILE_DIR, f"{endpoint}-{int(time.time() * 1000)}.{suffix}")
+
+    def start(self):
+        if self._sampling:
+            self._profiler.start()
+        else:
+            self._profiler.enable()
+        return self
+
+    def stop(self):
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        try:
+            if self._sampling:
+                self._profiler.stop()
+                with open(self.path, "w") as f:
+                    f.write(self._profiler.output_html())
+            else:
+                self._profiler.disable()
+                self._profiler.dump_stats(self.path)
+            logger.info(f"Wrote request profile to {self.path}")
+        except Exception as e:
+            logger.warning(f"Failed to write request profile: {e}")
+        return self.path
+
+def wants_profile(args, headers) -> bool:
+    """Profiling is opt-in per request and only when METRICS_PROFILING=1."""
+    if not PROFILING_ENABLED:
+        return False
+    return args.get("profile") == "1" or headers.get("X-Profile") == "1"
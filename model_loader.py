@@ -1,6 +1,10 @@
 import os
+import json
+import base64
+import hashlib
 import logging
-from google.cloud import storage
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 logger = logging.getLogger(__name__)
 
@@ -8,12 +12,235 @@ logger = logging.getLogger(__name__)
 DEFAULT_MODEL_FILES = [
     "config.json",
     "model.safetensors",
-    "special_tokens_map.json", 
+    "special_tokens_map.json",
     "tokenizer.json",
     "tokenizer_config.json",
     "vocab.txt"
 ]
 
+# Download tuning - files are fetched concurrently, large blobs in ranged chunks
+PARALLEL_DOWNLOADS = int(os.getenv("MODEL_PARALLEL_DOWNLOADS", "6"))
+CHUNK_SIZE = int(os.getenv("MODEL_CHUNK_SIZE", str(32 * 1024 * 1024)))
+
+# Per-directory record of verified files (size, mtime, checksums)
+MANIFEST_FILE = ".manifest.json"
+_manifest_lock = threading.Lock()
+
+class LocalBlob:
+    """Stand-in for google.cloud.storage.Blob backed by a local file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.name = path
+        self.size = None
+        self.md5_hash = None
+        self.crc32c = None
+        self.generation = None
+
+    def reload(self):
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"No such blob: {self.path}")
+        self.size = os.path.getsize(self.path)
+        self.md5_hash = file_md5(self.path)
+        self.crc32c = file_crc32c(self.path)
+        self.generation = int(os.path.getmtime(self.path))
+
+    def download_as_bytes(self, start=None, end=None, **kwargs):
+        with open(self.path, "rb") as f:
+            f.seek(start or 0)
+            if end is None:
+                return f.read()
+            return f.read(end - (start or 0) + 1)
+
+    def download_to_filename(self, filename, **kwargs):
+        with open(filename, "wb") as f:
+            f.write(self.download_as_bytes())
+
+class LocalBucket:
+    """
+    Offline fake bucket: `file:///some/dir` maps blob paths onto a local directory.
+
+    Lets the download/verify path be exercised without GCS credentials, e.g.
+    download_model_from_gcs("bias_model", bucket="file:///root/package", gcs_prefix="bias_model/model_t2835ru3").
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def blob(self, blob_path):
+        return LocalBlob(os.path.join(self.root, blob_path))
+
+def _get_bucket(bucket: str):
+    """Resolve a bucket name to a GCS bucket, or a LocalBucket for file:// URLs."""
+    if bucket.startswith("file://"):
+        return LocalBucket(bucket[len("file://"):])
+    from google.cloud import storage
+    return storage.Client().bucket(bucket)
+
+def _hash_file(path, hasher):
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(8 * 1024 * 1024), b""):
+            hasher.update(block)
+    return base64.b64encode(hasher.digest()).decode("ascii")
+
+def file_md5(path: str) -> str:
+    """Base64 MD5 of a file, in the format GCS uses for blob.md5_hash."""
+    return _hash_file(path, hashlib.md5())
+
+def file_crc32c(path: str):
+    """Base64 CRC32C of a file (GCS blob.crc32c format), or None if google-crc32c is missing."""
+    try:
+        import google_crc32c
+    except ImportError:
+        return None
+    return _hash_file(path, google_crc32c.Checksum())
+
+def _checksum_matches(path, blob) -> bool:
+    """Compare a local file with blob metadata, preferring CRC32C (always set by GCS)."""
+    if blob.size is not None and os.path.getsize(path) != blob.size:
+        return False
+    if blob.crc32c:
+        local_crc = file_crc32c(path)
+        if local_crc is not None:
+            return local_crc == blob.crc32c
+    if blob.md5_hash:
+        return file_md5(path) == blob.md5_hash
+    logger.warning(f"No checksum metadata for {blob.name}; verified size only")
+    return True
+
+def load_manifest(model_dir: str) -> dict:
+    manifest_path = os.path.join(model_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path) as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable manifest {manifest_path}: {e}")
+        return {}
+
+def _record_manifest(model_dir: str, filename: str, blob):
+    """Record a verified file so later checks can skip re-hashing it."""
+    local_path = os.path.join(model_dir, filename)
+    stat = os.stat(local_path)
+    with _manifest_lock:
+        manifest = load_manifest(model_dir)
+        manifest[filename] = {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "md5": blob.md5_hash,
+            "crc32c": blob.crc32c,
+            "generation": blob.generation,
+        }
+        tmp_path = os.path.join(model_dir, MANIFEST_FILE + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, os.path.join(model_dir, MANIFEST_FILE))
+
+def _manifest_matches(entry, local_path) -> bool:
+    """Cheap check: the file is unchanged since it was verified."""
+    if not entry or not os.path.exists(local_path):
+        return False
+    stat = os.stat(local_path)
+    return stat.st_size == entry.get("size") and stat.st_mtime == entry.get("mtime")
+
+def _download_ranged(blob, tmp_path, chunk_size):
+    """
+    Download a large blob in parallel byte ranges into a preallocated temp file.
+
+    Completed ranges are recorded in a .progress file (tied to the blob
+    generation), so a killed container resumes instead of starting over.
+    """
+    progress_path = tmp_path + ".progress"
+    ranges = [(start, min(start + chunk_size, blob.size) - 1) for start in range(0, blob.size, chunk_size)]
+
+    done = set()
+    if os.path.exists(tmp_path) and os.path.exists(progress_path):
+        try:
+            with open(progress_path) as f:
+                progress = json.load(f)
+            if progress.get("generation") == blob.generation and progress.get("chunk_size") == chunk_size:
+                done = set(progress.get("done", []))
+        except (OSError, ValueError):
+            done = set()
+    if not done:
+        with open(tmp_path, "wb") as f:
+            f.truncate(blob.size)
+
+    progress_lock = threading.Lock()
+
+    def fetch(index):
+        start, end = ranges[index]
+        data = blob.download_as_bytes(start=start, end=end, checksum=None)
+        if len(data) != end - start + 1:
+            raise Exception(f"Short read for bytes {start}-{end} of {blob.name}")
+        with open(tmp_path, "r+b") as f:
+            f.seek(start)
+            f.write(data)
+        with progress_lock:
+            done.add(index)
+            with open(progress_path, "w") as f:
+                json.dump({"generation": blob.generation, "chunk_size": chunk_size, "done": sorted(done)}, f)
+
+    pending = [i for i in range(len(ranges)) if i not in done]
+    if len(pending) < len(ranges):
+        logger.info(f"Resuming {blob.name}: {len(ranges) - len(pending)}/{len(ranges)} chunks already on disk")
+    with ThreadPoolExecutor(max_workers=PARALLEL_DOWNLOADS) as pool:
+        list(pool.map(fetch, pending))
+
+def _download_file(gcs_bucket, model_dir, gcs_prefix, filename, verbose):
+    """Download one file to a temp path, verify its checksum, then atomically rename."""
+    local_path = os.path.join(model_dir, filename)
+    blob_path = f"{gcs_prefix}/{filename}"
+    tmp_path = local_path + ".part"
+
+    try:
+        blob = gcs_bucket.blob(blob_path)
+        blob.reload()
+
+        if blob.size and blob.size > CHUNK_SIZE:
+            _download_ranged(blob, tmp_path, CHUNK_SIZE)
+        else:
+            blob.download_to_filename(tmp_path)
+
+        if os.path.getsize(tmp_path) == 0:
+            raise Exception(f"Downloaded file {filename} is empty")
+        if not _checksum_matches(tmp_path, blob):
+            for path in (tmp_path, tmp_path + ".progress"):
+                if os.path.exists(path):
+                    os.remove(path)
+            raise Exception(f"Checksum mismatch for {filename}")
+
+        os.replace(tmp_path, local_path)
+        if os.path.exists(tmp_path + ".progress"):
+            os.remove(tmp_path + ".progress")
+        _record_manifest(model_dir, filename, blob)
+
+        if verbose:
+            file_size = os.path.getsize(local_path)
+            logger.info(f"Downloaded {blob_path} → {local_path} ({file_size} bytes)")
+
+    except Exception as e:
+        logger.error(f"Failed to download {blob_path}: {e}")
+        raise Exception(f"Failed to download {filename}: {e}")
+
+def _cached_file_valid(gcs_bucket, model_dir, gcs_prefix, filename, manifest) -> bool:
+    """A cached file is valid if the manifest vouches for it, or it hashes to the blob checksum."""
+    local_path = os.path.join(model_dir, filename)
+    if not os.path.exists(local_path):
+        return False
+    if _manifest_matches(manifest.get(filename), local_path):
+        return True
+
+    # No (matching) manifest entry - e.g. files cached by an older version; verify once
+    blob = gcs_bucket.blob(f"{gcs_prefix}/{filename}")
+    blob.reload()
+    if _checksum_matches(local_path, blob):
+        _record_manifest(model_dir, filename, blob)
+        return True
+    logger.warning(f"Cached {filename} failed checksum verification; re-downloading")
+    return False
+
 def download_model_from_gcs(
     model_name: str,
     bucket: str = "reddit-bias-model",
@@ -24,99 +251,95 @@ def download_model_from_gcs(
 ) -> str:
     """
     Downloads model files from Google Cloud Storage to local directory.
-    
+
+    Files are downloaded concurrently; blobs larger than CHUNK_SIZE are fetched
+    in resumable parallel byte ranges. Every file lands in a temp file, is
+    checked against the blob's CRC32C/MD5 and is then atomically renamed into
+    place, so a truncated download is never mistaken for a cached file.
+
     Args:
         model_name: Name of the model directory to create
-        bucket: GCS bucket name
+        bucket: GCS bucket name (or file:///dir for an offline LocalBucket)
         gcs_prefix: Prefix path in GCS bucket
         destination: Local destination directory
         required_files: List of required files (uses DEFAULT_MODEL_FILES if None)
         verbose: Whether to log download progress
-        
+
     Returns:
         str: Path to local model directory
-        
+
     Raises:
         Exception: If download fails or files are missing
     """
     if required_files is None:
         required_files = DEFAULT_MODEL_FILES
-    
+
     # Local directory to save model files
     model_dir = os.path.join(destination, model_name)
     os.makedirs(model_dir, exist_ok=True)
-    
+
     try:
-        client = storage.Client()
-        gcs_bucket = client.bucket(bucket)
-        
+        gcs_bucket = _get_bucket(bucket)
+        manifest = load_manifest(model_dir)
+
         # Track which files need downloading
         files_to_download = []
         for filename in required_files:
-            local_path = os.path.join(model_dir, filename)
-            if not os.path.exists(local_path):
+            if not _cached_file_valid(gcs_bucket, model_dir, gcs_prefix, filename, manifest):
                 files_to_download.append(filename)
             elif verbose:
                 logger.info(f"Using cached: {filename}")
-        
-        # Download missing files
+
+        # Download missing files concurrently
         if files_to_download:
             logger.info(f"Downloading {len(files_to_download)} missing files...")
-            
-            for filename in files_to_download:
-                local_path = os.path.join(model_dir, filename)
-                blob_path = f"{gcs_prefix}/{filename}"
-                
-                try:
-                    blob = gcs_bucket.blob(blob_path)
-                    blob.download_to_filename(local_path)
-                    
-                    # Verify file was downloaded and has content
-                    if not os.path.exists(local_path) or os.path.getsize(local_path) == 0:
-                        raise Exception(f"Downloaded file {filename} is empty or missing")
-                    
-                    if verbose:
-                        file_size = os.path.getsize(local_path)
-                        logger.info(f"Downloaded {blob_path} → {local_path} ({file_size} bytes)")
-                        
-                except Exception as e:
-                    logger.error(f"Failed to download {blob_path}: {e}")
-                    raise Exception(f"Failed to download {filename}: {e}")
-        
+            with ThreadPoolExecutor(max_workers=PARALLEL_DOWNLOADS) as pool:
+                futures = [
+                    pool.submit(_download_file, gcs_bucket, model_dir, gcs_prefix, filename, verbose)
+                    for filename in files_to_download
+                ]
+                for future in futures:
+                    future.result()
+
         # Final verification - ensure all required files exist
         missing_files = [
-            f for f in required_files 
+            f for f in required_files
             if not os.path.exists(os.path.join(model_dir, f))
         ]
-        
+
         if missing_files:
             raise Exception(f"Missing required model files after download: {missing_files}")
-        
+
         logger.info(f"Model files ready at: {model_dir}")
         return model_dir
-        
+
     except Exception as e:
         logger.error(f"Model download failed: {e}")
         raise
 
 def verify_model_files(model_dir: str, required_files: list = None) -> bool:
     """
-    Verify that all required model files exist and are not empty.
-    
+    Verify that all required model files exist, are not empty and match the manifest.
+
+    Files whose size and mtime match their manifest entry are trusted without
+    re-hashing; anything else is hashed and compared with the recorded checksum.
+
     Args:
         model_dir: Directory containing model files
         required_files: List of required files (uses DEFAULT_MODEL_FILES if None)
-        
+
     Returns:
         bool: True if all files exist and are not empty
     """
     if required_files is None:
         required_files = DEFAULT_MODEL_FILES
-    
+
     if not os.path.exists(model_dir):
         logger.warning(f"Model directory does not exist: {model_dir}")
         return False
-    
+
+    manifest = load_manifest(model_dir)
+
     for filename in required_files:
         file_path = os.path.join(model_dir, filename)
         if not os.path.exists(file_path):
@@ -125,5 +348,22 @@ def verify_model_files(model_dir: str, required_files: list = None) -> bool:
         if os.path.getsize(file_path) == 0:
             logger.warning(f"Empty model file: {filename}")
             return False
-    
-    return True
\ No newline at end of file
+
+        entry = manifest.get(filename)
+        if entry is None or _manifest_matches(entry, file_path):
+            continue
+        if entry.get("size") != os.path.getsize(file_path):
+            logger.warning(f"Model file size changed since verification: {filename}")
+            return False
+        local_crc = file_crc32c(file_path) if entry.get("crc32c") else None
+        if local_crc is not None:
+            valid = local_crc == entry["crc32c"]
+        elif entry.get("md5"):
+            valid = file_md5(file_path) == entry["md5"]
+        else:
+            valid = True
+        if not valid:
+            logger.warning(f"Model file checksum mismatch: {filename}")
+            return False
+
+    return True
@@ -0,0 +1,421 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+
+from bias_backends import BIAS_BACKEND
+from model_loader import download_model_from_gcs, DEFAULT_MODEL_FILES
+from fast_tier import BIAS_FAST_TIER, EXIT_HEAD_FILE
+
+logger = logging.getLogger(__name__)
+
+# Named model versions: "name=gcs_prefix" pairs, comma separated. A prefix that is
+# a local directory with config.json and weights is used as-is (e.g. a sweep candidate on disk).
+# The first version is active unless ACTIVE_MODEL_VERSION says otherwise.
+MODEL_VERSIONS = os.getenv("MODEL_VERSIONS", "t2835ru3=bias_model/model_t2835ru3")
+ACTIVE_MODEL_VERSION = os.getenv("ACTIVE_MODEL_VERSION", "")
+MODEL_BUCKET = os.getenv("MODEL_BUCKET", "reddit-bias-model")
+
+# Loaded versions must fit the budget; non-active versions unused for
+# MODEL_IDLE_SECONDS are unloaded
+MODEL_MEMORY_BUDGET_MB = float(os.getenv("MODEL_MEMORY_BUDGET_MB", "3072"))
+MODEL_IDLE_SECONDS = float(os.getenv("MODEL_IDLE_SECONDS", "900"))
+
+# A/B routing: "name:share" pairs; each thread is routed to a version by a stable
+# hash of its id, the remaining share goes to the active version
+MODEL_TRAFFIC_SPLIT = os.getenv("MODEL_TRAFFIC_SPLIT", "")
+
+# Shared with every worker (and the inference service): the active version
+# selected through POST /models/activate
+MODEL_STATE_FILE = os.getenv("MODEL_STATE_FILE", "/tmp/model_registry_state.json")
+MODEL_STATE_POLL_SECONDS = float(os.getenv("MODEL_STATE_POLL_SECONDS", "5"))
+
+# The original single model keeps its download directory
+DEFAULT_MODEL_DIR = "bias_model"
+
+# A local directory is a model only with weights; the repo's placeholders hold just config/tokenizer files
+LOCAL_WEIGHT_FILES = ("model.safetensors", "pytorch_model.bin")
+
+# Global registry instance - created on first use
+_model_registry = None
+
+def parse_versions(spec: str) -> dict:
+    """Parse "name=prefix,name=prefix" into an ordered {name: prefix} dict."""
+    versions = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        name, _, source = item.partition("=")
+        if not source:
+            raise ValueError(f"Model version '{item}' must look like name=gcs_prefix")
+        versions[name.strip()] = source.strip()
+    return versions
+
+def parse_traffic_split(spec: str) -> dict:
+    """Parse "name:share,name:share" into {name: share}."""
+    split = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        name, _, share = item.partition(":")
+        split[name.strip()] = float(share)
+    if sum(split.values()) > 1.0:
+        raise ValueError(f"MODEL_TRAFFIC_SPLIT shares add up to more than 1: {spec}")
+    return split
+
+def route_fraction(key: str) -> float:
+    """Stable position of a routing key in [0, 1), so a thread always hits the same version."""
+    digest = hashlib.blake2b(str(key).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2 ** 64
+
+def is_local_model_dir(path) -> bool:
+    """True when path holds a config and weights, i.e. can be loaded without downloading."""
+    return os.path.isfile(os.path.join(path, "config.json")) and any(
+        os.path.isfile(os.path.join(path, name)) for name in LOCAL_WEIGHT_FILES
+    )
+
+def estimate_size_mb(model=None, model_path=None) -> float:
+    """Parameter memory of a loaded torch model, else the size of the weight files on disk."""
+    try:
+        if model is not None and hasattr(model, "parameters"):
+            return sum(p.numel() * p.element_size() for p in model.parameters()) / (1024 * 1024)
+    except Exception as e:
+        logger.warning(f"Could not measure model parameters: {e}")
+    if model_path and os.path.isdir(model_path):
+        weights = [f for f in os.listdir(model_path) if f.endswith((".safetensors", ".bin", ".onnx", ".pt"))]
+        return sum(os.path.getsize(os.path.join(model_path, f)) for f in weights) / (1024 * 1024)
+    return 0.0
+
+class ModelVersion:
+    """One named model version: where it comes from, and the loaded model when resident."""
+
+    def __init__(self, name, source, backend=None):
+        self.name = name
+        self.source = source
+        self.backend = backend or BIAS_BACKEND
+        # Used in place only if it holds weights; otherwise source is a GCS prefix to download
+        self.path = source if is_local_model_dir(source) else None
+        self.model = None
+        self.tokenizer = None
+        self.revision = None
+        self.size_mb = None
+        self.loaded_at = None
+        self.last_used = None
+        self.state = "registered"
+        self.load_lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self.model is not None
+
+    def info(self) -> dict:
+        return {
+            "name": self.name,
+            "source": self.source,
+            "backend": self.backend,
+            "path": self.path,
+            "state": self.state,
+            "size_mb": round(self.size_mb, 1) if self.size_mb else None,
+            "idle_seconds": round(time.time() - self.last_used, 1) if self.last_used else None,
+        }
+
+class ModelRegistry:
+    """
+    Named bias model versions loaded side by side within a memory budget.
+
+    Each version loads under its own lock, so traffic on the active version never
+    waits for another version to download or load. activate() loads and warms a
+    version before switching to it in a single assignment; the previous version
+    stays resident until it goes idle or the budget needs its memory.
+    """
+
+    def __init__(self, versions=None, active=None, memory_budget_mb=MODEL_MEMORY_BUDGET_MB,
+                 idle_seconds=MODEL_IDLE_SECONDS, traffic_split=None, state_file=MODEL_STATE_FILE):
+        versions = versions if versions is not None else parse_versions(MODEL_VERSIONS)
+        if not versions:
+            raise ValueError("At least one model version must be configured")
+        self.memory_budget_mb = memory_budget_mb
+        self.idle_seconds = idle_seconds
+        self.state_file = state_file
+        self._lock = threading.Lock()
+        self._versions = {name: ModelVersion(name, source) for name, source in versions.items()}
+        self._default_name = next(iter(self._versions))
+        self.active = active or ACTIVE_MODEL_VERSION or self._default_name
+        if self.active not in self._versions:
+            raise ValueError(f"Active model version '{self.active}' is not configured")
+        self.traffic_split = traffic_split if traffic_split is not None else parse_traffic_split(MODEL_TRAFFIC_SPLIT)
+        unknown = set(self.traffic_split) - set(self._versions)
+        if unknown:
+            raise ValueError(f"MODEL_TRAFFIC_SPLIT names unknown versions: {sorted(unknown)}")
+
+        self._activating = None
+        self._state_mtime = None
+        self._state_checked_at = 0.0
+        self._idle_checked_at = time.time()
+        self.swaps = 0
+        self.evictions = 0
+
+    def versions(self):
+        return list(self._versions)
+
+    def _version(self, name) -> ModelVersion:
+        version = self._versions.get(name)
+        if version is None:
+            raise ValueError(f"Unknown model version '{name}'")
+        return version
+
+    def resolve(self, version=None, route_key=None) -> str:
+        """
+        Pick the version for a request: an explicit version wins, then the A/B
+        traffic split on route_key (e.g. the submission id), then the active version.
+        """
+        self._sync_state()
+        if version:
+            self._version(version)
+            return version
+        if route_key is not None and self.traffic_split:
+            position = route_fraction(route_key)
+            for name, share in self.traffic_split.items():
+                if position < share:
+                    return name
+                position -= share
+        return self.active
+
+    def path_for(self, name=None) -> str:
+        """Local directory of a version, downloading it on first use."""
+        version = self._version(name or self.active)
+        if version.path is None:
+            with version.load_lock:
+                if version.path is None:
+                    # The exit head ships next to the model when the fast tier is enabled
+                    required_files = DEFAULT_MODEL_FILES + [EXIT_HEAD_FILE] if BIAS_FAST_TIER else None
+                    model_dir = DEFAULT_MODEL_DIR if version.name == self._default_name else f"bias_model_{version.name}"
+                    logger.info(f"Downloading model version '{version.name}' from {version.source}")
+                    version.path = download_model_from_gcs(model_dir, bucket=MODEL_BUCKET, gcs_prefix=version.source,
+                                                           required_files=required_files)
+        return version.path
+
+    def get(self, name=None) -> ModelVersion:
+        """Loaded version (the active one by default), loading it on first use."""
+        version = self._version(name or self.active)
+        version.last_used = time.time()
+        if not version.loaded:
+            self._load(version)
+        self._maybe_evict_idle()
+        return version
+
+    def get_loaded(self, name=None):
+        """The version if it is resident, else None (never triggers a load)."""
+        version = self._versions.get(name or self.active)
+        return version if version is not None and version.loaded else None
+
+    def get_by_path(self, model_path, backend=None) -> ModelVersion:
+        """
+        Loaded version for a local model directory, registering an unnamed one if needed.
+
+        Keeps load_bias_model(model_path, backend) working for callers that pass a
+        directory (parity checks, evaluation scripts, the inference service).
+        """
+        backend = backend or BIAS_BACKEND
+        with self._lock:
+            version = next((v for v in self._versions.values()
+                            if v.path == model_path and v.backend == backend), None)
+            if version is None:
+                name = os.path.basename(os.path.normpath(model_path))
+                if backend != BIAS_BACKEND:
+                    name = f"{name}@{backend}"
+                version = self._versions.setdefault(name, ModelVersion(name, model_path, backend))
+                version.path = model_path
+        return self.get(version.name)
+
+    def revision_for(self, model_path):
+        """Bias cache revision of a loaded version at model_path, or None if none is loaded."""
+        for version in list(self._versions.values()):
+            if version.path == model_path and version.loaded and version.backend == BIAS_BACKEND:
+                return version.revision
+        return None
+
+    def _load(self, version):
+        from transformers import BertTokenizerFast
+        from reddit_analysis import bias_cache_revision
+        from bias_backends import load_model_backend
+        from fast_tier import maybe_wrap_fast_tier
+        from metrics import get_registry
+
+        model_path = self.path_for(version.name)
+        with version.load_lock:
+            if version.loaded:
+                return
+            self._make_room(estimate_size_mb(model_path=model_path), keep=version.name)
+
+            version.state = "loading"
+            logger.info(f"Loading model version '{version.name}' ({version.backend}) from {model_path}")
+            load_start = time.perf_counter()
+            try:
+                # Rust-backed tokenizer from tokenizer.json (batch encoding runs in native threads)
+                tokenizer = BertTokenizerFast.from_pretrained(model_path, local_files_only=True)
+                model = maybe_wrap_fast_tier(load_model_backend(model_path, version.backend), model_path)
+            except Exception as e:
+                version.state = "failed"
+                logger.error(f"Failed to load model version '{version.name}': {e}")
+                raise
+
+            version.size_mb = estimate_size_mb(getattr(model, "model", model), model_path)
+            version.revision = bias_cache_revision(model_path, version.backend)
+            version.loaded_at = time.time()
+            # Publish tokenizer before model: readers check `loaded` (model is not None)
+            version.tokenizer = tokenizer
+            version.model = model
+            version.state = "loaded"
+            get_registry().set_gauge("bias_model_load_seconds", time.perf_counter() - load_start,
+                                     help_text="Time to load the bias model and tokenizer", backend=version.backend)
+            logger.info(f"Model version '{version.name}' loaded ({version.size_mb:.0f} MB)")
+
+    def _resident_mb(self, exclude=None) -> float:
+        return sum(v.size_mb or 0.0 for v in self._versions.values() if v.loaded and v.name != exclude)
+
+    def _make_room(self, needed_mb, keep):
+        """Unload least recently used non-active versions until needed_mb fits in the budget."""
+        with self._lock:
+            candidates = sorted(
+                (v for v in self._versions.values() if v.loaded and v.name not in (keep, self.active)),
+                key=lambda v: v.last_used or 0.0,
+            )
+            while self._resident_mb(exclude=keep) + needed_mb > self.memory_budget_mb and candidates:
+                self._unload(candidates.pop(0), reason="memory budget")
+            over_budget = self._resident_mb(exclude=keep) + needed_mb > self.memory_budget_mb
+        if over_budget and keep != self.active:
+            raise RuntimeError(
+                f"Model version '{keep}' ({needed_mb:.0f} MB) does not fit the "
+                f"{self.memory_budget_mb:.0f} MB model memory budget"
+            )
+
+    def _unload(self, version, reason):
+        # Requests already holding the model keep their reference until they finish
+        version.model = None
+        version.tokenizer = None
+        version.state = "registered"
+        self.evictions += 1
+        logger.info(f"Unloaded model version '{version.name}' ({reason})")
+
+    def _maybe_evict_idle(self):
+        now = time.time()
+        if now - self._idle_checked_at < min(60.0, self.idle_seconds):
+            return
+        self._idle_checked_at = now
+        self.evict_idle(now)
+
+    def evict_idle(self, now=None):
+        """Unload non-active versions that have not served a request for idle_seconds."""
+        now = now or time.time()
+        with self._lock:
+            for version in self._versions.values():
+                if (version.loaded and version.name != self.active
+                        and now - (version.last_used or 0.0) > self.idle_seconds):
+                    self._unload(version, reason="idle")
+
+    def activate(self, name, warm=True) -> dict:
+        """
+        Load and warm a version, then make it the active one.
+
+        With the shared inference service the service process loads the model
+        (warmed through the socket); otherwise it is loaded in this process.
+        """
+        from startup import WARMUP_TEXTS
+        from reddit_analysis import predict_bias_batch
+        from inference_server import get_inference_client
+
+        version = self._version(name)
+        start = time.perf_counter()
+        model_path = self.path_for(name)
+        client = get_inference_client()
+        if client is not None:
+            if warm:
+                client.predict(WARMUP_TEXTS, model_path=model_path)
+        else:
+            self.get(name)
+            if warm:
+                predict_bias_batch(WARMUP_TEXTS, version.model, version.tokenizer)
+
+        with self._lock:
+            previous, self.active = self.active, name
+            if previous != name:
+                self.swaps += 1
+        version.last_used = time.time()
+        logger.info(f"Active model version: {previous} -> {name} ({time.perf_counter() - start:.1f}s to load and warm)")
+        return {"previous": previous, "active": name, "seconds": round(time.perf_counter() - start, 3)}
+
+    def request_activation(self, name) -> dict:
+        """
+        Record `name` as the desired active version for every process sharing the
+        state file, and start activating it here in the background.
+        """
+        self._version(name)
+        tmp_path = f"{self.state_file}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"active": name, "requested_at": time.time()}, f)
+        os.replace(tmp_path, self.state_file)
+        self._start_activation(name)
+        return {"active": self.active, "activating": name}
+
+    def _start_activation(self, name):
+        with self._lock:
+            if name == self.active or self._activating == name:
+                return
+            self._activating = name
+
+        def run():
+            try:
+                self.activate(name)
+            except Exception as e:
+                logger.error(f"Activating model version '{name}' failed; keeping '{self.active}': {e}")
+            finally:
+                with self._lock:
+                    if self._activating == name:
+                        self._activating = None
+
+        threading.Thread(target=run, name=f"activate-{name}", daemon=True).start()
+
+    def _sync_state(self):
+        """Pick up activations requested through another worker (polled, at most every few seconds)."""
+        now = time.time()
+        if not self.state_file or now - self._state_checked_at < MODEL_STATE_POLL_SECONDS:
+            return
+        self._state_checked_at = now
+        try:
+            mtime = os.stat(self.state_file).st_mtime
+        except OSError:
+            return
+        if mtime == self._state_mtime:
+            return
+        self._state_mtime = mtime
+        try:
+            with open(self.state_file) as f:
+                desired = json.load(f).get("active")
+        except (OSError, ValueError) as e:
+            logger.warning(f"Unreadable model state file {self.state_file}: {e}")
+            return
+        if desired in self._versions and desired != self.active:
+            self._start_activation(desired)
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "activating": self._activating,
+            "traffic_split": self.traffic_split,
+            "memory_budget_mb": self.memory_budget_mb,
+            "resident_mb": round(self._resident_mb(), 1),
+            "idle_seconds": self.idle_seconds,
+            "swaps": self.swaps,
+            "evictions": self.evictions,
+            "versions": [v.info() for v in self._versions.values()],
+        }
+
+def get_model_registry() -> ModelRegistry:
+    """Get or create the process-wide model registry."""
+    global _model_registry
+    if _model_registry is None:
+        _model_registry = ModelRegistry()
+    return _model_registry
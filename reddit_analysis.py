@@ -1,19 +1,43 @@
 import pandas as pd
+import numpy as np
 import asyncio
 import asyncpraw
-import nltk
-import torch
 import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 
-from nltk.sentiment import SentimentIntensityAnalyzer
-from transformers import BertTokenizer, BertForSequenceClassification
+# torch / transformers / nltk are imported lazily inside the functions that need
+# them, so the sentiment-only path never pays for the heavy ML imports
+from bias_backends import BIAS_BACKEND
+from bias_cache import get_bias_cache, make_cache_key, model_revision
+from thread_cache import get_thread_cache
+from metrics import stage, observe_stage, get_registry
+from tokenization import encode_texts, truncation_id
+from comment_expansion import expand_comment_forest
+from comment_scheduler import BiasSchedule, select_comments, COMMENT_OVERSAMPLE
+from fast_tier import fast_tier_id
+from model_registry import get_model_registry
+from inference_server import get_inference_client
+from jobs import SingleFlight
+from dedup import cluster_texts, cluster_for_sentiment, merge_stats
 
 logger = logging.getLogger(__name__)
 
-# Global model cache - consolidated from multiple locations
-_tokenizer = None
-_model = None
-_current_model_path = None
+# Batched inference settings - micro-batches are padded to their longest member,
+# so the token budget bounds (batch size x padded length) per forward pass
+BIAS_MAX_LENGTH = 512
+BIAS_MAX_BATCH_TOKENS = int(os.getenv("BIAS_MAX_BATCH_TOKENS", "8192"))
+
+# Batch sentiment settings - memo of compound scores keyed by exact body text, and
+# a process pool for threads with many distinct bodies (0 workers disables it)
+SENTIMENT_MEMO_SIZE = int(os.getenv("SENTIMENT_MEMO_SIZE", "100000"))
+SENTIMENT_WORKERS = int(os.getenv("SENTIMENT_WORKERS", str(min(4, os.cpu_count() or 1))))
+SENTIMENT_PARALLEL_THRESHOLD = int(os.getenv("SENTIMENT_PARALLEL_THRESHOLD", "20000"))
+SENTIMENT_CHUNK_SIZE = 5000
 
 # Map label IDs to strings
 ID2LABEL = {
@@ -27,45 +51,84 @@ ID2LABEL = {
     7: "victim"
 }
 
-# Download the VADER lexicon once
-nltk.download('vader_lexicon', quiet=True)
-sia = SentimentIntensityAnalyzer()
-
-def load_bias_model(model_path):
-    """Load the bias model and tokenizer from local disk - consolidated function."""
-    global _tokenizer, _model, _current_model_path
-    
-    # Only reload if path changed or not loaded
-    if _tokenizer is None or _model is None or _current_model_path != model_path:
-        logger.info(f"Loading bias model from {model_path}")
-        _tokenizer = BertTokenizer.from_pretrained(model_path, local_files_only=True)
-        _model = BertForSequenceClassification.from_pretrained(model_path, local_files_only=True)
-        _model.eval()
-        _current_model_path = model_path
-        logger.info("Bias model and tokenizer loaded successfully")
-    
-    return _model, _tokenizer
+# VADER analyzer - lexicon is downloaded on first use (or by the startup pipeline)
+sia = None
+_sia_lock = threading.Lock()
 
-def flatten_comments(comment_forest, level=0):
-    """Recursively flatten comment tree into list."""
-    flat_list = []
-    for comment in comment_forest:
+def get_sentiment_analyzer():
+    """Download the VADER lexicon once and return the shared analyzer."""
+    global sia
+    if sia is None:
+        with _sia_lock:
+            if sia is None:
+                import nltk
+                from nltk.sentiment import SentimentIntensityAnalyzer
+                nltk.download('vader_lexicon', quiet=True)
+                sia = SentimentIntensityAnalyzer()
+    return sia
+
+def bias_cache_revision(model_path, backend=None):
+    """Cache namespace for a model directory + backend + truncation policy + fast tier (each can change outputs)."""
+    return (f"{model_revision(model_path)}:{backend or BIAS_BACKEND}:{truncation_id(BIAS_MAX_LENGTH)}"
+            f":{fast_tier_id(model_path)}")
+
+def load_bias_model(model_path, backend=None):
+    """
+    Return (model, tokenizer) for a local model directory.
+
+    Models live in the model registry, so several directories / backends can be
+    resident at once and loading one never replaces another mid-request.
+    """
+    version = get_model_registry().get_by_path(model_path, backend)
+    return version.model, version.tokenizer
+
+COMMENT_COLUMNS = ["id", "parent_id", "author", "body", "score", "created_utc", "level", "oc_bin_id"]
+
+def flatten_comment_columns(comment_forest, level=0, max_comments=None):
+    """
+    Iteratively flatten a comment tree into column lists (depth-first, pre-order).
+
+    Uses an explicit stack, so deep reply chains cannot hit the recursion limit,
+    and records each comment's depth and top-level ancestor (oc_bin_id) in the
+    same pass. Stops once max_comments rows have been collected.
+    """
+    columns = {name: [] for name in COMMENT_COLUMNS}
+    stack = [(comment, level, None) for comment in reversed(list(comment_forest))]
+    count = 0
+
+    while stack and (max_comments is None or count < max_comments):
+        comment, depth, ancestor = stack.pop()
         try:
-            flat_list.append({
-                "id": comment.id,
-                "parent_id": comment.parent_id,
-                "author": str(comment.author),
-                "body": comment.body,
-                "score": comment.score,
-                "created_utc": comment.created_utc,
-                "level": level,
-            })
-            if hasattr(comment, "replies"):
-                flat_list.extend(flatten_comments(comment.replies, level=level + 1))
+            comment_id = comment.id
+            row = (
+                comment_id,
+                comment.parent_id,
+                str(comment.author),
+                comment.body,
+                comment.score,
+                comment.created_utc,
+                depth,
+                ancestor if ancestor is not None else comment_id,
+            )
         except Exception as e:
             logger.warning(f"Failed to process comment: {e}")
             continue
-    return flat_list
+
+        for name, value in zip(COMMENT_COLUMNS, row):
+            columns[name].append(value)
+        count += 1
+
+        replies = getattr(comment, "replies", None)
+        if replies:
+            stack.extend((reply, depth + 1, row[-1]) for reply in reversed(list(replies)))
+
+    return columns
+
+def flatten_comments(comment_forest, level=0):
+    """Flatten comment tree into list of dicts."""
+    columns = flatten_comment_columns(comment_forest, level=level)
+    names = COMMENT_COLUMNS[:-1]
+    return [dict(zip(names, values)) for values in zip(*(columns[name] for name in names))]
 
 def extract_submission_metadata(submission, level=0):
     """Extract metadata from original submission."""
@@ -79,37 +142,46 @@ def extract_submission_metadata(submission, level=0):
         "level": level,
     }
 
-async def load_and_prepare_reddit_df(url: str, reddit_client=None, max_comments=2000):
+def extract_submission_id(url: str) -> str:
+    """Canonical submission id from a Reddit URL (no API call)."""
+    return asyncpraw.models.Submission.id_from_url(url)
+
+async def load_and_prepare_reddit_df(url: str, reddit_client=None, max_comments=2000, replace_more_limit=None):
     """Load Reddit data and prepare DataFrame."""
     if reddit_client is None:
         raise ValueError("Reddit client must be provided.")
 
     try:
-        submission = await reddit_client.submission(url=url)
-        await submission.load()
-        submission.comment_sort = "best"
-        await submission.comments.replace_more(limit=8)  # reduces depth - helpful for large threads
-
-        # Step 1: Flatten all comments into a list of dicts
-        flat_comments = flatten_comments(submission.comments)
+        with stage("reddit_fetch"):
+            submission = await reddit_client.submission(url=url)
+            await submission.load()
+            submission.comment_sort = "best"
+        with stage("replace_more"):
+            # Concurrent, breadth-first MoreComments expansion, bounded by comment count and deadline
+            await expand_comment_forest(
+                submission.comments,
+                max_comments=max_comments * COMMENT_OVERSAMPLE,
+                max_fetches=replace_more_limit,
+            )
 
-        # Step 2: Heuristically take first N comments (already sorted by "best")
-        flat_comments = flat_comments[:max_comments]
+        # Step 1: Flatten comments into columns (oversampled; "best" order decides ties).
+        # The flattener tags each row with its top-level comment (OC) as oc_bin_id.
+        flatten_start = time.perf_counter()
+        columns = flatten_comment_columns(submission.comments, max_comments=max_comments * COMMENT_OVERSAMPLE)
 
-        # Step 3: Add the original post at the top
+        # Step 2: Add the original post at the top (its own bin)
         original_post_info = extract_submission_metadata(submission)
-        flat_comments.insert(0, original_post_info)
+        original_post_info["oc_bin_id"] = original_post_info["id"]
+        for name in COMMENT_COLUMNS:
+            columns[name].insert(0, original_post_info[name])
 
-        # Step 4: Convert to DataFrame
-        df = pd.DataFrame(flat_comments)
+        # Step 3: Build the DataFrame column-wise in one shot
+        df = pd.DataFrame(columns, columns=COMMENT_COLUMNS)
+        observe_stage("flatten", time.perf_counter() - flatten_start, len(df))
 
-        # Step 5: Grouping comments into threads based on original comment (OC)
-        df['oc_bin_id'] = None
-        current_bin = None
-        for idx, row in df.iterrows():
-            if row['level'] == 0:
-                current_bin = row['id']
-            df.at[idx, 'oc_bin_id'] = current_bin
+        # Step 4: Keep the highest-priority max_comments, with a sample from every OC bin
+        with stage("select_comments", len(df)):
+            df = select_comments(df, max_comments)
 
         logger.info(f"Loaded {len(df)} comments from Reddit thread")
         return df
@@ -118,16 +190,239 @@ async def load_and_prepare_reddit_df(url: str, reddit_client=None, max_comments=
         logger.error(f"Failed to load Reddit data: {e}")
         raise
 
+def merge_thread_update(cached_df, fresh_df, high_water, max_comments=2000):
+    """
+    Merge a freshly fetched (unscored) frame into a cached, scored frame.
+
+    Scores of known comments are refreshed, and comments newer than the cached
+    created_utc high-water mark are sentiment-scored and slotted in after the
+    last row of their oc_bin_id group. When that takes the thread past
+    max_comments, the lowest-priority rows (cached or new) are evicted with
+    select_comments, as a full load would. Only comments present in fresh_df
+    can be added: the incremental fetch does not expand MoreComments, so replies
+    behind them wait for the full refresh. Returns (merged_df, new_rows_count).
+    """
+    known_ids = set(cached_df['id'])
+    new_rows = fresh_df[(fresh_df['created_utc'] > high_water) & ~fresh_df['id'].isin(known_ids)]
+
+    merged = cached_df.copy()
+    fresh_scores = fresh_df.set_index('id')['score']
+    updated = merged['id'].map(fresh_scores)
+    merged['score'] = updated.fillna(merged['score']).astype(cached_df['score'].dtype)
+
+    if new_rows.empty:
+        return merged, 0
+
+    new_rows = add_sentiment_scores(new_rows.copy())
+    dedup = merge_stats(cached_df.attrs.get('sentiment_dedup'), new_rows.attrs.get('sentiment_dedup'))
+    merged = pd.concat([merged, new_rows], ignore_index=True)
+    # Scored rows on both sides, so priority (which uses sentiment) compares like with like
+    merged = select_comments(merged, max_comments)
+    added = int(merged['id'].isin(new_rows['id']).sum())
+
+    # Keep each oc_bin_id group contiguous, in order of first appearance
+    bin_order = {bin_id: i for i, bin_id in enumerate(pd.unique(merged['oc_bin_id']))}
+    merged = (
+        merged.assign(_bin_rank=merged['oc_bin_id'].map(bin_order))
+        .sort_values('_bin_rank', kind='stable')
+        .drop(columns='_bin_rank')
+        .reset_index(drop=True)
+    )
+    merged.attrs['sentiment_dedup'] = dedup
+    return merged, added
+
+async def run_blocking(executor, fn, *args):
+    """Run CPU-bound work in an executor when one is given, inline otherwise."""
+    if executor is None:
+        return fn(*args)
+    return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+# Concurrent loads of the same thread (ASGI requests, bulk analysis, jobs) share one fetch
+_thread_flight = SingleFlight()
+
+async def load_thread_with_sentiment(url: str, reddit_client=None, max_comments=2000, cache=None,
+                                     executor=None):
+    """
+    Load a sentiment-scored thread frame through the per-thread cache.
+
+    Fresh cache entries are returned without any Reddit call. Stale entries get
+    an incremental refresh: the top-level tree is re-fetched without expanding
+    MoreComments (replies behind them appear at the next full refresh), and only
+    comments past the high-water mark are scored and merged under max_comments.
+    Entries loaded under a smaller cap than max_comments are reloaded in full.
+    VADER scoring runs in `executor` when given so the event loop stays free.
+    Concurrent calls for the same submission wait on a single load.
+    """
+    submission_id = extract_submission_id(url)
+    df = await _thread_flight.run(
+        (submission_id, max_comments),
+        lambda: _load_thread(url, submission_id, reddit_client, max_comments, cache or get_thread_cache(), executor),
+    )
+    return df.copy()
+
+async def _load_thread(url, submission_id, reddit_client, max_comments, cache, executor):
+    entry = cache.get(submission_id)
+    if entry is not None and not entry.covers(max_comments):
+        entry = None
+
+    if entry is not None and entry.age() < cache.ttl:
+        cache.record_hit()
+        return entry.df
+
+    if entry is not None and entry.full_age() < cache.full_refresh:
+        cache.record_incremental_refresh()
+        # Refresh under the entry's own cap, which may be larger than this request's
+        cap = entry.max_comments or max_comments
+        fresh_df = await load_and_prepare_reddit_df(url, reddit_client, cap, replace_more_limit=0)
+        df, added = await run_blocking(
+            executor, merge_thread_update, entry.df, fresh_df, entry.high_water, cap
+        )
+        cache.put(submission_id, df, incremental=True, max_comments=cap)
+        logger.info(f"Incremental refresh of {submission_id}: {added} new comments")
+        return df
+
+    cache.record_miss()
+    df = await load_and_prepare_reddit_df(url, reddit_client, max_comments)
+    df = await run_blocking(executor, add_sentiment_scores, df)
+    cache.put(submission_id, df, max_comments=max_comments)
+    return df
+
+async def fetch_thread_for_stream(url: str, reddit_client=None, max_comments=2000, cache=None):
+    """
+    Load a thread for the streaming endpoint. Returns (df, is_scored).
+
+    Threads already in the cache (under a cap of at least max_comments) go through
+    load_thread_with_sentiment (fresh or incremental) and come back scored. Cache
+    misses come back unscored so the caller can score and emit them one batch at
+    a time.
+    """
+    cache = cache or get_thread_cache()
+    entry = cache.get(extract_submission_id(url))
+    if entry is not None and entry.covers(max_comments):
+        df = await load_thread_with_sentiment(url, reddit_client, max_comments, cache)
+        return df, True
+
+    cache.record_miss()
+    df = await load_and_prepare_reddit_df(url, reddit_client, max_comments)
+    return df, False
+
+def iter_comment_batches(df, batch_rows=200):
+    """Split a frame into consecutive chunks of whole oc_bin_id groups (~batch_rows each)."""
+    if df.empty:
+        return
+    # A new chunk may only start where a new oc_bin_id group starts
+    group_starts = (df['oc_bin_id'] != df['oc_bin_id'].shift()).to_numpy().nonzero()[0].tolist()
+    chunk_start = 0
+    for group_start in group_starts[1:]:
+        if group_start - chunk_start >= batch_rows:
+            yield df.iloc[chunk_start:group_start]
+            chunk_start = group_start
+    yield df.iloc[chunk_start:]
+
+def iter_scored_batches(url: str, df, is_scored, batch_rows=200, cache=None, max_comments=2000):
+    """
+    Yield sentiment-scored batches of whole comment groups for streaming.
+
+    Unscored frames are scored batch by batch; once the last batch is out the
+    assembled frame is stored in the thread cache (under max_comments, the cap
+    fetch_thread_for_stream loaded it with).
+    """
+    cache = cache or get_thread_cache()
+    scored_batches = []
+    for batch in iter_comment_batches(df, batch_rows):
+        if not is_scored:
+            batch = add_sentiment_scores(batch.copy())
+            scored_batches.append(batch)
+        yield batch
+
+    if not is_scored and scored_batches:
+        cache.put(extract_submission_id(url), pd.concat(scored_batches, ignore_index=True),
+                  max_comments=max_comments)
+
+# Sentiment memo and process pool - shared by all requests in this worker
+_sentiment_memo = OrderedDict()
+_sentiment_memo_lock = threading.Lock()
+_sentiment_pool = None
+
+def _score_texts(texts):
+    """Compound VADER scores for a list of texts (also the process-pool task)."""
+    analyzer = get_sentiment_analyzer()
+    return [analyzer.polarity_scores(text)['compound'] for text in texts]
+
+def _get_sentiment_pool():
+    global _sentiment_pool
+    if _sentiment_pool is None:
+        # spawn, not fork: the web worker is multi-threaded by the time this runs
+        _sentiment_pool = ProcessPoolExecutor(
+            max_workers=SENTIMENT_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _sentiment_pool
+
+def record_dedup(stage_name, clusters):
+    """Count texts and scored groups per stage on /metrics; returns the grouping stats."""
+    registry = get_registry()
+    registry.inc("comment_dedup_texts_total", len(clusters.codes),
+                 help_text="Texts entering deduplicated inference", stage=stage_name)
+    registry.inc("comment_dedup_groups_total", len(clusters),
+                 help_text="Distinct (near-duplicate grouped) texts left to score", stage=stage_name)
+    return clusters.stats()
+
+def score_sentiment_batch(texts, clusters=None):
+    """
+    Compound VADER scores for many texts, aligned with the input.
+
+    Identical bodies (up to whitespace; see dedup.cluster_for_sentiment) are
+    grouped and only each group's representative is scored, after a memo
+    lookup. Large sets of new bodies are fanned out to a process pool in chunks.
+    """
+    if clusters is None:
+        clusters = cluster_for_sentiment(texts)
+    uniques = [str(texts[i]) for i in clusters.representatives]
+
+    scores = [None] * len(uniques)
+    misses = []
+    with _sentiment_memo_lock:
+        for i, text in enumerate(uniques):
+            score = _sentiment_memo.get(text)
+            if score is None:
+                misses.append(i)
+            else:
+                _sentiment_memo.move_to_end(text)
+                scores[i] = score
+
+    miss_texts = [uniques[i] for i in misses]
+    if SENTIMENT_WORKERS > 0 and len(miss_texts) >= SENTIMENT_PARALLEL_THRESHOLD:
+        chunks = [miss_texts[i:i + SENTIMENT_CHUNK_SIZE] for i in range(0, len(miss_texts), SENTIMENT_CHUNK_SIZE)]
+        computed = [score for chunk in _get_sentiment_pool().map(_score_texts, chunks) for score in chunk]
+    else:
+        computed = _score_texts(miss_texts)
+
+    with _sentiment_memo_lock:
+        for i, score in zip(misses, computed):
+            scores[i] = score
+            _sentiment_memo[uniques[i]] = score
+        while len(_sentiment_memo) > SENTIMENT_MEMO_SIZE:
+            _sentiment_memo.popitem(last=False)
+
+    return clusters.expand(np.asarray(scores, dtype=float))
+
+def sentiment_labels(scores):
+    """Vectorized VADER thresholds: >= 0.05 positive, <= -0.05 negative, else neutral."""
+    scores = np.asarray(scores, dtype=float)
+    return np.select([scores >= 0.05, scores <= -0.05], ['positive', 'negative'], default='neutral')
+
 def add_sentiment_scores(df):
     """Add VADER sentiment scores to DataFrame."""
     try:
-        df['sentiment'] = df['body'].apply(
-            lambda text: sia.polarity_scores(str(text))['compound']
-        )
-        df['sentiment_label'] = df['sentiment'].apply(
-            lambda s: 'positive' if s >= 0.05 else 'negative' if s <= -0.05 else 'neutral'
-        )
-        logger.info(f"Added sentiment scores to {len(df)} comments")
+        with stage("sentiment", len(df)):
+            texts = df['body'].tolist()
+            clusters = cluster_for_sentiment(texts)
+            scores = score_sentiment_batch(texts, clusters)
+            df['sentiment'] = scores
+            df['sentiment_label'] = sentiment_labels(scores)
+        # Travels with the frame through the thread cache; reported as sentiment_dedup
+        df.attrs['sentiment_dedup'] = record_dedup("sentiment", clusters)
+        logger.info(f"Added sentiment scores to {len(df)} comments ({len(clusters)} distinct bodies)")
         return df
     except Exception as e:
         logger.error(f"Failed to add sentiment scores: {e}")
@@ -136,37 +431,197 @@ def add_sentiment_scores(df):
 def predict_bias_single(text, model, tokenizer):
     """Predict bias for a single text - helper function."""
     try:
-        inputs = tokenizer(text, return_tensors="pt", truncation=True, max_length=512)
-        with torch.no_grad():
-            logits = model(**inputs).logits
-            probs = torch.softmax(logits, dim=1).squeeze().tolist()
-            return {ID2LABEL[i]: round(prob, 4) for i, prob in enumerate(probs)}
+        return predict_bias_batch([text], model, tokenizer)[0]
     except Exception as e:
         logger.warning(f"Failed to predict bias for text: {e}")
         # Return neutral prediction on failure
         return {label: 0.0 for label in ID2LABEL.values()}
 
+def make_length_batches(lengths, max_batch_tokens=BIAS_MAX_BATCH_TOKENS):
+    """
+    Group row indices into micro-batches sorted by token length.
+
+    Each batch is padded to its longest member, so a batch is closed as soon as
+    (rows x longest length) would exceed the token budget.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    batches = []
+    current = []
+    for i in order:
+        # Sorted ascending, so the newest row is always the longest one
+        if current and lengths[i] * (len(current) + 1) > max_batch_tokens:
+            batches.append(current)
+            current = []
+        current.append(i)
+    if current:
+        batches.append(current)
+    return batches
+
+def iter_bias_batches(texts, model, tokenizer, max_length=BIAS_MAX_LENGTH,
+                      max_batch_tokens=BIAS_MAX_BATCH_TOKENS):
+    """
+    Run bias inference over texts in length-bucketed, dynamically padded batches.
+
+    Yields (row_indices, probs) per forward pass, where probs is a list of
+    per-label probability lists aligned with row_indices (None for every row of
+    a batch that failed). Tokenization (cached, head+tail truncated) and
+    forward-pass time are logged separately.
+    """
+    import torch
+
+    input_ids, tokenize_seconds = encode_texts(tokenizer, [str(text) for text in texts], max_length)
+    lengths = [len(ids) for ids in input_ids]
+    forward_seconds = 0.0
+
+    for batch in make_length_batches(lengths, max_batch_tokens):
+        try:
+            inputs = tokenizer.pad(
+                [{"input_ids": input_ids[i]} for i in batch],
+                padding=True,
+                return_tensors="pt",
+            )
+            start = time.perf_counter()
+            with torch.no_grad():
+                logits = model(**inputs).logits
+                probs = torch.softmax(logits, dim=1).tolist()
+            forward_seconds += time.perf_counter() - start
+        except Exception as e:
+            logger.warning(f"Failed to predict bias for batch of {len(batch)} texts: {e}")
+            # No prediction rather than a fake neutral one, so the failure is never cached
+            probs = [None] * len(batch)
+        yield batch, probs
+
+    observe_stage("tokenization", tokenize_seconds, len(input_ids))
+    observe_stage("bias_forward", forward_seconds, len(input_ids))
+    logger.info(
+        f"Bias batch of {len(input_ids)} texts: tokenization {tokenize_seconds:.3f}s, "
+        f"forward {forward_seconds:.3f}s"
+    )
+
+def predict_bias_batch(texts, model, tokenizer, max_length=BIAS_MAX_LENGTH,
+                       max_batch_tokens=BIAS_MAX_BATCH_TOKENS):
+    """Predict bias for many texts at once, returning results in input order (None where inference failed)."""
+    results = [None] * len(texts)
+    for batch, probs in iter_bias_batches(texts, model, tokenizer, max_length, max_batch_tokens):
+        for i, row_probs in zip(batch, probs):
+            if row_probs is not None:
+                results[i] = {ID2LABEL[j]: round(prob, 4) for j, prob in enumerate(row_probs)}
+    return results
+
+def _predict_pending(texts, model_path):
+    """Predict via the shared inference service when configured, else in-process."""
+    client = get_inference_client()
+    if client is not None:
+        try:
+            return client.predict(texts, model_path=model_path)
+        except Exception as e:
+            logger.warning(f"Inference service unavailable, falling back to local model: {e}")
+
+    # Load model using consolidated function
+    model, tokenizer = load_bias_model(model_path)
+    return predict_bias_batch(texts, model, tokenizer)
+
+def iter_bias_predictions(texts, model_path, chunk_size=None, stats=None):
+    """
+    Yield (row_indices, predictions) for texts, cache hits first.
+
+    Duplicate and near-duplicate texts are grouped (see dedup.cluster_texts) and
+    only each group's representative is looked up and inferred; its prediction
+    is fanned out to every member. Uncached representatives are inferred in
+    chunks of chunk_size (all at once when None) and written back to the bias
+    cache as each chunk finishes, so callers can stream partial results. Texts
+    whose inference failed are yielded with a None prediction and not cached.
+    When given, `stats` is filled with the grouping stats.
+    """
+    clusters = cluster_texts(texts)
+    if stats is not None:
+        stats.update(record_dedup("bias", clusters))
+
+    cache = get_bias_cache()
+    revision = get_model_registry().revision_for(model_path) or bias_cache_revision(model_path)
+    keys = [make_cache_key(revision, texts[i], BIAS_MAX_LENGTH) for i in clusters.representatives]
+    cached = cache.get_many(keys)
+
+    rows_by_key, text_by_key = {}, {}
+    for key, rep, members in zip(keys, clusters.representatives, clusters.members()):
+        rows_by_key.setdefault(key, []).extend(members)
+        text_by_key.setdefault(key, texts[rep])
+
+    hit_keys = [key for key in rows_by_key if key in cached]
+    if hit_keys:
+        yield ([i for key in hit_keys for i in rows_by_key[key]],
+               [cached[key] for key in hit_keys for _ in rows_by_key[key]])
+
+    pending = [key for key in rows_by_key if key not in cached]
+    chunk_size = chunk_size or len(pending) or 1
+    for start in range(0, len(pending), chunk_size):
+        chunk = pending[start:start + chunk_size]
+        predictions = _predict_pending([text_by_key[key] for key in chunk], model_path)
+        computed = dict(zip(chunk, predictions))
+        cache.put_many(computed)
+
+        yield ([i for key in chunk for i in rows_by_key[key]],
+               [computed[key] for key in chunk for _ in rows_by_key[key]])
+
 def add_bias_scores(df, model_path):
     """
     Add multi-label bias predictions to each comment using the loaded model.
     Each row will contain a dictionary of label probabilities.
     """
     try:
-        # Load model using consolidated function
-        model, tokenizer = load_bias_model(model_path)
-        
-        # Apply bias prediction to each comment
-        df['bias'] = df['body'].apply(
-            lambda text: predict_bias_single(str(text), model, tokenizer)
+        # Cached predictions first, then batched inference over unique uncached comments
+        start = time.perf_counter()
+        texts = df['body'].astype(str).tolist()
+        results = [None] * len(texts)
+        dedup = {}
+        for rows, predictions in iter_bias_predictions(texts, model_path, stats=dedup):
+            for i, prediction in zip(rows, predictions):
+                results[i] = prediction
+
+        df['bias'] = results
+        df.attrs['bias_dedup'] = dedup
+        elapsed = time.perf_counter() - start
+        observe_stage("bias", elapsed, len(df))
+
+        rate = len(df) / elapsed if elapsed > 0 else 0.0
+        logger.info(
+            f"Added bias scores to {len(df)} comments in {elapsed:.2f}s ({rate:.1f} comments/s, "
+            f"cache hit ratio {get_bias_cache().stats()['hit_ratio']}, dedup ratio {dedup.get('ratio', 0.0)})"
         )
-        
-        logger.info(f"Added bias scores to {len(df)} comments")
         return df
         
     except Exception as e:
         logger.error(f"Failed to add bias scores: {e}")
         raise
 
+def add_bias_scores_budgeted(df, model_path, limit=None, budget_seconds=None):
+    """
+    Add bias predictions to the comments a BiasSchedule picks within its time budget.
+
+    Unscheduled rows get bias=None. Returns (df, coverage) where coverage says how
+    much of the thread was scored.
+    """
+    try:
+        schedule = BiasSchedule(df, limit=limit, budget_seconds=budget_seconds)
+        results = [None] * len(df)
+        for positions, predictions in schedule.run(
+            lambda texts, n: iter_bias_predictions(texts, model_path, n, stats=schedule.dedup)
+        ):
+            for i, prediction in zip(positions, predictions):
+                results[i] = prediction
+
+        df['bias'] = results
+        coverage = schedule.coverage()
+        observe_stage("bias", coverage['seconds'], len(df))
+        get_registry().observe("bias_coverage_ratio", coverage['ratio'], buckets=(0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 1.0),
+                               help_text="Share of eligible comments scored within the budget")
+        logger.info(f"Budgeted bias scoring: {coverage}")
+        return df, coverage
+
+    except Exception as e:
+        logger.error(f"Failed to add budgeted bias scores: {e}")
+        raise
+
 def test_bias_prediction(text, model_path):
     """Run a test prediction to confirm model is working - updated to use consolidated loading."""
     try:
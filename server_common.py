@@ -0,0 +1,99 @@
+import os
+import logging
+import asyncpraw
+
+from model_registry import get_model_registry
+
+logger = logging.getLogger(__name__)
+
+# Max comments per bias request - batched inference handles full threads
+BIAS_COMMENT_LIMIT = int(os.getenv("BIAS_COMMENT_LIMIT", "2000"))
+
+# Extension and Reddit origins allowed by both serving modes
+CORS_ORIGINS = [
+    "chrome-extension://*",     # Chrome, Edge, Brave, etc.
+    "opera-extension://*",      # Opera
+    "moz-extension://*",        # Firefox
+    "safari-web-extension://*", # Safari
+    "https://*.reddit.com",
+    "https://reddit.com"
+]
+
+def validate_environment():
+    """Validate required environment variables on startup."""
+    required_vars = ['REDDIT_CLIENT_ID', 'REDDIT_CLIENT_SECRET', 'REDDIT_USER_AGENT']
+    missing = [var for var in required_vars if not os.getenv(var)]
+    if missing:
+        raise ValueError(f"Missing required environment variables: {missing}")
+
+def validate_reddit_url(url):
+    """Basic validation for Reddit URLs."""
+    if not url or not isinstance(url, str):
+        return False
+    return 'reddit.com' in url or 'redd.it' in url
+
+def get_bias_model_path(version=None):
+    """Local directory of a model version (the active one by default), downloaded once."""
+    return get_model_registry().path_for(version)
+
+def resolve_model_version(data, route_key=None):
+    """
+    Model version for a request: "model_version" in the body, else the A/B split
+    on route_key (the submission id), else the active version. Raises ValueError
+    for unknown versions.
+    """
+    return get_model_registry().resolve((data or {}).get('model_version'), route_key)
+
+def wants_async(request):
+    """Client opted in to 202 + polling: "Prefer: respond-async" or ?async=1 (Flask or Starlette request)."""
+    params = request.args if hasattr(request, "args") else request.query_params
+    if params.get("async") in ("1", "true"):
+        return True
+    return "respond-async" in request.headers.get("Prefer", "")
+
+async def load_summary_thread(data, reddit_client, executor=None):
+    """
+    Resolve a /thread_summary body to (thread_id, df) the same way in both serving modes.
+
+    "thread_id" is served from the thread cache; when it is not cached (or not
+    given) the thread is loaded from "url". df is None when only an uncached
+    thread_id was given. Raises ValueError for a body with neither, or a bad URL.
+    """
+    from reddit_analysis import load_thread_with_sentiment, extract_submission_id
+    from thread_cache import get_thread_cache
+
+    if not data or not (data.get('url') or data.get('thread_id')):
+        raise ValueError("URL or thread_id required")
+
+    thread_id = data.get('thread_id')
+    if thread_id:
+        entry = get_thread_cache().get(thread_id)
+        if entry is not None:
+            return thread_id, entry.df
+
+    url = data.get('url')
+    if not url:
+        return thread_id, None
+    if not validate_reddit_url(url):
+        raise ValueError("Invalid Reddit URL")
+    df = await load_thread_with_sentiment(url, reddit_client, executor=executor)
+    return extract_submission_id(url), df
+
+def create_reddit_client():
+    """
+    Set up Reddit client from environment variables.
+
+    REDDIT_OAUTH_URL / REDDIT_URL point the client at another server, e.g. the
+    local fake in benchmarks/fake_reddit_server.py.
+    """
+    overrides = {}
+    if os.getenv("REDDIT_OAUTH_URL"):
+        overrides["oauth_url"] = os.getenv("REDDIT_OAUTH_URL")
+    if os.getenv("REDDIT_URL"):
+        overrides["reddit_url"] = os.getenv("REDDIT_URL")
+    return asyncpraw.Reddit(
+        client_id=os.getenv("REDDIT_CLIENT_ID"),
+        client_secret=os.getenv("REDDIT_CLIENT_SECRET"),
+        user_agent=os.getenv("REDDIT_USER_AGENT"),
+        **overrides
+    )
@@ -0,0 +1,111 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Set EAGER_MODEL_LOAD=0 to skip background model preloading (e.g. local dev without GCS)
+EAGER_MODEL_LOAD = os.getenv("EAGER_MODEL_LOAD", "1") != "0"
+
+# Short, varied texts so warm-up exercises a couple of padded batch shapes
+WARMUP_TEXTS = [
+    "Thanks for sharing, this was really helpful.",
+    "I can't believe people still think that way about them.",
+    "ok",
+    "This thread is a mess. Half the comments are arguing about something nobody said, "
+    "and the other half are just repeating the title back to each other.",
+]
+
+# Global pipeline - one per process
+_startup_pipeline = None
+
+class StartupPipeline:
+    """
+    Background warm-up run once per worker process.
+
+    Stages: VADER lexicon -> model download -> model load -> warm-up batch.
+    Each stage records its status and duration for the /ready endpoint.
+    """
+
+    def __init__(self):
+        self.stages = OrderedDict()
+        self.started_at = None
+        self.finished_at = None
+        self.error = None
+        self._thread = None
+
+    def start(self):
+        """Run the pipeline on a daemon thread (no-op if already started)."""
+        if self._thread is not None:
+            return self
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self.run, name="startup", daemon=True)
+        self._thread.start()
+        return self
+
+    def run(self):
+        from reddit_analysis import get_sentiment_analyzer, load_bias_model, predict_bias_batch
+        from server_common import get_bias_model_path
+        from inference_server import get_inference_client
+
+        try:
+            self._stage("sentiment_lexicon", get_sentiment_analyzer)
+            model_path = self._stage("model_download", get_bias_model_path)
+
+            client = get_inference_client()
+            if client is not None:
+                # The shared inference service owns the model; warm it through the socket
+                self.stages["model_load"] = {"status": "delegated", "seconds": 0.0}
+                self._stage("warmup", client.predict, WARMUP_TEXTS)
+            else:
+                model, tokenizer = self._stage("model_load", load_bias_model, model_path)
+                self._stage("warmup", predict_bias_batch, WARMUP_TEXTS, model, tokenizer)
+        except Exception as e:
+            self.error = str(e)
+            logger.error(f"Startup pipeline failed: {e}")
+        finally:
+            self.finished_at = time.time()
+
+    def _stage(self, name, fn, *args):
+        self.stages[name] = {"status": "running", "seconds": None}
+        start = time.perf_counter()
+        try:
+            result = fn(*args)
+        except Exception:
+            self.stages[name] = {"status": "failed", "seconds": round(time.perf_counter() - start, 3)}
+            raise
+        self.stages[name] = {"status": "done", "seconds": round(time.perf_counter() - start, 3)}
+        logger.info(f"Startup stage '{name}' finished in {self.stages[name]['seconds']}s")
+        return result
+
+    def is_ready(self) -> bool:
+        if self._thread is None:
+            # Eager loading disabled: the model loads lazily on the first bias request
+            return not EAGER_MODEL_LOAD
+        return self.finished_at is not None and self.error is None
+
+    def report(self) -> dict:
+        return {
+            "ready": self.is_ready(),
+            "eager_model_load": EAGER_MODEL_LOAD,
+            "error": self.error,
+            "stages": dict(self.stages),
+            "total_seconds": round((self.finished_at or time.time()) - self.started_at, 3)
+                             if self.started_at else None,
+        }
+
+def get_startup_pipeline() -> StartupPipeline:
+    """Get or create the process-wide startup pipeline."""
+    global _startup_pipeline
+    if _startup_pipeline is None:
+        _startup_pipeline = StartupPipeline()
+    return _startup_pipeline
+
+def start_background_warmup():
+    """Kick off eager model preloading unless disabled by EAGER_MODEL_LOAD=0."""
+    pipeline = get_startup_pipeline()
+    if EAGER_MODEL_LOAD:
+        pipeline.start()
+    return pipeline
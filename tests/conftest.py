@@ -0,0 +1,14 @@
+import os
+import sys
+
+# Backend modules are flat top-level files; keep test runs off /tmp state and real credentials
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+for name, value in {
+    "BIAS_CACHE_DB": "",
+    "JOB_DB": "",
+    "EAGER_MODEL_LOAD": "0",
+    "REDDIT_CLIENT_ID": "test",
+    "REDDIT_CLIENT_SECRET": "test",
+    "REDDIT_USER_AGENT": "test",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,65 @@
+import sqlite3
+
+import pytest
+
+import reddit_analysis
+from bias_cache import BiasCache
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = BiasCache(100, str(tmp_path / "bias_cache.sqlite"))
+    monkeypatch.setattr(reddit_analysis, "get_bias_cache", lambda: cache)
+    return cache
+
+
+def disk_rows(cache):
+    return sqlite3.connect(cache.db_path).execute("SELECT COUNT(*) FROM bias_cache").fetchone()[0]
+
+
+def test_put_many_skips_failed_predictions(cache):
+    cache.put_many({"failed": None, "ok": {"left": 0.9}})
+    assert cache.get_many(["failed", "ok"]) == {"ok": {"left": 0.9}}
+    assert disk_rows(cache) == 1
+
+
+def test_failed_batch_is_not_cached(cache, tmp_path, monkeypatch):
+    torch = pytest.importorskip("torch")
+
+    class FailingModel:
+        def __call__(self, **inputs):
+            raise RuntimeError("CUDA out of memory")
+
+    class Tokenizer:
+        def pad(self, rows, padding=True, return_tensors="pt"):
+            width = max(len(row["input_ids"]) for row in rows)
+            return {"input_ids": torch.tensor([row["input_ids"] + [0] * (width - len(row["input_ids"])) for row in rows])}
+
+    monkeypatch.setattr(reddit_analysis, "encode_texts",
+                        lambda tokenizer, texts, max_length: ([[101, len(t), 102] for t in texts], 0.0))
+    monkeypatch.setattr(reddit_analysis, "get_inference_client", lambda: None)
+    monkeypatch.setattr(reddit_analysis, "load_bias_model", lambda path: (FailingModel(), Tokenizer()))
+
+    texts = ["first comment", "second comment"]
+    results = {}
+    for rows, predictions in reddit_analysis.iter_bias_predictions(texts, str(tmp_path)):
+        results.update(zip(rows, predictions))
+
+    assert results == {0: None, 1: None}
+    assert cache.stats()["entries"] == 0
+    assert disk_rows(cache) == 0
+
+
+def test_failed_service_rows_are_not_cached(cache, tmp_path, monkeypatch):
+    # The inference service returns None for rows whose batch failed on its side
+    monkeypatch.setattr(reddit_analysis, "_predict_pending",
+                        lambda texts, model_path: [None if "bad" in t else {"left": 0.5} for t in texts])
+
+    texts = ["bad batch text", "good text"]
+    results = {}
+    for rows, predictions in reddit_analysis.iter_bias_predictions(texts, str(tmp_path)):
+        results.update(zip(rows, predictions))
+
+    assert results == {0: None, 1: {"left": 0.5}}
+    assert cache.stats()["entries"] == 1
+    assert disk_rows(cache) == 1
@@ -0,0 +1,86 @@
+import asyncio
+import re
+
+import pandas as pd
+import pytest
+
+import bulk_analysis
+
+
+@pytest.fixture(autouse=True)
+def submission_ids(monkeypatch):
+    # Same ids asyncpraw's Submission.id_from_url gives for permalinks and redd.it links
+    def extract(url):
+        return re.search(r"(?:/comments/|redd\.it/)([^/]+)", url).group(1)
+
+    monkeypatch.setattr(bulk_analysis, "extract_submission_id", extract)
+
+
+class TooManyRequests(Exception):
+    class response:
+        status = 429
+        headers = {"retry-after": "0.01"}
+
+
+class FakeSubmission:
+    def __init__(self, permalink):
+        self.permalink = permalink
+
+    async def load(self):
+        pass
+
+
+class FakeSubreddit:
+    def __init__(self, reddit):
+        self.reddit = reddit
+
+    async def top(self, time_filter, limit):
+        self.reddit.listings += 1
+        if self.reddit.listings == 1:
+            raise TooManyRequests()
+        yield FakeSubmission("/r/python/comments/aaa111/first/")
+
+
+class FakeReddit:
+    def __init__(self):
+        self.listings = 0
+
+    async def subreddit(self, name):
+        return FakeSubreddit(self)
+
+    async def submission(self, url):
+        if "bbb222" not in url:
+            raise ValueError("not found")
+        return FakeSubmission("/r/news/comments/bbb222/second/")
+
+
+def test_resolve_targets_retries_the_listing_and_resolves_short_links():
+    reddit = FakeReddit()
+    urls = asyncio.run(bulk_analysis.resolve_targets(
+        reddit, subreddit="python", urls=["https://redd.it/bbb222", "https://redd.it/ccc333"]
+    ))
+    assert reddit.listings == 2
+    assert urls == [
+        "https://www.reddit.com/r/news/comments/bbb222/second/",
+        "https://redd.it/ccc333",
+        "https://www.reddit.com/r/python/comments/aaa111/first/",
+    ]
+
+
+def test_unresolved_threads_are_reported_without_a_subreddit(monkeypatch):
+    async def load(url, *args):
+        return pd.DataFrame({"sentiment": [0.5], "sentiment_label": ["positive"]})
+
+    monkeypatch.setattr(bulk_analysis, "load_thread_with_sentiment", load)
+
+    async def run():
+        return [m async for m in bulk_analysis.analyze_bulk(None, [
+            "https://redd.it/ccc333", "https://www.reddit.com/r/news/comments/bbb222/second/",
+        ])]
+
+    messages = asyncio.run(run())
+    threads = {m["thread_id"]: m["subreddit"] for m in messages if m["type"] == "thread"}
+    rollup = messages[-1]
+    assert threads == {"ccc333": None, "bbb222": "news"}
+    assert list(rollup["subreddits"]) == ["news"]
+    assert (rollup["threads"], rollup["threads_without_subreddit"]) == (2, 1)
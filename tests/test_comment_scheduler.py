@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+
+from comment_scheduler import plan_order, select_comments
+
+
+def make_thread(bodies, scores):
+    n = len(bodies)
+    return pd.DataFrame({
+        "id": ["op"] + [f"c{i}" for i in range(n)],
+        "parent_id": [""] + ["t3_op"] * n,
+        "body": ["original post"] + bodies,
+        "score": [0] + scores,
+        "level": [0] * (n + 1),
+        "oc_bin_id": ["op"] + [f"c{i}" for i in range(n)],
+    })
+
+
+def test_truncation_keeps_deleted_and_removed_comments():
+    bodies = ["[deleted]", "[removed]", "short", "a longer comment body", "another reply"]
+    df = make_thread(bodies, [100, 90, 1, 2, 3])
+
+    selected = select_comments(df, 4)
+    assert len(selected) == 5
+    assert {"[deleted]", "[removed]"} <= set(selected["body"])
+
+
+def test_deleted_comments_are_still_skipped_for_inference():
+    df = make_thread(["[deleted]", "[removed]", "kept"], [100, 90, 1])
+    order = plan_order(df)
+    assert set(df["body"].to_numpy()[order]) == {"original post", "kept"}
+    assert np.array_equal(np.sort(plan_order(df, eligible_only=False)), np.arange(len(df)))
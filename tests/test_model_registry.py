@@ -0,0 +1,30 @@
+import json
+
+from model_registry import ModelVersion, is_local_model_dir
+
+
+def make_model_dir(path, weights=None):
+    path.mkdir()
+    (path / "config.json").write_text(json.dumps({"model_type": "bert"}))
+    (path / "vocab.txt").write_text("[PAD]\n")
+    if weights:
+        (path / weights).write_bytes(b"\0" * 16)
+    return str(path)
+
+
+def test_config_only_directory_is_downloaded(tmp_path):
+    # Like the checked-in bias_model/model_t2835ru3 placeholder: config and tokenizer, no weights
+    source = make_model_dir(tmp_path / "model_placeholder")
+    assert not is_local_model_dir(source)
+    assert ModelVersion("placeholder", source).path is None
+
+
+def test_directory_with_weights_is_used_in_place(tmp_path):
+    safetensors = make_model_dir(tmp_path / "model_a", "model.safetensors")
+    pytorch_bin = make_model_dir(tmp_path / "model_b", "pytorch_model.bin")
+    assert ModelVersion("a", safetensors).path == safetensors
+    assert ModelVersion("b", pytorch_bin).path == pytorch_bin
+
+
+def test_gcs_prefix_is_not_local(tmp_path):
+    assert ModelVersion("remote", "models/t2835ru3").path is None
@@ -0,0 +1,59 @@
+import pytest
+
+pytest.importorskip("flask")
+
+import main  # noqa: E402
+
+URL = "https://www.reddit.com/r/test/comments/abc123/title/"
+
+
+class FakeRunner:
+    def __init__(self, status):
+        self.status = status
+        self.waits = []
+
+    def submit(self, url, version):
+        return "job1", True
+
+    def wait(self, job_id, timeout):
+        self.waits.append(timeout)
+        job = {"job_id": job_id, "status": self.status, "stage": "bias"}
+        if self.status == "done":
+            job["result"] = {"data": [{"id": "c1", "sentiment": 0.5}], "model_version": "v1"}
+        return job
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(main, "resolve_model_version", lambda data, key=None: "v1")
+    return main.app.test_client()
+
+
+def use_runner(monkeypatch, status):
+    runner = FakeRunner(status)
+    monkeypatch.setattr(main, "get_job_runner", lambda: runner)
+    return runner
+
+
+def test_blocks_for_the_result_by_default(client, monkeypatch):
+    runner = use_runner(monkeypatch, "done")
+    response = client.post("/receive_url", json={"url": URL})
+    assert response.status_code == 200
+    assert response.get_json()["status"] == "success"
+    assert runner.waits == [main.RECEIVE_URL_MAX_WAIT]
+
+
+def test_still_running_is_504_without_opt_in(client, monkeypatch):
+    use_runner(monkeypatch, "running")
+    response = client.post("/receive_url", json={"url": URL})
+    assert response.status_code == 504
+    assert response.get_json()["status"] == "error"
+
+
+@pytest.mark.parametrize("query, headers", [("", {"Prefer": "respond-async"}), ("?async=1", {})])
+def test_opt_in_gets_202_and_a_job_to_poll(client, monkeypatch, query, headers):
+    runner = use_runner(monkeypatch, "running")
+    response = client.post("/receive_url" + query, json={"url": URL}, headers=headers)
+    assert response.status_code == 202
+    assert response.headers["Location"] == "/jobs/job1"
+    assert runner.waits == [main.RECEIVE_URL_WAIT]
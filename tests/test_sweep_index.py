@@ -0,0 +1,28 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bias_model", "finetuning"))
+
+from sweep_index import SweepIndex  # noqa: E402
+
+
+def write_metrics(path, accuracy):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write("loss,eval_loss,eval_accuracy,epoch,step\n")
+        f.write(f"0.9,0.8,{accuracy},1.0,100\n")
+
+
+def test_top_level_scan_ignores_nested_runs(tmp_path):
+    write_metrics(str(tmp_path / "metrics_top.csv"), 0.7)
+    write_metrics(str(tmp_path / "archive" / "metrics_nested.csv"), 0.9)
+
+    with SweepIndex(str(tmp_path / "index.sqlite")) as index:
+        assert index.update([str(tmp_path)], workers=1)["scanned"] == 2
+        assert set(index.eval_summary([str(tmp_path)])["run_id"]) == {"top", "nested"}
+
+        # A top-level update must not drop the nested run indexed above
+        stats = index.update([str(tmp_path)], workers=1, recursive=False)
+        assert (stats["scanned"], stats["removed"]) == (1, 0)
+        assert index.eval_summary([str(tmp_path)], recursive=False)["run_id"].tolist() == ["top"]
+        assert len(index.eval_summary([str(tmp_path)])) == 2
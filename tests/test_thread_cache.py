@@ -0,0 +1,76 @@
+import asyncio
+import threading
+
+import pandas as pd
+
+import reddit_analysis
+from thread_cache import ThreadCache
+
+URL = "https://www.reddit.com/r/test/comments/abc123/title/"
+
+
+def make_thread(n):
+    return pd.DataFrame({
+        "id": [f"c{i}" for i in range(n)],
+        "parent_id": ["t3_abc123"] * n,
+        "body": [f"comment {i}" for i in range(n)],
+        "score": list(range(n)),
+        "created_utc": [1_700_000_000 + i for i in range(n)],
+        "level": [0] * n,
+        "oc_bin_id": [f"c{i}" for i in range(n)],
+    })
+
+
+def fake_loader(monkeypatch):
+    calls = []
+
+    async def load(url, reddit_client=None, max_comments=2000, replace_more_limit=None):
+        calls.append(max_comments)
+        return make_thread(max_comments)
+
+    monkeypatch.setattr(reddit_analysis, "load_and_prepare_reddit_df", load)
+    return calls
+
+
+def load(cache, max_comments):
+    return asyncio.run(reddit_analysis.load_thread_with_sentiment(URL, max_comments=max_comments, cache=cache))
+
+
+def test_larger_cap_reloads_a_smaller_cached_thread(monkeypatch):
+    calls = fake_loader(monkeypatch)
+    cache = ThreadCache(ttl=60)
+
+    assert len(load(cache, 5)) == 5
+    assert len(load(cache, 5)) == 5
+    assert len(load(cache, 3)) == 5      # a larger cached frame serves smaller caps
+    assert len(load(cache, 8)) == 8      # but not larger ones
+    assert calls == [5, 8]
+    assert cache.get("abc123").max_comments == 8
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 2
+
+
+def test_stream_path_skips_a_smaller_cached_thread(monkeypatch):
+    calls = fake_loader(monkeypatch)
+    cache = ThreadCache(ttl=60)
+    cache.put("abc123", make_thread(5), max_comments=5)
+
+    df, is_scored = asyncio.run(reddit_analysis.fetch_thread_for_stream(URL, max_comments=8, cache=cache))
+    assert (len(df), is_scored) == (8, False)
+    assert calls == [8]
+
+
+def test_counters_are_exact_under_concurrency():
+    cache = ThreadCache()
+
+    def record():
+        for _ in range(10_000):
+            cache.record_hit()
+            cache.record_miss()
+
+    threads = [threading.Thread(target=record) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.stats()["hits"] == cache.stats()["misses"] == 80_000
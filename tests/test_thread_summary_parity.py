@@ -0,0 +1,101 @@
+import gzip
+import json
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("starlette")
+pytest.importorskip("httpx")
+pytest.importorskip("asyncpraw")
+
+import reddit_analysis  # noqa: E402
+from thread_cache import get_thread_cache  # noqa: E402
+
+THREAD_ID = "abc123"
+URL = f"https://www.reddit.com/r/test/comments/{THREAD_ID}/title/"
+
+
+def make_thread(n=120):
+    ids = ["op"] + [f"c{i}" for i in range(n)]
+    df = pd.DataFrame({
+        "id": ids,
+        "parent_id": [""] + ["t3_op" if i % 4 == 0 else f"t1_c{i - i % 4}" for i in range(n)],
+        "author": [f"user{i % 7}" for i in range(n + 1)],
+        "body": ["original post"] + [f"comment number {i} with some words" for i in range(n)],
+        "score": list(range(n + 1)),
+        "created_utc": [1_700_000_000 + 60 * i for i in range(n + 1)],
+        "level": [0] + [0 if i % 4 == 0 else 1 for i in range(n)],
+        "oc_bin_id": ["op"] + [f"c{i - i % 4}" for i in range(n)],
+    })
+    return reddit_analysis.add_sentiment_scores(df)
+
+
+@pytest.fixture
+def clients(monkeypatch):
+    from starlette.testclient import TestClient
+    import asgi_app
+    import main
+
+    class FakeReddit:
+        async def close(self):
+            pass
+
+    loaded = []
+
+    async def fake_load(url, reddit_client=None, max_comments=2000, cache=None, executor=None):
+        loaded.append(url)
+        return make_thread()
+
+    monkeypatch.setattr(reddit_analysis, "load_thread_with_sentiment", fake_load)
+    monkeypatch.setattr(asgi_app, "create_reddit_client", FakeReddit)
+    get_thread_cache().put(THREAD_ID, make_thread())
+    with TestClient(asgi_app.app) as asgi_client:
+        yield {"flask": main.app.test_client(), "asgi": asgi_client}, loaded
+
+
+def post(client, body, **headers):
+    response = client.post("/thread_summary", json=body, headers=headers)
+    raw = response.data if hasattr(response, "data") else response.content
+    return response, raw
+
+
+@pytest.mark.parametrize("body", [
+    {"thread_id": THREAD_ID, "bias": False},
+    {"thread_id": "not-cached", "url": URL, "bias": False},
+    {"url": URL, "bias": False},
+])
+def test_both_modes_return_the_same_summary(clients, body):
+    apps, _ = clients
+    results = {}
+    for mode, client in apps.items():
+        response, raw = post(client, body)
+        assert response.status_code == 200, mode
+        results[mode] = json.loads(raw)
+    assert results["flask"] == results["asgi"]
+    assert results["flask"]["thread_id"] in (THREAD_ID, body.get("thread_id"))
+
+
+def test_cached_thread_id_skips_reddit(clients):
+    apps, loaded = clients
+    for client in apps.values():
+        response, _ = post(client, {"thread_id": THREAD_ID, "bias": False})
+        assert response.status_code == 200
+    assert loaded == []
+
+
+def test_uncached_thread_id_without_url_is_404(clients):
+    apps, _ = clients
+    for mode, client in apps.items():
+        response, _ = post(client, {"thread_id": "not-cached", "bias": False})
+        assert response.status_code == 404, mode
+
+
+def test_both_modes_negotiate_compression(clients):
+    apps, _ = clients
+    for mode, client in apps.items():
+        response, raw = post(client, {"thread_id": THREAD_ID, "bias": False}, **{"Accept-Encoding": "gzip"})
+        assert response.headers.get("Content-Encoding") == "gzip", mode
+        # The Starlette test client decodes gzip itself; Flask's returns the raw bytes
+        body = gzip.decompress(raw) if mode == "flask" else raw
+        assert json.loads(body)["status"] == "success"
@@ -0,0 +1,112 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Thread cache settings
+DEFAULT_THREAD_TTL = float(os.getenv("THREAD_CACHE_TTL", "60"))            # serve cached frame as-is
+DEFAULT_FULL_REFRESH = float(os.getenv("THREAD_CACHE_FULL_REFRESH", "900"))  # rebuild from scratch
+DEFAULT_MAX_THREADS = int(os.getenv("THREAD_CACHE_SIZE", "64"))
+
+# Global cache instance - created on first use
+_thread_cache = None
+
+class ThreadEntry:
+    """Cached, sentiment-scored frame for one submission."""
+
+    def __init__(self, submission_id, df, max_comments=None):
+        now = time.time()
+        self.submission_id = submission_id
+        self.df = df
+        self.max_comments = max_comments  # cap the frame was loaded under (None = uncapped)
+        self.created_at = now    # last full load
+        self.refreshed_at = now  # last full or incremental load
+        self.high_water = float(df['created_utc'].max()) if len(df) else 0.0
+
+    def age(self) -> float:
+        return time.time() - self.refreshed_at
+
+    def full_age(self) -> float:
+        return time.time() - self.created_at
+
+    def covers(self, max_comments) -> bool:
+        """Whether this frame was loaded under a cap at least as large as max_comments."""
+        if self.max_comments is None:
+            return True
+        return max_comments is not None and self.max_comments >= max_comments
+
+class ThreadCache:
+    """
+    Per-process LRU of analysed threads keyed on submission id.
+
+    Entries younger than `ttl` are served without touching Reddit. Older entries
+    get an incremental refresh until they reach `full_refresh` seconds, after
+    which the thread is reloaded from scratch.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_THREAD_TTL, full_refresh: float = DEFAULT_FULL_REFRESH,
+                 max_threads: int = DEFAULT_MAX_THREADS):
+        self.ttl = ttl
+        self.full_refresh = full_refresh
+        self.max_threads = max_threads
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.incremental_refreshes = 0
+        self.misses = 0
+
+    def get(self, submission_id):
+        """Return the cached entry (fresh or stale) or None."""
+        with self._lock:
+            entry = self._entries.get(submission_id)
+            if entry is not None:
+                self._entries.move_to_end(submission_id)
+            return entry
+
+    def put(self, submission_id, df, incremental=False, max_comments=None):
+        """Store a frame, keeping the original load time on incremental refreshes."""
+        with self._lock:
+            previous = self._entries.get(submission_id)
+            entry = ThreadEntry(submission_id, df, max_comments)
+            if incremental and previous is not None:
+                entry.created_at = previous.created_at
+            self._entries[submission_id] = entry
+            self._entries.move_to_end(submission_id)
+            while len(self._entries) > self.max_threads:
+                self._entries.popitem(last=False)
+            return entry
+
+    # Lookup outcomes are counted under the lock: loads run on several threads
+    def record_hit(self):
+        with self._lock:
+            self.hits += 1
+
+    def record_incremental_refresh(self):
+        with self._lock:
+            self.incremental_refreshes += 1
+
+    def record_miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.incremental_refreshes + self.misses
+            return {
+                "threads": len(self._entries),
+                "hits": self.hits,
+                "incremental_refreshes": self.incremental_refreshes,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+def get_thread_cache() -> ThreadCache:
+    """Get or create the process-wide thread cache (configured from env vars)."""
+    global _thread_cache
+    if _thread_cache is None:
+        _thread_cache = ThreadCache()
+    return _thread_cache
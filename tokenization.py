@@ -0,0 +1,149 @@
+import os
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Truncation for comments longer than max_length: "head_tail" keeps the first
+# BIAS_HEAD_TOKENS and the last (max_length - 2 - head) tokens, "head" keeps the start
+BIAS_TRUNCATION = os.getenv("BIAS_TRUNCATION", "head_tail")
+BIAS_HEAD_TOKENS = int(os.getenv("BIAS_HEAD_TOKENS", "128"))
+SUPPORTED_TRUNCATION = ["head_tail", "head"]
+
+# Encoded ids per worker, keyed by a hash of the raw text
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "20000"))
+
+# Global cache instance - created on first use
+_token_cache = None
+
+def truncation_id(max_length: int) -> str:
+    """Identifies the truncation policy, so caches of model outputs can be keyed on it."""
+    if BIAS_TRUNCATION == "head_tail":
+        return f"head_tail{BIAS_HEAD_TOKENS}/{max_length}"
+    return f"head/{max_length}"
+
+def text_key(text: str, namespace: str = "") -> bytes:
+    digest = hashlib.blake2b(namespace.encode("utf-8"), digest_size=16)
+    digest.update(text.encode("utf-8"))
+    return digest.digest()
+
+def tokenizer_namespace(tokenizer) -> str:
+    """Token cache namespace, so resident model versions with different vocabularies never share ids."""
+    return f"{getattr(tokenizer, 'name_or_path', '')}:{len(tokenizer)}"
+
+def truncate_ids(ids, budget: int, policy=None, head_tokens=None):
+    """Cut a token id list (without special tokens) to budget using the truncation policy."""
+    if len(ids) <= budget:
+        return ids
+    policy = policy or BIAS_TRUNCATION
+    head = min(BIAS_HEAD_TOKENS if head_tokens is None else head_tokens, budget)
+    if policy == "head_tail" and head < budget:
+        return ids[:head] + ids[len(ids) - (budget - head):]
+    return ids[:budget]
+
+class TokenCache:
+    """
+    Bounded LRU of encoded input ids, keyed by a hash of the raw comment text.
+
+    Entries are only valid for one tokenizer + truncation policy; clear() it when
+    the model is reloaded.
+    """
+
+    def __init__(self, max_entries: int = TOKEN_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.encoded_texts = 0
+        self.tokenize_seconds = 0.0
+
+    def get_many(self, keys):
+        found = {}
+        with self._lock:
+            for key in keys:
+                ids = self._entries.get(key)
+                if ids is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = ids
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items):
+        with self._lock:
+            for key, ids in items.items():
+                self._entries[key] = ids
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def record(self, n_texts, seconds):
+        with self._lock:
+            self.encoded_texts += n_texts
+            self.tokenize_seconds += seconds
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "encoded_texts": self.encoded_texts,
+                "tokenize_seconds": round(self.tokenize_seconds, 4),
+            }
+
+def get_token_cache() -> TokenCache:
+    """Get or create the process-wide token cache."""
+    global _token_cache
+    if _token_cache is None:
+        _token_cache = TokenCache()
+    return _token_cache
+
+def encode_texts(tokenizer, texts, max_length: int, cache: TokenCache = None):
+    """
+    Encode texts to input ids (with special tokens), truncated to max_length.
+
+    Cached encodings are reused; the rest are batch-encoded in one tokenizer call
+    (the Rust fast tokenizer parallelises this) and truncated with the configured
+    policy. Returns (input_ids, seconds spent).
+    """
+    cache = cache or get_token_cache()
+    start = time.perf_counter()
+
+    namespace = tokenizer_namespace(tokenizer)
+    keys = [text_key(text, namespace) for text in texts]
+    encoded = cache.get_many(keys)
+
+    pending = {}
+    for key, text in zip(keys, texts):
+        if key not in encoded and key not in pending:
+            pending[key] = text
+
+    if pending:
+        budget = max_length - tokenizer.num_special_tokens_to_add()
+        raw_ids = tokenizer(
+            list(pending.values()),
+            add_special_tokens=False,
+            truncation=False,
+            verbose=False,
+        )["input_ids"]
+        fresh = {
+            key: tokenizer.build_inputs_with_special_tokens(truncate_ids(ids, budget))
+            for key, ids in zip(pending, raw_ids)
+        }
+        cache.put_many(fresh)
+        encoded.update(fresh)
+
+    elapsed = time.perf_counter() - start
+    cache.record(len(texts), elapsed)
+    return [encoded[key] for key in keys], elapsed
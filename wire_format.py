@@ -0,0 +1,100 @@
+import gzip
+import json
+import base64
+import logging
+
+import numpy as np
+import pandas as pd
+
+from metrics import stage
+
+logger = logging.getLogger(__name__)
+
+# Clients opt in to the columnar payload with this Accept type (or ?format=columnar)
+COLUMNAR_MEDIA_TYPE = "application/vnd.reddit-analysis.columnar+json"
+
+# String columns sent as a vocabulary + integer codes instead of repeated strings
+CATEGORICAL_COLUMNS = ["sentiment_label", "oc_bin_id", "author"]
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_BYTES = 1024
+
+def wants_columnar(request) -> bool:
+    """Content negotiation: Accept header or ?format=columnar (Flask or Starlette request)."""
+    params = request.args if hasattr(request, "args") else request.query_params
+    if params.get("format") == "columnar":
+        return True
+    return COLUMNAR_MEDIA_TYPE in request.headers.get("Accept", "")
+
+def encode_bias_matrix(bias_values):
+    """
+    Pack per-row bias dicts into one base64 float32 matrix (rows x labels).
+
+    Rows without a bias prediction are NaN. The label vocabulary is returned
+    once instead of being repeated in every row.
+    """
+    labels = []
+    for value in bias_values:
+        if isinstance(value, dict):
+            labels = list(value.keys())
+            break
+
+    matrix = np.full((len(bias_values), len(labels)), np.nan, dtype="<f4")
+    for i, value in enumerate(bias_values):
+        if isinstance(value, dict):
+            matrix[i] = [value.get(label, np.nan) for label in labels]
+
+    return {
+        "labels": labels,
+        "dtype": "float32",
+        "shape": list(matrix.shape),
+        "data": base64.b64encode(matrix.tobytes()).decode("ascii"),
+    }
+
+def encode_columnar(df: pd.DataFrame) -> dict:
+    """Encode a comment frame as column arrays (+ vocabularies and a dense bias matrix)."""
+    columns = {}
+    categorical = {}
+    for name in df.columns:
+        if name == "bias":
+            continue
+        series = df[name]
+        if name in CATEGORICAL_COLUMNS:
+            codes, vocab = pd.factorize(series, use_na_sentinel=True)
+            categorical[name] = {"vocab": vocab.tolist(), "codes": codes.tolist()}
+        else:
+            columns[name] = series.astype(object).where(series.notna(), None).tolist()
+
+    payload = {"format": "columnar", "length": len(df), "columns": columns, "categorical": categorical}
+    if "bias" in df.columns:
+        payload["bias"] = encode_bias_matrix(df["bias"].tolist())
+    return payload
+
+def compress_body(body: bytes, accept_encoding: str):
+    """Compress with brotli when available and accepted, else gzip. Returns (body, encoding)."""
+    if len(body) < MIN_COMPRESS_BYTES:
+        return body, None
+    accept_encoding = accept_encoding or ""
+    if "br" in accept_encoding:
+        try:
+            import brotli
+            return brotli.compress(body, quality=5), "br"
+        except ImportError:
+            pass
+    if "gzip" in accept_encoding:
+        return gzip.compress(body, compresslevel=6), "gzip"
+    return body, None
+
+def encode_response(payload: dict, request, media_type="application/json"):
+    """Serialize and compress a payload. Returns (body, headers)."""
+    with stage("json_encode"):
+        body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    raw_size = len(body)
+    with stage("compress"):
+        body, encoding = compress_body(body, request.headers.get("Accept-Encoding", ""))
+
+    headers = {"Content-Type": media_type, "Vary": "Accept, Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    logger.info(f"Encoded {media_type} response: {raw_size} bytes -> {len(body)} bytes ({encoding or 'identity'})")
+    return body, headers